@@ -0,0 +1,294 @@
+"""
+Metrics log analyzer - stage latency percentiles, throughput, token usage, tool error rates
+and cache hit rate from logs/metrics.log (rotated files included), with comparison of two runs.
+Lines are parsed one by one and latencies go to fixed-bucket histograms, so memory doesn't grow with log size.
+
+Usage:
+    uv run analyze_metrics.py logs/metrics.log*
+    uv run analyze_metrics.py logs/ --format json > baseline.json
+    uv run analyze_metrics.py logs/ --compare baseline.json --threshold 10
+"""
+import argparse, bisect, json, math, os, re, sys
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+from tables import format_table
+
+# Log line: "<asctime>: <EVENT>: <json or key=value pairs>"
+RE_LINE = re.compile(r"^(?:(?P<time>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}): )?(?P<event>[A-Z][A-Z ]+[A-Z]): (?P<body>.*)$")
+RE_PAIR = re.compile(r"(\w+)=(\S+)")
+RE_ROTATED = re.compile(r"^(?P<base>.*?)(?:\.(?P<index>\d+))?$")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+
+# Histogram buckets: geometric from 10us to ~3h, every bucket is 5% wider than the previous one
+BUCKET_MIN_S = 1e-5
+BUCKET_GROWTH = 1.05
+BUCKET_BOUNDS = [BUCKET_MIN_S * BUCKET_GROWTH ** i for i in range(int(math.log(1e9) / math.log(BUCKET_GROWTH)) + 1)]
+PERCENTILES = (50, 90, 99)
+
+# Request events (per-stage latencies, throughput, tokens) and the pipeline they are reported as
+PIPELINE_EVENTS = {
+    "DIAGNOSE METRICS": "diagnose",
+    "BATCH DIAGNOSE METRICS": "batch",
+    "LOCAL MODEL METRICS": "local_chat",
+}
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, percentiles are accurate to the bucket width (~5%)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Geometric middle of the bucket with the q-th percentile, clipped to observed min/max"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                break
+        upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+        lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+        estimate = math.sqrt(lower * upper) if lower > 0 else upper
+        return min(max(estimate, self.min), self.max)
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else 0.0,
+            **{f"p{q}": round(self.percentile(q), 4) for q in PERCENTILES},
+            "max": round(self.max, 4),
+        }
+
+
+def parse_line(line: str) -> tuple[datetime | None, str, dict[str, Any]] | None:
+    """(timestamp, event, data) of a metrics log line, None for other lines"""
+    match = RE_LINE.match(line.strip())
+    if not match:
+        return None
+    timestamp = datetime.strptime(match["time"], TIME_FORMAT) if match["time"] else None
+    body = match["body"]
+    if body.startswith("{"):
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError:
+            return None
+    else:
+        data = dict(RE_PAIR.findall(body))
+    return timestamp, match["event"], data
+
+
+def expand_paths(paths: Iterable[str]) -> list[str]:
+    """Log files of given paths (directories - their metrics.log* files), rotated files oldest first"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in os.listdir(path) if name.startswith("metrics.log"))
+        else:
+            files.append(path)
+
+    def order(file: str) -> tuple[str, int]:
+        match = RE_ROTATED.match(file)
+        return match["base"], -int(match["index"] or 0)
+    return sorted(files, key=order)
+
+
+def iter_lines(files: Iterable[str]) -> Iterator[str]:
+    for file in files:
+        with open(file, encoding="utf-8", errors="replace") as f:
+            yield from f
+
+
+class MetricsReport:
+    """Aggregates of metrics log events, built in a single pass"""
+
+    def __init__(self, window_s: int = 60):
+        self.window_s = window_s
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.windows: dict[int, int] = {}
+        self.requests: dict[str, int] = {}
+        self.tokens: dict[str, dict[str, int]] = {}
+        self.tools: dict[str, dict[str, int]] = {}
+        self.cache = {"hits": 0, "misses": 0}
+        self.rerank_paths: dict[str, int] = {}
+        self.recall: dict[str, dict[str, Any]] = {}
+        self.first: datetime | None = None
+        self.last: datetime | None = None
+        self.lines = 0
+
+    def _observe(self, name: str, value: Any) -> None:
+        if isinstance(value, (int, float)):
+            self.latency.setdefault(name, LatencyHistogram()).observe(float(value))
+
+    def add(self, timestamp: datetime | None, event: str, data: dict[str, Any]) -> None:
+        self.lines += 1
+        if event in PIPELINE_EVENTS:
+            pipeline = PIPELINE_EVENTS[event]
+            for stage, value in (data.get("latency") or {}).items():
+                self._observe(f"{pipeline}.{stage.removesuffix('_s')}", value)
+            requests = data.get("batch_size", 1)
+            self.requests[pipeline] = self.requests.get(pipeline, 0) + requests
+            if timestamp is not None:
+                window = int(timestamp.timestamp()) // self.window_s
+                self.windows[window] = self.windows.get(window, 0) + requests
+                self.first = min(self.first or timestamp, timestamp)
+                self.last = max(self.last or timestamp, timestamp)
+            paths = data.get("rerank_paths") or ({data["rerank_path"]: 1} if data.get("rerank_path") else {})
+            for path, count in paths.items():
+                self.rerank_paths[path] = self.rerank_paths.get(path, 0) + count
+            model_tokens = self.tokens.setdefault(data.get("model", "unknown"), {})
+            for name, value in (data.get("token_usage") or {}).items():
+                if isinstance(value, int):
+                    model_tokens[name] = model_tokens.get(name, 0) + value
+        elif event == "TOOL EXECUTION":
+            statuses = self.tools.setdefault(data.get("tool", "unknown"), {})
+            statuses[data.get("status", "unknown")] = statuses.get(data.get("status", "unknown"), 0) + 1
+            self._observe(f"tool.{data.get('tool', 'unknown')}", (data.get("latency") or {}).get("total_s"))
+        elif event == "RERANK BATCH METRICS":
+            self._observe("rerank_batch.predict", data.get("predict_s"))
+            self._observe("rerank_batch.queue_wait", (data.get("queue_wait_s") or {}).get("mean"))
+        elif event == "DIAGNOSE CACHE":
+            self.cache["hits" if data.get("hit") else "misses"] += 1
+        elif event == "RECALL EVALUATION":
+            config = " ".join(f"{key}={data[key]}" for key in ("retriever", "rerank", "candidates", "k", "adaptive", "margin") if key in data)
+            self.recall[config] = data
+
+    def to_dict(self) -> dict[str, Any]:
+        duration_s = (self.last - self.first).total_seconds() if self.first and self.last else 0.0
+        window_rates = [count / self.window_s for count in self.windows.values()]
+        cache_total = self.cache["hits"] + self.cache["misses"]
+        return {
+            "lines": self.lines,
+            "period": {
+                "start": self.first.isoformat() if self.first else None,
+                "end": self.last.isoformat() if self.last else None,
+                "duration_s": duration_s,
+            },
+            "latency": {name: histogram.summary() for name, histogram in sorted(self.latency.items())},
+            "throughput": {
+                "requests": self.requests,
+                "window_s": self.window_s,
+                "mean_rps": round(sum(self.windows.values()) / max(duration_s, self.window_s), 4) if self.windows else 0.0,
+                "peak_rps": round(max(window_rates), 4) if window_rates else 0.0,
+                "active_windows": len(self.windows),
+            },
+            "tokens": self.tokens,
+            "tools": {tool: {
+                "calls": sum(statuses.values()),
+                "error_rate": round(statuses.get("error", 0) / sum(statuses.values()), 4),
+                "timeout_rate": round(statuses.get("timeout", 0) / sum(statuses.values()), 4),
+            } for tool, statuses in sorted(self.tools.items())},
+            "cache": {**self.cache, "hit_rate": round(self.cache["hits"] / cache_total, 4) if cache_total else 0.0},
+            "rerank_paths": self.rerank_paths,
+            "recall": self.recall,
+        }
+
+
+def analyze(paths: Iterable[str], window_s: int = 60) -> dict[str, Any]:
+    report = MetricsReport(window_s=window_s)
+    for line in iter_lines(expand_paths(paths)):
+        if (parsed := parse_line(line)) is not None:
+            report.add(*parsed)
+    return report.to_dict()
+
+
+def load_report(paths: list[str], window_s: int) -> dict[str, Any]:
+    """Report of metrics logs or a saved JSON report"""
+    if len(paths) == 1 and paths[0].endswith(".json"):
+        with open(paths[0], encoding="utf-8") as f:
+            return json.load(f)
+    return analyze(paths, window_s)
+
+
+def compare_reports(baseline: dict[str, Any], current: dict[str, Any], threshold_pct: float) -> list[dict[str, Any]]:
+    """
+    Percentile changes of stages present in both reports and error rates of tools,
+    regression if a value grew by more than threshold_pct percent.
+    """
+    rows = []
+    for name in sorted(set(baseline["latency"]) & set(current["latency"])):
+        for q in PERCENTILES:
+            before, after = baseline["latency"][name][f"p{q}"], current["latency"][name][f"p{q}"]
+            change = (after - before) / before * 100 if before else 0.0
+            rows.append({"metric": f"{name} p{q}", "baseline": before, "current": after,
+                         "change_pct": round(change, 1), "regression": change > threshold_pct})
+    for tool in sorted(set(baseline["tools"]) & set(current["tools"])):
+        for rate in ("error_rate", "timeout_rate"):
+            before, after = baseline["tools"][tool][rate], current["tools"][tool][rate]
+            rows.append({"metric": f"tool.{tool} {rate}", "baseline": before, "current": after,
+                         "change_pct": round((after - before) * 100, 1), "regression": after > before})
+    return rows
+
+
+def format_report(report: dict[str, Any]) -> str:
+    sections = [f"Period: {report['period']['start']} - {report['period']['end']} ({report['lines']} metric lines)"]
+    sections.append(format_table(
+        ["stage", "count", "mean_s", *(f"p{q}_s" for q in PERCENTILES), "max_s"],
+        [[name, *summary.values()] for name, summary in report["latency"].items()]))
+    throughput = report["throughput"]
+    sections.append(
+        f"Throughput: requests={throughput['requests']} mean={throughput['mean_rps']} req/s "
+        f"peak={throughput['peak_rps']} req/s ({throughput['window_s']}s windows)")
+    if report["tokens"]:
+        token_names = sorted({name for usage in report["tokens"].values() for name in usage})
+        sections.append(format_table(
+            ["model", *token_names],
+            [[model, *(usage.get(name, 0) for name in token_names)] for model, usage in report["tokens"].items()]))
+    if report["tools"]:
+        sections.append(format_table(
+            ["tool", "calls", "error_rate", "timeout_rate"],
+            [[tool, *stats.values()] for tool, stats in report["tools"].items()]))
+    cache = report["cache"]
+    sections.append(f"Cache: hits={cache['hits']} misses={cache['misses']} hit_rate={cache['hit_rate']:.2%}")
+    if report.get("rerank_paths"):
+        total = sum(report["rerank_paths"].values())
+        sections.append("Rerank paths: " + " ".join(
+            f"{path}={count} ({count / total:.2%})" for path, count in sorted(report["rerank_paths"].items())))
+    if report["recall"]:
+        sections.append(format_table(
+            ["evaluation", "sample_size", "recall", "recall_cost"],
+            [[config, data.get("sample_size"), data.get("recall"), data.get("recall_cost", "-")]
+             for config, data in report["recall"].items()]))
+    return "\n\n".join(sections)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Analyze metrics logs")
+    parser.add_argument("paths", nargs="+", help="Metrics log files or log directories")
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    parser.add_argument("--window", type=int, default=60, help="Throughput window in seconds")
+    parser.add_argument("--compare", nargs="+", help="Baseline run: metrics logs or a JSON report")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    report = analyze(args.paths, args.window)
+    if not args.compare:
+        print(json.dumps(report, indent=2) if args.format == "json" else format_report(report))
+        return
+
+    rows = compare_reports(load_report(args.compare, args.window), report, args.threshold)
+    if args.format == "json":
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_table(
+            ["metric", "baseline", "current", "change_%", "regression"],
+            [[row["metric"], row["baseline"], row["current"], row["change_pct"], "YES" if row["regression"] else ""] for row in rows]))
+    # Non-zero exit code for CI checks
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Deterministic local stand-in for ChatGoogleGenerativeAI used by benchmarks (no Gemini quota is used).
+Answers with the first diseases of the prompt context after a configurable latency and reports
+token usage like Gemini (input tokens estimated from the prompt length).
+"""
+import asyncio, hashlib, re, time
+from typing import Any, AsyncIterator
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import RunnableLambda
+from src.schemas import DiagnoseResponse
+
+RE_CONTEXT_DISEASE = re.compile(r"Disease: (?P<name>.+?) ICD CODE: (?P<icd_code>\S+)")
+
+
+class FakeGeminiLLM:
+    """
+    Replaces ChatGoogleGenerativeAI in DiagnosisAssistant: supports with_structured_output (diagnose, batch)
+    and bind(...).astream (JSON streaming). Latency of a prompt is latency_s +- jitter, fixed by the prompt hash.
+    """
+
+    def __init__(self, latency_s: float = 0.5, jitter: float = 0.2, output_tokens: int = 150,
+                 chunks: int = 8, diseases: int = 3, **kwargs: Any):
+        self.latency_s = latency_s
+        self.jitter = jitter
+        self.output_tokens = output_tokens
+        self.chunks = chunks
+        self.diseases = diseases
+        self.calls = 0
+
+    def latency(self, text: str) -> float:
+        fraction = int(hashlib.md5(text.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return max(0.0, self.latency_s * (1 + self.jitter * (2 * fraction - 1)))
+
+    def answer(self, prompt: PromptValue | str) -> tuple[str, str, dict[str, int]]:
+        text = prompt if isinstance(prompt, str) else prompt.to_string()
+        self.calls += 1
+        response = DiagnoseResponse(possible_diseases=[
+            {"name": match["name"], "icd_code": match["icd_code"], "reasoning": "Symptoms match the context."}
+            for match in RE_CONTEXT_DISEASE.finditer(text)][:self.diseases])
+        input_tokens = len(text) // 4
+        usage = {"input_tokens": input_tokens, "output_tokens": self.output_tokens, "total_tokens": input_tokens + self.output_tokens}
+        return text, response.model_dump_json(), usage
+
+    def _structured(self, prompt: PromptValue) -> tuple[dict[str, Any], float]:
+        text, content, usage = self.answer(prompt)
+        result = {
+            "raw": AIMessage(content=content, usage_metadata=usage),
+            "parsed": DiagnoseResponse.model_validate_json(content),
+            "parsing_error": None,
+        }
+        return result, self.latency(text)
+
+    def with_structured_output(self, schema: Any, include_raw: bool = False, **kwargs: Any) -> RunnableLambda:
+        def invoke(prompt: PromptValue) -> dict[str, Any]:
+            result, latency = self._structured(prompt)
+            time.sleep(latency)
+            return result
+
+        async def ainvoke(prompt: PromptValue) -> dict[str, Any]:
+            result, latency = self._structured(prompt)
+            await asyncio.sleep(latency)
+            return result
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+    def bind(self, **kwargs: Any) -> "FakeGeminiLLM":
+        return self
+
+    async def astream(self, prompt: PromptValue, **kwargs: Any) -> AsyncIterator[AIMessageChunk]:
+        """JSON answer in equal chunks spread over the latency, usage is reported with the last chunk"""
+        text, content, usage = self.answer(prompt)
+        size = max(1, -(-len(content) // self.chunks))
+        parts = [content[i:i + size] for i in range(0, len(content), size)]
+        for i, part in enumerate(parts):
+            await asyncio.sleep(self.latency(text) / len(parts))
+            yield AIMessageChunk(content=part, usage_metadata=usage if i == len(parts) - 1 else None)
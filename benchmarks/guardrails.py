@@ -0,0 +1,76 @@
+"""
+Guardrails benchmark: previous multi-scan checks vs single pass run_guardrails on long inputs.
+Inputs are clean symptom descriptions (the common case), descriptions with many numbers
+(sensitive data anchors present) and descriptions with a violation at the very end.
+
+Usage:
+    uv run python -m benchmarks.guardrails --sizes 200 10000 100000
+"""
+import argparse, json, logging, random, timeit
+from src.llm.guardrails import (
+    SecurityError, run_guardrails, PROMPT_INJECTION_PHRASES, PROFANITY,
+    RE_EMAIL, RE_PHONE, RE_PESEL, RE_CARD, RE_IBAN, RE_LINK)
+
+WORDS = ("fever cough headache pain nausea vomiting rash fatigue chills sore throat "
+         "since yesterday and very high temperature in the evening").split()
+
+
+def run_guardrails_multi_scan(prompt: str) -> None:
+    """Previous implementation (reference for speed) - every phrase and pattern scans the prompt separately"""
+    lowered_prompt = prompt.lower()
+    for phrase in PROMPT_INJECTION_PHRASES:
+        if phrase in lowered_prompt:
+            raise SecurityError(f"Request rejected due to prompt injection attempt. Phrase: '{phrase}'")
+    for pattern in (RE_EMAIL, RE_PHONE, RE_PESEL, RE_CARD, RE_IBAN, RE_LINK):
+        if pattern.search(prompt):
+            raise SecurityError("Request rejected due to sensitive data detected.")
+    lowered_prompt = prompt.lower()
+    for bad_word in PROFANITY:
+        if bad_word in lowered_prompt:
+            raise SecurityError(f"Request rejected due to profanity attempt. Word: '{bad_word}'")
+
+
+def make_input(size: int, kind: str, rng: random.Random) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS) if kind != "numbers" or rng.random() > 0.1 else f"{rng.randint(36, 41)}.{rng.randint(0, 9)}C"
+        words.append(word)
+        length += len(word) + 1
+    text = " ".join(words)[:size]
+    return text + " jailbreak" if kind == "violation" else text
+
+
+def time_us(fn, prompt: str, number: int) -> float:
+    def call():
+        try:
+            fn(prompt)
+        except SecurityError:
+            pass
+    return round(min(timeit.repeat(call, number=number, repeat=5)) / number * 1e6, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark multi-scan vs single pass guardrails")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 10_000, 100_000])
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    rng = random.Random(42)
+
+    for size in args.sizes:
+        number = max(1, 200_000 // size)
+        for kind in ["clean", "numbers", "violation"]:
+            prompt = make_input(size, kind, rng)
+            multi_scan = time_us(run_guardrails_multi_scan, prompt, number)
+            single_pass = time_us(run_guardrails, prompt, number)
+            print(json.dumps({
+                "size": size,
+                "input": kind,
+                "multi_scan_us": multi_scan,
+                "single_pass_us": single_pass,
+                "speedup": round(multi_scan / max(single_pass, 1e-9), 1)
+            }))
+
+
+if __name__ == "__main__":
+    main()
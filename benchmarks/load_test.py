@@ -0,0 +1,193 @@
+"""
+Load test of /diagnose and /diagnose/batch with FakeGeminiLLM in place of Gemini.
+The API runs in-process (httpx ASGI transport) with the real vector store and reranker, so the measured
+time is the whole pipeline except the LLM, whose latency is simulated. Per-stage latencies are taken from
+DIAGNOSE METRICS / BATCH DIAGNOSE METRICS lines of every request.
+
+Load is closed-loop (--concurrency workers send requests back to back) or open-loop (--rate requests
+per second with Poisson arrivals). Results of all runs are saved as JSON for comparison.
+
+Usage:
+    uv run python -m benchmarks.load_test --concurrency 1 8 32 --requests 200 --llm-latency-ms 800
+    uv run python -m benchmarks.load_test --endpoint batch --batch-size 16 --concurrency 4 --requests 20
+    uv run python -m benchmarks.load_test --rate 5 10 20 --requests 200 --output logs/load_test_rate.json
+"""
+import argparse, asyncio, json, logging, os, random, time
+from datetime import datetime
+from typing import Any
+import httpx, numpy as np, pandas as pd
+from fastapi import FastAPI
+from analyze_metrics import parse_line
+from benchmarks.fake_llm import FakeGeminiLLM
+import src.llm.diagnosis_assistant as diagnosis_assistant
+from src.rag.vectors_store import DATASET_FILENAME
+
+ENDPOINTS = {"diagnose": "/diagnose", "batch": "/diagnose/batch"}
+METRIC_EVENTS = {"DIAGNOSE METRICS", "BATCH DIAGNOSE METRICS"}
+
+
+class StageLatencyCollector(logging.Handler):
+    """Collects per-stage latencies of metrics log lines emitted during a run"""
+
+    def __init__(self):
+        super().__init__()
+        self.stages: dict[str, list[float]] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        parsed = parse_line(record.getMessage())
+        if parsed is not None and parsed[1] in METRIC_EVENTS:
+            for stage, value in parsed[2].get("latency", {}).items():
+                self.stages.setdefault(stage.removesuffix("_s"), []).append(value)
+
+
+def percentiles_ms(timings: list[float]) -> dict[str, float]:
+    if not timings:
+        return {}
+    return {f"p{q}_ms": round(float(np.percentile(timings, q)) * 1000, 2) for q in (50, 95, 99)}
+
+
+def make_payloads(count: int, seed: int) -> list[dict[str, Any]]:
+    """Patients with 2-6 symptoms of random dataset diseases"""
+    rng = random.Random(seed)
+    df = pd.read_csv(DATASET_FILENAME)
+    symptom_cols = df.columns.drop(["prognosis", "icd_code"])
+    matrix = df[symptom_cols].to_numpy()
+    payloads = []
+    for _ in range(count):
+        present = [symptom_cols[i].replace("_", " ") for i in np.nonzero(matrix[rng.randrange(len(df))] > 0)[0]]
+        payloads.append({
+            "age": rng.randint(1, 100),
+            "gender": rng.choice(["male", "female"]),
+            "symptoms": rng.sample(present, min(len(present), rng.randint(2, 6))),
+        })
+    return payloads
+
+
+def build_app(llm: FakeGeminiLLM) -> FastAPI:
+    """Diagnosis API with FakeGeminiLLM and without cache (every request runs the pipeline)"""
+    from src.routes import diagnosis
+    from src.rag.vectors_store import get_vectors_store
+    diagnosis_assistant.ChatGoogleGenerativeAI = lambda **kwargs: llm
+    app = FastAPI()
+    app.include_router(diagnosis.router)
+    app.state.rag_assistant = diagnosis_assistant.DiagnosisAssistant(get_vectors_store(), cache=None)
+    return app
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, body: Any, latencies: list[float], errors: list[str]) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.post(ENDPOINTS[endpoint], json=body, params={"use_cache": False})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    except httpx.HTTPError as e:
+        errors.append(type(e).__name__)
+
+
+async def run_closed_loop(client: httpx.AsyncClient, endpoint: str, bodies: list[Any], concurrency: int,
+                          latencies: list[float], errors: list[str]) -> None:
+    queue = iter(bodies)
+
+    async def worker():
+        for body in queue:
+            await send(client, endpoint, body, latencies, errors)
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_open_loop(client: httpx.AsyncClient, endpoint: str, bodies: list[Any], rate: float, seed: int,
+                        latencies: list[float], errors: list[str]) -> None:
+    rng = random.Random(seed)
+    tasks = []
+    for body in bodies:
+        tasks.append(asyncio.create_task(send(client, endpoint, body, latencies, errors)))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+
+
+async def run(client: httpx.AsyncClient, args: argparse.Namespace, concurrency: int | None, rate: float | None) -> dict[str, Any]:
+    batch_size = args.batch_size if args.endpoint == "batch" else 1
+    payloads = make_payloads(args.requests * batch_size, args.seed)
+    bodies = payloads if args.endpoint == "diagnose" else [
+        payloads[i:i + args.batch_size] for i in range(0, len(payloads), args.batch_size)]
+
+    collector = StageLatencyCollector()
+    metrics_logger = logging.getLogger("metrics")
+    metrics_logger.addHandler(collector)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    if rate is None:
+        await run_closed_loop(client, args.endpoint, bodies, concurrency, latencies, errors)
+    else:
+        await run_open_loop(client, args.endpoint, bodies, rate, args.seed, latencies, errors)
+    duration_s = time.perf_counter() - start
+    metrics_logger.removeHandler(collector)
+
+    patients = len(latencies) * batch_size
+    return {
+        "endpoint": ENDPOINTS[args.endpoint],
+        "mode": "closed" if rate is None else "open",
+        "concurrency": concurrency,
+        "rate_rps": rate,
+        "batch_size": args.batch_size if args.endpoint == "batch" else None,
+        "llm_latency_ms": args.llm_latency_ms,
+        "requests": len(bodies),
+        "errors": len(errors),
+        "duration_s": round(duration_s, 3),
+        "throughput_rps": round(len(latencies) / duration_s, 2),
+        "patients_per_s": round(patients / duration_s, 2),
+        "latency": {**percentiles_ms(latencies), "mean_ms": round(float(np.mean(latencies)) * 1000, 2) if latencies else None},
+        "stages": {stage: percentiles_ms(values) for stage, values in collector.stages.items()},
+    }
+
+
+async def main_async(args: argparse.Namespace) -> list[dict[str, Any]]:
+    if args.url:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=None))
+        base_url = args.url
+    else:
+        app = build_app(FakeGeminiLLM(
+            latency_s=args.llm_latency_ms / 1000, jitter=args.llm_jitter, output_tokens=args.output_tokens))
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://load-test"
+
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        # Warmup of models and connections
+        await run(client, argparse.Namespace(**{**vars(args), "requests": 2}), 1, None)
+        loads = [(None, rate) for rate in args.rate] if args.rate else [(concurrency, None) for concurrency in args.concurrency]
+        for concurrency, rate in loads:
+            result = await run(client, args, concurrency, rate)
+            print(json.dumps(result))
+            results.append(result)
+    if not args.url:
+        app.state.rag_assistant.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test /diagnose endpoints with a local stand-in LLM")
+    parser.add_argument("--endpoint", choices=list(ENDPOINTS), default="diagnose")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Closed-loop workers")
+    parser.add_argument("--rate", type=float, nargs="+", help="Open-loop arrival rates (requests/s), overrides --concurrency")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per run")
+    parser.add_argument("--batch-size", type=int, default=16, help="Patients per /diagnose/batch request")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Relative spread of the LLM latency")
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--url", help="Load test a running API instead (its own LLM is used)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=f"logs/load_test_{datetime.now():%Y%m%d_%H%M%S}.json")
+    args = parser.parse_args()
+    logging.getLogger("metrics").setLevel(logging.INFO)
+    logging.getLogger("metrics").propagate = False
+
+    results = asyncio.run(main_async(args))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"created": datetime.now().isoformat(), "args": vars(args), "results": results}, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
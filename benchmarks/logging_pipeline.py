@@ -0,0 +1,72 @@
+"""
+Logging benchmark: caller side latency of synchronous file handlers vs queue mode (logs.attach_handlers)
+for DEBUG records with a retrieved context sized payload. Slow disk is simulated by a write delay.
+
+Usage:
+    uv run python -m benchmarks.logging_pipeline --records 2000 --disk-delay-ms 0 1
+"""
+import argparse, json, logging, os, statistics, tempfile, time
+import logs
+
+PAYLOAD = "Disease: flu. Symptoms: fever (0.9), cough (0.8), headache (0.6).\n" * 80
+
+
+class SlowFileHandler(logging.FileHandler):
+    """File handler with a fixed delay of every write (slow or busy disk)"""
+
+    def __init__(self, filename: str, delay_s: float):
+        super().__init__(filename)
+        self.delay_s = delay_s
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        super().emit(record)
+
+
+def measure(queue_mode: bool, records: int, delay_s: float, sample_rate: float) -> dict:
+    logger = logging.getLogger(f"benchmark.logging.{queue_mode}.{delay_s}.{sample_rate}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logs.LOG_QUEUE, logs.LOG_DEBUG_SAMPLE_RATE = queue_mode, sample_rate
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = SlowFileHandler(os.path.join(tmp, "app.log"), delay_s)
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+        logs.attach_handlers(logger, [handler])
+
+        latencies = []
+        for i in range(records):
+            start = time.perf_counter()
+            logger.debug("Symptoms: %s\nRetrieved context:\n%s", f"fever, cough {i}", PAYLOAD)
+            latencies.append(time.perf_counter() - start)
+        start_flush = time.perf_counter()
+        logs.stop_logging()
+        flush_time = time.perf_counter() - start_flush
+        handler.close()
+        for h in logger.handlers[:]:
+            logger.removeHandler(h)
+
+    latencies.sort()
+    return {
+        "mode": "queue" if queue_mode else "sync",
+        "disk_delay_ms": delay_s * 1000,
+        "debug_sample_rate": sample_rate,
+        "mean_us": round(statistics.mean(latencies) * 1e6, 2),
+        "p99_us": round(latencies[int(len(latencies) * 0.99) - 1] * 1e6, 2),
+        "background_flush_s": round(flush_time, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark synchronous vs queue logging")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--disk-delay-ms", type=float, nargs="+", default=[0, 1])
+    args = parser.parse_args()
+
+    for delay_ms in args.disk_delay_ms:
+        for queue_mode, sample_rate in [(False, 1.0), (True, 1.0), (True, 0.1)]:
+            print(json.dumps(measure(queue_mode, args.records, delay_ms / 1000, sample_rate)))
+
+
+if __name__ == "__main__":
+    main()
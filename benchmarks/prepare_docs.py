@@ -0,0 +1,80 @@
+"""
+Document preparation benchmark: row-by-row iterrows implementation vs vectorized prepare_docs.
+Synthetic datasets are sampled from rows of the project dataset, so symptom density matches real profiles.
+
+Usage:
+    uv run python -m benchmarks.prepare_docs --sizes 85 10000 100000
+"""
+import argparse, json, logging, os, tempfile, time, tracemalloc
+import pandas as pd
+from langchain_core.documents import Document
+from src.rag.process_csv import MetaData, prepare_docs, iter_docs
+
+DATASET_FILENAME = os.getenv("DATASET_FILENAME", "dataset/disease_symptoms.csv")
+
+
+def prepare_docs_iterrows(df: pd.DataFrame, source: str) -> list[Document]:
+    """Previous prepare_docs implementation (reference for output and speed)"""
+    docs = []
+    symptom_cols = df.columns.drop(['prognosis', 'icd_code'])
+
+    for _, row in df.iterrows():
+        disease = row['prognosis']
+        icd_code = row['icd_code']
+        content = [f'Disease: {disease} ICD CODE: {icd_code}',
+                   'Symptoms and probabilities of appearance:']
+
+        symptoms = []
+        for symptom in symptom_cols:
+            if row[symptom] > 0.0:
+                symptoms.append(
+                    f"- {symptom.replace('_', ' ')} {row[symptom]}%")
+
+        doc_content = "\n".join(content + symptoms)
+        doc_metadata = MetaData(
+            disease=disease, icd_code=icd_code, source=source)
+        docs.append(Document(page_content=doc_content, metadata=doc_metadata))
+
+    return docs
+
+
+def measure(fn) -> dict[str, float]:
+    """Wall time and peak traced memory of a single call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"s": round(seconds, 4), "peak_mb": round(peak / 1024 ** 2, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark iterrows vs vectorized document preparation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[85, 10_000, 100_000])
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument("--skip-iterrows-above", type=int, default=100_000,
+                        help="Don't run the slow implementation on larger datasets")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    base = pd.read_csv(DATASET_FILENAME)
+    results = []
+    for size in args.sizes:
+        df = base.sample(n=size, replace=size > len(base), random_state=42).reset_index(drop=True)
+        result = {"size": size, "vectorized": measure(lambda: prepare_docs(df, DATASET_FILENAME))}
+        if size <= args.skip_iterrows_above:
+            result["iterrows"] = measure(lambda: prepare_docs_iterrows(df, DATASET_FILENAME))
+            result["speedup"] = round(result["iterrows"]["s"] / max(result["vectorized"]["s"], 1e-9), 1)
+
+        # Chunked reading - peak memory is bounded by chunk size, not dataset size
+        with tempfile.NamedTemporaryFile(suffix=".csv") as f:
+            df.to_csv(f.name, index=False)
+            result["chunked"] = measure(lambda: sum(len(docs) for docs in iter_docs(f.name, args.chunksize)))
+
+        results.append(result)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
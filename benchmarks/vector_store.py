@@ -0,0 +1,86 @@
+"""
+Vector store backends benchmark: Chroma (persistent, HNSW) vs in-memory NumPy exact search.
+Uses synthetic normalized embeddings, so no embedding model is loaded and only the index is measured.
+
+Usage:
+    uv run python -m benchmarks.vector_store --sizes 85 10000 100000
+"""
+import argparse, json, tempfile, time
+import numpy as np
+from langchain_core.embeddings import FakeEmbeddings
+from src.rag.chroma_store import ChromaStore
+from src.rag.numpy_store import NumpyVectorStore, normalize
+
+
+def percentile_ms(timings: list[float], q: float) -> float:
+    return round(float(np.percentile(timings, q)) * 1000, 4)
+
+
+def time_queries(search, queries: np.ndarray, k: int) -> dict[str, float]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query.tolist(), k)
+        timings.append(time.perf_counter() - start)
+    return {"p50_ms": percentile_ms(timings, 50), "p95_ms": percentile_ms(timings, 95)}
+
+
+def bench_chroma(texts: list[str], vectors: np.ndarray, queries: np.ndarray, k: int) -> dict:
+    with tempfile.TemporaryDirectory() as db_path:
+        start = time.perf_counter()
+        store = ChromaStore(persist_directory=db_path, embedding_function=FakeEmbeddings(size=vectors.shape[1]))
+        batch_size = store.max_batch_size
+        for offset in range(0, len(texts), batch_size):
+            store.collection.add(
+                ids=[str(i) for i in range(offset, min(offset + batch_size, len(texts)))],
+                documents=texts[offset:offset + batch_size],
+                embeddings=vectors[offset:offset + batch_size].tolist())
+        build_s = time.perf_counter() - start
+
+        result = {"build_s": round(build_s, 4), **time_queries(store.similarity_search_by_vector, queries, k)}
+        store.delete_collection()
+        return result
+
+
+def bench_numpy(texts: list[str], vectors: np.ndarray, queries: np.ndarray, k: int, dtype: str) -> dict:
+    start = time.perf_counter()
+    store = NumpyVectorStore(embedding=FakeEmbeddings(size=vectors.shape[1]), dtype=dtype)
+    store.add_embeddings(texts, vectors)
+    build_s = time.perf_counter() - start
+
+    return {
+        "build_s": round(build_s, 4),
+        "memory_mb": round(store.nbytes / 1024 ** 2, 2),
+        **time_queries(store.similarity_search_by_vector, queries, k)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Chroma vs NumPy vector store backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[85, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 is 384)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    queries = normalize(rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+    results = []
+
+    for size in args.sizes:
+        vectors = normalize(rng.standard_normal((size, args.dim)).astype(np.float32))
+        texts = [f"Disease {i}" for i in range(size)]
+
+        for backend, run in [
+            ("chroma", lambda: bench_chroma(texts, vectors, queries, args.k)),
+            ("numpy_float32", lambda: bench_numpy(texts, vectors, queries, args.k, "float32")),
+            ("numpy_float16", lambda: bench_numpy(texts, vectors, queries, args.k, "float16")),
+        ]:
+            result = {"docs": size, "backend": backend, **run()}
+            results.append(result)
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
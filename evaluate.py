@@ -1,70 +1,357 @@
-import logging, os, pandas as pd
+import argparse, json, logging, multiprocessing, os, time
+import numpy as np, pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
 from dotenv import load_dotenv
 from langchain_core.documents import Document
 from sentence_transformers import CrossEncoder
 
-from src.rag.vectors_store import get_vectors_store
+from src.rag.vectors_store import get_vectors_store, similarity_search_with_relevance_scores_by_vectors
+from src.model_registry import get_cross_encoder, get_embeddings
+from src.rag.symptom_retriever import SymptomProbabilityRetriever, merge_candidates
+from src.rag.hybrid_retriever import BM25Index, HybridRetriever
+from src.llm.adaptive_rerank import AdaptiveRerankPolicy, rerank_decision, ADAPTIVE_RERANK_MARGIN
 from logs import init_logging
 
 load_dotenv()
 DATASET_FILENAME = os.getenv("DATASET_FILENAME")
+# Seed of test set sampling, fixed for reproducible runs
+EVAL_SEED = int(os.getenv("EVAL_SEED", 42))
+# Pairs per CrossEncoder forward pass
+EVAL_RERANK_BATCH_SIZE = int(os.getenv("EVAL_RERANK_BATCH_SIZE", 128))
 
 # Set up logging
 metrics_logger = logging.getLogger("metrics")
 
-# Initialize CrossEncoder model
-cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+# Vector store, BM25 index and symptom retriever are shared by all evaluation runs (of a process)
+_vector_store = None
+_bm25_index = None
+_symptom_retriever = None
 
+# Evaluated configurations of the default run
+DEFAULT_CONFIGS = [
+    {"retriever": "dense"},
+    {"retriever": "dense", "rerank": True},
+    {"retriever": "bm25"},
+    {"retriever": "hybrid"},
+    {"retriever": "hybrid", "rerank": True, "rerank_depth": 8},
+    {"retriever": "structured"},
+    {"retriever": "combined"},
+]
+# Adaptive rerank policies evaluated against full reranking of the same dense candidates
+ADAPTIVE_CONFIGS = [
+    {"retriever": "dense", "rerank": True, "adaptive": "skip"},
+    {"retriever": "dense", "rerank": True, "adaptive": "tail"},
+]
 
-def rerank_docs(query: str, docs: list[Document], top_k: int) -> list[Document]:
-    # Reranking
-    pairs = [[query, doc.page_content] for doc in docs]
-    scores = cross_encoder.predict(pairs)
-    scored_docs = sorted(zip(scores, docs), key=lambda x: x[0], reverse=True)
-    # Choose only Top 6 docs
-    top_k_docs = [doc for _, doc in scored_docs[:top_k]]
 
-    return top_k_docs
+def get_eval_vectors_store():
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = get_vectors_store()
+    return _vector_store
 
 
-def recall_evaluation(sample_size: int = 30, k=6, rerank: bool = False) -> None:
-    df = pd.read_csv(DATASET_FILENAME)
+def get_eval_bm25_index() -> BM25Index:
+    global _bm25_index
+    if _bm25_index is None:
+        _bm25_index = BM25Index.from_dataset(DATASET_FILENAME)
+    return _bm25_index
+
+
+def get_eval_symptom_retriever() -> SymptomProbabilityRetriever:
+    global _symptom_retriever
+    if _symptom_retriever is None:
+        _symptom_retriever = SymptomProbabilityRetriever.from_dataset(DATASET_FILENAME, get_embeddings())
+    return _symptom_retriever
+
+
+def build_queries(df: pd.DataFrame) -> list[str]:
+    """Symptom queries ("fever, cough") of all rows at once - non-zero symptoms found over the whole matrix"""
     symptom_cols = df.columns.drop(['prognosis', 'icd_code'])
-    vector_store = get_vectors_store()
-    retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": k if not rerank else k * 2})
+    labels = np.array([symptom.replace('_', ' ') for symptom in symptom_cols], dtype=object)
+    rows, cols = np.nonzero(df[symptom_cols].to_numpy(dtype=np.float64) > 0.0)
+    # np.nonzero is row-major, so symptoms of every row are contiguous
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(df)))])
+    return [", ".join(labels[cols[start:end]]) for start, end in zip(bounds[:-1], bounds[1:])]
 
-    test_set = df.sample(n=sample_size)
-    hits = 0
 
-    for _, row in test_set.iterrows():
-        disease = row['prognosis'].lower()
+def sample_test_set(sample_size: int | None = None, seed: int = EVAL_SEED) -> tuple[list[str], list[str]]:
+    """(diseases, queries) of sample_size dataset rows sampled with the seed (all rows if None)"""
+    df = pd.read_csv(DATASET_FILENAME)
+    if sample_size is not None and sample_size < len(df):
+        df = df.sample(n=sample_size, random_state=seed)
+    return df['prognosis'].str.lower().tolist(), build_queries(df)
 
-        symptoms = []
-        for symptom in symptom_cols:
-            if row[symptom] > 0.0:
-                symptoms.append(symptom.replace('_', ' '))
 
-        query = ", ".join(symptoms)
-        docs = retriever.invoke(query)
-        if rerank:
-            docs = rerank_docs(query, docs, top_k=k)
+def rerank_docs(query: str, docs: list[Document], top_k: int) -> list[Document]:
+    return rerank_many([query], [docs], top_k)[0]
 
-        hit = False
-        for doc in docs:
-            if disease in doc.page_content.lower():
-                hit = True
-                break
 
-        if hit:
-            hits += 1
-        else:
-            logging.info(f"RECALL MISS: rerank={rerank} disease={disease} symptoms={query} retrieved={[doc.metadata for doc in docs]}")
+def rerank_many(
+        queries: list[str],
+        docs_lists: list[list[Document]],
+        top_k: int,
+        cross_encoder: CrossEncoder | None = None,
+        keep_counts: list[int] | None = None) -> list[list[Document]]:
+    """
+    Rerank candidates of all queries - all (query, doc) pairs are scored by CrossEncoder
+    (shared RERANK_MODEL if not given) in EVAL_RERANK_BATCH_SIZE batches, then split back per query.
+    keep_counts: leading candidates of every query kept without reranking (adaptive rerank), only the rest is scored.
+    """
+    keep_counts = keep_counts or [0] * len(docs_lists)
+    tails = [docs[keep:] if rerank_decision(keep, len(docs), top_k) != "skip" else []
+             for docs, keep in zip(docs_lists, keep_counts)]
+    pairs = [[query, doc.page_content] for query, tail in zip(queries, tails) for doc in tail]
+    if pairs:
+        cross_encoder = cross_encoder if cross_encoder is not None else get_cross_encoder()
+        scores = cross_encoder.predict(pairs, batch_size=EVAL_RERANK_BATCH_SIZE)
+    reranked = []
+    offset = 0
+    for docs, tail, keep in zip(docs_lists, tails, keep_counts):
+        tail_scores = np.asarray(scores[offset:offset + len(tail)]) if tail else np.empty(0)
+        offset += len(tail)
+        order = np.argsort(-tail_scores, kind="stable")[:max(top_k - keep, 0)]
+        reranked.append((docs[:keep] + [tail[i] for i in order])[:top_k])
+    return reranked
 
-    recall = hits / sample_size
-    metrics_logger.info(f"RECALL EVALUATION: rerank={rerank} sample_size={sample_size} k={k} hits={hits} recall={recall:.2%}")
 
+def load_components(retriever: str, rerank: bool) -> None:
+    """Load models and indexes of the configuration, so they don't count in latency"""
+    if retriever in ("dense", "hybrid", "combined"):
+        get_eval_vectors_store()
+    if retriever in ("bm25", "hybrid"):
+        get_eval_bm25_index()
+    if retriever in ("structured", "combined"):
+        get_eval_symptom_retriever()
+    if rerank:
+        get_cross_encoder()
+
+
+def retrieve_many(
+        queries: list[str],
+        retriever: str,
+        candidates_k: int,
+        k: int,
+        timings: dict[str, float]) -> tuple[list[list[Document]], list[list[float]] | None]:
+    """
+    Candidates of all queries - one embedding call and one bulk vector search for dense based retrievers.
+    Relevance scores of candidates are returned for the dense retriever (None for others).
+    """
+    dense_lists, scores_lists = [], None
+    if retriever in ("dense", "hybrid", "combined"):
+        start = time.perf_counter()
+        embeddings = get_eval_vectors_store().embeddings.embed_documents(queries)
+        timings["embedding_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        results = similarity_search_with_relevance_scores_by_vectors(get_eval_vectors_store(), embeddings, candidates_k)
+        dense_lists = [[doc for doc, _ in docs_and_scores] for docs_and_scores in results]
+        timings["search_s"] = time.perf_counter() - start
+        if retriever == "dense":
+            scores_lists = [[score for _, score in docs_and_scores] for docs_and_scores in results]
+
+    start = time.perf_counter()
+    if retriever == "dense":
+        docs_lists = dense_lists
+    elif retriever == "bm25":
+        docs_lists = [get_eval_bm25_index().search(query, candidates_k) for query in queries]
+    elif retriever == "hybrid":
+        hybrid_retriever = HybridRetriever(
+            vectors_store=get_eval_vectors_store(), bm25=get_eval_bm25_index(), k=candidates_k, fetch_k=candidates_k)
+        docs_lists = [hybrid_retriever.fuse(query, docs) for query, docs in zip(queries, dense_lists)]
+    elif retriever == "structured":
+        docs_lists = get_eval_symptom_retriever().batch_search(queries, k=candidates_k)
+    elif retriever == "combined":
+        structured_lists = get_eval_symptom_retriever().batch_search(queries, k=k)
+        docs_lists = [merge_candidates(dense, structured) for dense, structured in zip(dense_lists, structured_lists)]
+    else:
+        raise ValueError(f"Unknown retriever: '{retriever}'")
+    timings["search_s"] = timings.get("search_s", 0.0) + time.perf_counter() - start
+    return docs_lists, scores_lists
+
+
+def first_hit_rank(disease: str, docs: list[Document]) -> int | None:
+    """1-based rank of the first document of the disease"""
+    for rank, doc in enumerate(docs, start=1):
+        if disease in doc.page_content.lower():
+            return rank
+    return None
+
+
+def recall_mrr(diseases: list[str], docs_lists: list[list[Document]], k: int) -> tuple[float, float]:
+    ranks = [first_hit_rank(disease, docs[:k]) for disease, docs in zip(diseases, docs_lists)]
+    return sum(rank is not None for rank in ranks) / len(ranks), sum(1 / rank for rank in ranks if rank is not None) / len(ranks)
+
+
+def evaluate(
+        sample_size: int | None = 30,
+        k: int = 6,
+        rerank: bool = False,
+        retriever: str = "dense",
+        rerank_depth: int | None = None,
+        seed: int = EVAL_SEED,
+        adaptive: str | None = None,
+        margin: float = ADAPTIVE_RERANK_MARGIN) -> dict[str, Any]:
+    """
+    Recall@k and MRR@k of retrieval on symptoms of dataset rows (sampled with the seed).
+    retriever: "dense" (vector store), "bm25", "hybrid" (dense + BM25 with reciprocal rank fusion),
+    "structured" (symptom-probability retriever) or "combined" (dense and structured candidates,
+    always reranked to k as in the diagnosis pipeline).
+    rerank_depth: number of candidates retrieved for reranking (default k * 2).
+    adaptive: adaptive rerank policy ("skip" or "tail", dense retriever with rerank only) with the margin,
+    its recall cost is reported against full reranking of the same candidates.
+    All queries are retrieved and reranked in batches, latency is reported per query.
+    """
+    if adaptive is not None and (retriever != "dense" or not rerank):
+        raise ValueError("Adaptive rerank is evaluated only for the dense retriever with reranking")
+    diseases, queries = sample_test_set(sample_size, seed)
+    rerank = rerank or retriever == "combined"
+    candidates_k = k if not rerank else rerank_depth or k * 2
+
+    load_components(retriever, rerank)
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+    candidates, scores_lists = retrieve_many(queries, retriever, candidates_k, k, timings)
+    docs_lists = candidates
+    keep_counts = None
+    if rerank:
+        start_rerank = time.perf_counter()
+        if adaptive is not None:
+            policy = AdaptiveRerankPolicy(adaptive, margin)
+            keep_counts = [policy.keep_count(scores, k) for scores in scores_lists]
+        docs_lists = rerank_many(queries, candidates, top_k=k, keep_counts=keep_counts)
+        timings["rerank_s"] = time.perf_counter() - start_rerank
+    timings["total_s"] = time.perf_counter() - start
+
+    ranks = []
+    for disease, query, docs in zip(diseases, queries, docs_lists):
+        rank = first_hit_rank(disease, docs[:k])
+        ranks.append(rank)
+        if rank is None:
+            logging.info(f"RECALL MISS: retriever={retriever} rerank={rerank} disease={disease} symptoms={query} retrieved={[doc.metadata for doc in docs]}")
+
+    hits = sum(rank is not None for rank in ranks)
+    result = {
+        "retriever": retriever,
+        "rerank": rerank,
+        "candidates": candidates_k,
+        "sample_size": len(queries),
+        "k": k,
+        "seed": seed,
+        "hits": hits,
+        "recall": hits / len(queries),
+        "mrr": sum(1 / rank for rank in ranks if rank is not None) / len(queries),
+        "latency_per_query_ms": {name.removesuffix("_s"): round(value / len(queries) * 1000, 3) for name, value in timings.items()},
+        "total_s": round(timings["total_s"], 4),
+    }
+    if adaptive is not None:
+        result["adaptive"] = evaluate_adaptive_cost(result, diseases, queries, candidates, keep_counts, adaptive, margin)
+    return result
+
+
+def evaluate_adaptive_cost(
+        result: dict[str, Any],
+        diseases: list[str],
+        queries: list[str],
+        candidates: list[list[Document]],
+        keep_counts: list[int],
+        mode: str,
+        margin: float) -> dict[str, Any]:
+    """Rerank paths of the adaptive policy, and its recall / MRR / rerank latency against full reranking"""
+    k = result["k"]
+    start = time.perf_counter()
+    full_lists = rerank_many(queries, candidates, top_k=k)
+    full_rerank_s = time.perf_counter() - start
+    recall_full, mrr_full = recall_mrr(diseases, full_lists, k)
+
+    paths = {"full": 0, "tail": 0, "skip": 0}
+    pairs = 0
+    for docs, keep in zip(candidates, keep_counts):
+        path = rerank_decision(keep, len(docs), k)
+        paths[path] += 1
+        pairs += len(docs) - keep if path != "skip" else 0
+    return {
+        "mode": mode,
+        "margin": margin,
+        "paths": paths,
+        "pairs_scored": round(pairs / max(sum(len(docs) for docs in candidates), 1), 4),
+        "recall_full": recall_full,
+        "mrr_full": mrr_full,
+        "recall_cost": recall_full - result["recall"],
+        "mrr_cost": mrr_full - result["mrr"],
+        "rerank_full_ms": round(full_rerank_s / len(queries) * 1000, 3),
+    }
+
+
+def log_result(result: dict[str, Any]) -> None:
+    metrics_logger.info(
+        f"RECALL EVALUATION: retriever={result['retriever']} rerank={result['rerank']} candidates={result['candidates']} "
+        f"sample_size={result['sample_size']} k={result['k']} seed={result['seed']} hits={result['hits']} "
+        f"recall={result['recall']:.2%} mrr={result['mrr']:.4f} "
+        f"latency_ms={json.dumps(result['latency_per_query_ms'], separators=(',', ':'))}"
+        + (format_adaptive(result["adaptive"]) if "adaptive" in result else ""))
+
+
+def format_adaptive(adaptive: dict[str, Any]) -> str:
+    return (f" adaptive={adaptive['mode']} margin={adaptive['margin']} "
+            f"paths={json.dumps(adaptive['paths'], separators=(',', ':'))} pairs_scored={adaptive['pairs_scored']:.2%} "
+            f"recall_full={adaptive['recall_full']:.2%} recall_cost={adaptive['recall_cost']:.2%} "
+            f"mrr_cost={adaptive['mrr_cost']:.4f} rerank_full_ms={adaptive['rerank_full_ms']}")
+
+
+def recall_evaluation(
+        sample_size: int | None = 30,
+        k=6,
+        rerank: bool = False,
+        retriever: str = "dense",
+        rerank_depth: int | None = None,
+        seed: int = EVAL_SEED,
+        adaptive: str | None = None,
+        margin: float = ADAPTIVE_RERANK_MARGIN) -> dict[str, Any]:
+    """Evaluate a single configuration and log its result"""
+    result = evaluate(sample_size, k, rerank, retriever, rerank_depth, seed, adaptive, margin)
+    log_result(result)
+    return result
+
+
+def run_evaluations(configs: list[dict[str, Any]], workers: int = 1, **common: Any) -> list[dict[str, Any]]:
+    """
+    Evaluate independent configurations (evaluate kwargs, common ones added to all), results in input order.
+    With workers > 1 configurations run in a process pool, every worker loads its own models.
+    """
+    configs = [{**common, **config} for config in configs]
+    if workers <= 1:
+        results = [evaluate(**config) for config in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(_evaluate_config, configs))
+    for result in results:
+        log_result(result)
+    return results
+
+
+def _evaluate_config(config: dict[str, Any]) -> dict[str, Any]:
+    return evaluate(**config)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall@k / MRR evaluation of retrieval configurations")
+    parser.add_argument("--sample-size", type=int, default=None, help="Sampled diseases (default: all)")
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=EVAL_SEED)
+    parser.add_argument("--workers", type=int, default=1, help="Processes evaluating configurations in parallel")
+    parser.add_argument("--margins", type=float, nargs="+", default=[ADAPTIVE_RERANK_MARGIN],
+                        help="Relevance score margins of adaptive rerank policies")
+    args = parser.parse_args()
 
-if __name__ == '__main__':
     init_logging()
-    recall_evaluation(sample_size=80, k=6)
-    recall_evaluation(sample_size=80, k=6, rerank=True)
+    start = time.perf_counter()
+    configs = DEFAULT_CONFIGS + [{**config, "margin": margin} for margin in args.margins for config in ADAPTIVE_CONFIGS]
+    results = run_evaluations(configs, workers=args.workers, sample_size=args.sample_size, k=args.k, seed=args.seed)
+    for result in results:
+        print(json.dumps(result))
+    print(f"Evaluated {len(results)} configurations in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,92 @@
-import logging, os, sys
+import atexit, logging, os, queue, random, sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from dotenv import load_dotenv
+
+load_dotenv()
 
 LOG_FILE = "logs/app.log"
 METRICS_FILE = "logs/metrics.log"
+TRACES_FILE = os.getenv("TRACES_FILE", "logs/traces.jsonl")
+# Queue mode: loggers only enqueue records, a background listener thread formats and writes them
+LOG_QUEUE = os.getenv("LOG_QUEUE", "true").lower() == "true"
+# Size based rotation of log files (0 - no rotation)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+# Fraction of DEBUG records which are logged (payloads like retrieved context are large)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0))
+
+# Listeners of queue mode, stopped (queues flushed) at exit
+_listeners: list[QueueListener] = []
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler which leaves formatting to the listener thread.
+    Records are passed as they are (in-process queue), so the message is built by the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Pass all records above DEBUG and a random sample (rate) of DEBUG records"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+def file_handler(filename: str, fmt: str) -> logging.Handler:
+    handler = RotatingFileHandler(filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(fmt))
+    return handler
+
+
+def attach_handlers(logger: logging.Logger, handlers: list[logging.Handler]) -> None:
+    """
+    Attach handlers to the logger, in queue mode behind a single DeferredQueueHandler
+    served by its own QueueListener thread.
+    """
+    sampling_filter = DebugSamplingFilter(LOG_DEBUG_SAMPLE_RATE)
+    if not LOG_QUEUE:
+        for handler in handlers:
+            handler.addFilter(sampling_filter)
+            logger.addHandler(handler)
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(sampling_filter)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    logger.addHandler(queue_handler)
+
+
+def stop_logging() -> None:
+    """Write all queued records and stop listener threads"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(stop_logging)
 
 
 def init_logging():
     # Logs configuration
     os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler(LOG_FILE)
-        ]
-    )
+    root_logger = logging.getLogger()
+    if not root_logger.handlers:
+        root_logger.setLevel(logging.INFO)
+        log_format = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter(log_format))
+        attach_handlers(root_logger, [stream_handler, file_handler(LOG_FILE, log_format)])
 
     logging.getLogger("src").setLevel(logging.DEBUG)
     # Separate logger for metrics
@@ -23,7 +94,16 @@ def init_logging():
     metrics_logger.setLevel(logging.INFO)
     metrics_logger.propagate = False
 
-    if not metrics_logger.handlers:
-        metrics_handler = logging.FileHandler(METRICS_FILE)
-        metrics_handler.setFormatter(logging.Formatter("%(asctime)s: %(message)s"))
-        metrics_logger.addHandler(metrics_handler)
+    # Metrics log lines are optional, metrics are always exposed at /metrics
+    if os.getenv("METRICS_LOG", "true").lower() != "true":
+        metrics_logger.disabled = True
+    elif not metrics_logger.handlers:
+        attach_handlers(metrics_logger, [file_handler(METRICS_FILE, "%(asctime)s: %(message)s")])
+
+    # Completed traces, one JSON object per line
+    traces_logger = logging.getLogger("traces")
+    traces_logger.setLevel(logging.INFO)
+    traces_logger.propagate = False
+    if not traces_logger.handlers:
+        attach_handlers(traces_logger, [file_handler(TRACES_FILE, "%(message)s")])
+
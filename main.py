@@ -1,10 +1,10 @@
-import os, uvicorn, gradio as gr
+import asyncio, os, uvicorn, gradio as gr
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from src.rag.vectors_store import get_vectors_store
-from src.llm import DiagnosisAssistant
-from src.routes import diagnosis
+from src.llm.tools import register_diagnosis_assistant, close_http_client
+from src.routes import diagnosis, health, metrics
+from src.startup import StartupState, load_models, STARTUP_MODE
 from src.ui import ChatAgentUI
 from logs import init_logging
 
@@ -17,14 +17,24 @@ LOCAL_MODEL = os.getenv("LOCAL_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
 # API initialization
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    vectors_store = get_vectors_store()
-    rag_assistant = DiagnosisAssistant(vectors_store=vectors_store)
-    app.state.rag_assistant = rag_assistant
+    # Models are loaded in parallel, in background mode the server accepts traffic right away
+    app.state.startup = StartupState()
+    loading = asyncio.create_task(load_models(app, chat_ui.chat_agent, app.state.startup))
+    loading.add_done_callback(app.state.startup.task_done)
+    if STARTUP_MODE != "background":
+        await loading
     yield
+    loading.cancel()
+    register_diagnosis_assistant(None)
+    await close_http_client()
+    if hasattr(app.state, "rag_assistant"):
+        app.state.rag_assistant.close()
 
 
 app = FastAPI(lifespan=lifespan)
+app.include_router(health.router)
 app.include_router(diagnosis.router)
+app.include_router(metrics.router)
 
 # UI layer above API with chat local agent
 chat_ui = ChatAgentUI(local_model=LOCAL_MODEL)
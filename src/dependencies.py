@@ -1,6 +1,6 @@
 import logging
 
-from fastapi import Request
+from fastapi import Request, HTTPException
 
 from src.llm import DiagnosisAssistant
 
@@ -9,6 +9,13 @@ logger = logging.getLogger(__name__)
 
 def get_rag_assistant(request: Request) -> DiagnosisAssistant:
     if not hasattr(request.app.state, "rag_assistant"):
+        startup = getattr(request.app.state, "startup", None)
+        # Background startup still loading models
+        if startup is not None and not startup.failed:
+            raise HTTPException(
+                status_code=503,
+                detail="RAG Diagnosis Assistant is warming up, try again later",
+                headers={"Retry-After": "5"})
         logger.error("RAG Diagnosis Assistant not initialized")
         raise RuntimeError("RAG Diagnosis Assistant not initialized")
     return request.app.state.rag_assistant
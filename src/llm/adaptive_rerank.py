@@ -0,0 +1,48 @@
+import os
+from typing import Sequence
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Adaptive rerank policy: "off" (all candidates are reranked), "skip" or "tail", see AdaptiveRerankPolicy
+ADAPTIVE_RERANK = os.getenv("ADAPTIVE_RERANK", "off")
+# Min gap of retrieval relevance scores (0-1) considered a confident separation of candidates
+ADAPTIVE_RERANK_MARGIN = float(os.getenv("ADAPTIVE_RERANK_MARGIN", 0.05))
+
+ADAPTIVE_RERANK_MODES = ("skip", "tail")
+
+
+def rerank_decision(keep: int, candidates: int, top_k: int) -> str:
+    """
+    Path of a rerank decision: "full" (all candidates reranked), "tail" (leading candidates kept,
+    the rest reranked) or "skip" (retrieval order used as is).
+    """
+    if keep == 0:
+        return "full"
+    return "skip" if keep >= min(top_k, candidates) else "tail"
+
+
+class AdaptiveRerankPolicy:
+    """
+    Decides how many leading candidates are kept in retrieval order without CrossEncoder scoring,
+    from their retrieval relevance scores (descending):
+    "skip" - nothing is reranked when the best candidate leads the second one by at least margin,
+    "tail" - candidates above the last gap of at least margin within top_k are kept,
+             only the candidates below the gap are reranked for the remaining context slots.
+    """
+
+    def __init__(self, mode: str = ADAPTIVE_RERANK, margin: float = ADAPTIVE_RERANK_MARGIN):
+        if mode not in ADAPTIVE_RERANK_MODES:
+            raise ValueError(f"Unknown adaptive rerank mode: '{mode}'")
+        self.mode = mode
+        self.margin = margin
+
+    def keep_count(self, scores: Sequence[float], top_k: int) -> int:
+        """Number of leading candidates kept without reranking (0 - all candidates are reranked)"""
+        if len(scores) < 2:
+            return len(scores)
+        if self.mode == "skip":
+            return top_k if scores[0] - scores[1] >= self.margin else 0
+
+        gaps = [i for i in range(1, min(top_k, len(scores) - 1) + 1) if scores[i - 1] - scores[i] >= self.margin]
+        return gaps[-1] if gaps else 0
@@ -0,0 +1,179 @@
+import abc, hashlib, json, logging, os, sqlite3, threading, time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from src.schemas import DiagnoseResponse, SymptomsInput
+from src.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("metrics")
+
+load_dotenv()
+
+# Cache backend: "memory" (LRU with TTL), "sqlite" (local file) or "none"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL_S = float(os.getenv("CACHE_TTL_S", 3600))
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", 1024))
+# Patients with age in the same bucket (e.g. 20-29 for bucket of 10 years) share cache entries
+CACHE_AGE_BUCKET = int(os.getenv("CACHE_AGE_BUCKET", 10))
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "cache/diagnosis_cache.db")
+
+
+def make_cache_key(patient_info: SymptomsInput, age_bucket: int = CACHE_AGE_BUCKET) -> str:
+    """
+    Build cache key from normalized patient input:
+    lower-cased, sorted and de-duplicated symptoms, gender and age bucket.
+    """
+    symptoms = sorted({symptom.strip().lower() for symptom in patient_info.symptoms if symptom.strip()})
+    key_data = {
+        "symptoms": symptoms,
+        "gender": patient_info.gender,
+        "age_bucket": patient_info.age // max(age_bucket, 1),
+    }
+    return hashlib.sha256(json.dumps(key_data).encode()).hexdigest()
+
+
+class DiagnosisCache(abc.ABC):
+    """
+    Base class for diagnosis result caches.
+    Subclasses implement _get and _set guarded by self._lock, hit/miss counting is done here.
+    """
+    backend = "base"
+
+    def __init__(self, ttl_s: float = CACHE_TTL_S, max_size: int = CACHE_MAX_SIZE):
+        self.ttl_s = ttl_s
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _get(self, key: str) -> DiagnoseResponse | None:
+        ...
+
+    @abc.abstractmethod
+    def _set(self, key: str, value: DiagnoseResponse) -> None:
+        ...
+
+    def get(self, key: str) -> DiagnoseResponse | None:
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            hits, misses = self.hits, self.misses
+        CACHE_REQUESTS.inc(backend=self.backend, result="hit" if value is not None else "miss")
+
+        log_data = {
+            "backend": self.backend,
+            "hit": value is not None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4),
+        }
+        metrics_logger.info(f"DIAGNOSE CACHE: {json.dumps(log_data)}")
+        return value
+
+    def set(self, key: str, value: DiagnoseResponse) -> None:
+        self._set(key, value)
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryCache(DiagnosisCache):
+    """
+    Thread-safe in-memory LRU cache with TTL.
+    """
+    backend = "memory"
+
+    def __init__(self, ttl_s: float = CACHE_TTL_S, max_size: int = CACHE_MAX_SIZE):
+        super().__init__(ttl_s, max_size)
+        self._items: OrderedDict[str, tuple[float, DiagnoseResponse]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _get(self, key: str) -> DiagnoseResponse | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value.model_copy(deep=True)
+
+    def _set(self, key: str, value: DiagnoseResponse) -> None:
+        with self._lock:
+            self._items[key] = (time.time() + self.ttl_s, value.model_copy(deep=True))
+            self._items.move_to_end(key)
+            # Evict least recently used entries
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class SQLiteCache(DiagnosisCache):
+    """
+    Local SQLite cache, keeps results between restarts.
+    """
+    backend = "sqlite"
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, ttl_s: float = CACHE_TTL_S, max_size: int = CACHE_MAX_SIZE):
+        super().__init__(ttl_s, max_size)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS diagnosis_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)")
+
+    def _get(self, key: str) -> DiagnoseResponse | None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM diagnosis_cache WHERE key = ? AND expires_at >= ?", (key, now)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE diagnosis_cache SET used_at = ? WHERE key = ?", (now, key))
+
+        return DiagnoseResponse.model_validate_json(row[0])
+
+    def _set(self, key: str, value: DiagnoseResponse) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO diagnosis_cache (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value.model_dump_json(), now + self.ttl_s, now))
+            # Drop expired entries and least recently used entries over the size limit
+            self._conn.execute("DELETE FROM diagnosis_cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM diagnosis_cache WHERE key NOT IN "
+                "(SELECT key FROM diagnosis_cache ORDER BY used_at DESC LIMIT ?)", (self.max_size,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def get_diagnosis_cache() -> DiagnosisCache | None:
+    """
+    Create diagnosis cache specified in CACHE_BACKEND env. variable.
+    """
+    if CACHE_BACKEND == "memory":
+        cache = InMemoryCache()
+    elif CACHE_BACKEND == "sqlite":
+        cache = SQLiteCache()
+    elif CACHE_BACKEND == "none":
+        logger.info("Diagnosis cache disabled")
+        return None
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: '{CACHE_BACKEND}'")
+
+    logger.info(f"Diagnosis cache initialized: backend={cache.backend} ttl_s={cache.ttl_s} max_size={cache.max_size}")
+    return cache
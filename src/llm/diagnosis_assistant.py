@@ -1,11 +1,27 @@
-import logging, os, time, json
+import asyncio, logging, os, time, json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator
 from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessageChunk
+from langchain_core.prompt_values import PromptValue
+from langchain_core.utils.json import parse_json_markdown, parse_partial_json
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from sentence_transformers import CrossEncoder
-from langchain_chroma import Chroma
-from src.schemas import DiagnoseResponse, SymptomsInput
+from langchain_core.vectorstores import VectorStore
+from src.schemas import DiagnoseResponse, DiseaseDetails, SymptomsInput, BatchDiagnoseItem, BatchDiagnoseResponse
+from src.rag.vectors_store import similarity_search_by_vectors, similarity_search_with_relevance_scores_by_vectors, DATASET_FILENAME
+from src.rag.hybrid_retriever import HybridRetriever, build_retriever
+from src.rag.symptom_retriever import SymptomProbabilityRetriever, merge_candidates
+from src.llm.cache import DiagnosisCache, make_cache_key
+from src.llm.rerank_batcher import RerankBatcher, RERANK_BATCHING
+from src.llm.adaptive_rerank import AdaptiveRerankPolicy, rerank_decision, ADAPTIVE_RERANK
 from src.llm.guardrails import run_guardrails, SecurityError
+from src.model_registry import get_cross_encoder, RERANK_MODEL
+from src.metrics import observe_latency, count_tokens, RERANK_PATHS
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 metrics_logger = logging.getLogger("metrics")
@@ -13,7 +29,17 @@ metrics_logger = logging.getLogger("metrics")
 load_dotenv()
 
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-RERANK_MODEL = os.getenv("RERANK_MODEL", 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+# Max threads for CPU-bound stages (embedding, vector search, reranking) of async requests
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", 4))
+# Max concurrent Gemini calls of a single batch request
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", 8))
+# Candidate retriever: "dense" or "hybrid" (dense + BM25 fused with reciprocal rank fusion)
+RETRIEVER_TYPE = os.getenv("RETRIEVER_TYPE", "dense")
+# Docs fetched from every source of hybrid retriever
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", 12))
+# Number of candidates reranked by CrossEncoder and number of reranked docs used as LLM context
+RERANK_DEPTH = int(os.getenv("RERANK_DEPTH", RETRIEVAL_K))
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", 6))
 SYSTEM = """
 ## ROLE
 You are highly capable medical assistant. Your task is to analyze patient symptoms, 
@@ -55,73 +81,455 @@ class DiagnosisAssistant:
     RAG diagnosis assistant based on GEMINI model.
     """
 
-    def __init__(self, vectors_store: Chroma):
+    def __init__(
+            self,
+            vectors_store: VectorStore,
+            cache: DiagnosisCache | None = None,
+            cross_encoder: CrossEncoder | None = None,
+            symptom_retriever: SymptomProbabilityRetriever | None = None):
         model = ChatGoogleGenerativeAI(
             model=GEMINI_MODEL,
             temperature=0.2
         )
         self.llm = model.with_structured_output(DiagnoseResponse, include_raw=True)
-        self.retriever = vectors_store.as_retriever(search_type="similarity", search_kwargs={"k": 12})
-        self.cross_encoder = CrossEncoder(RERANK_MODEL)
+        # JSON mode model for streaming, structured output via tool call can't be parsed incrementally
+        self.json_llm = model.bind(response_mime_type="application/json", response_schema=DiagnoseResponse.model_json_schema())
+        self.vectors_store = vectors_store
+        self.retriever = build_retriever(vectors_store, RETRIEVER_TYPE, k=RERANK_DEPTH, fetch_k=RETRIEVAL_K, dataset_filename=DATASET_FILENAME)
+        self.cross_encoder = cross_encoder if cross_encoder is not None else get_cross_encoder(RERANK_MODEL)
+        # Optional structured retriever, its candidates are added to the dense ones before reranking
+        self.symptom_retriever = symptom_retriever
+        self.cache = cache
+        # Bounded pool keeps CPU-bound work off the event loop without oversubscribing the CPU
+        self.executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="diagnosis-cpu")
+        # Optional micro-batching of rerank pairs across concurrent requests
+        self.rerank_batcher = RerankBatcher(self.cross_encoder, self.executor) if RERANK_BATCHING else None
+        # Optional adaptive rerank, needs comparable relevance scores of dense retrieval
+        self.adaptive_rerank = None
+        if ADAPTIVE_RERANK != "off":
+            if RETRIEVER_TYPE == "dense" and symptom_retriever is None:
+                self.adaptive_rerank = AdaptiveRerankPolicy(ADAPTIVE_RERANK)
+            else:
+                logger.warning("ADAPTIVE_RERANK needs dense retrieval without symptom retriever, all candidates are reranked")
         logger.info(f"DiagnosisAssistant initialized with model: {GEMINI_MODEL}")
 
-    def diagnose(self, patient_info: SymptomsInput) -> DiagnoseResponse:
+    def close(self) -> None:
+        """Release the CPU executor threads, rerank batcher and the cache"""
+        if self.rerank_batcher is not None:
+            self.rerank_batcher.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
+
+    def _retrieve(self, symptoms: str) -> tuple[list[Document], list[float] | None]:
         """
-        Diagnose patient based on symptoms using RAG based gemini model.
+        Dense or hybrid retrieval of RERANK_DEPTH candidates, extended with symptom retriever candidates if enabled.
+        With adaptive rerank, dense candidates are returned with their relevance scores.
         """
-        start_time = time.time()
+        if self.adaptive_rerank is not None:
+            embedding = self.vectors_store.embeddings.embed_query(symptoms)
+            docs_and_scores = similarity_search_with_relevance_scores_by_vectors(self.vectors_store, [embedding], RERANK_DEPTH)[0]
+            return [doc for doc, _ in docs_and_scores], [score for _, score in docs_and_scores]
 
-        # Guardrails check
-        run_guardrails(patient_info.__str__())
+        docs = self.retriever.invoke(symptoms)
+        if self.symptom_retriever is not None:
+            docs = merge_candidates(docs, self.symptom_retriever.invoke(symptoms))
+        return docs, None
 
-        symptoms = ", ".join(patient_info.symptoms)
+    def _rerank_plan(self, docs: list[Document], scores: list[float] | None) -> tuple[int, str]:
+        """
+        Number of leading docs kept without reranking (adaptive rerank policy) and the rerank path taken.
+        """
+        keep = self.adaptive_rerank.keep_count(scores, CONTEXT_TOP_K) if self.adaptive_rerank and scores is not None else 0
+        path = rerank_decision(keep, len(docs), CONTEXT_TOP_K)
+        RERANK_PATHS.inc(path=path)
+        return keep, path
 
-        # Retrieval
-        start_retrieval = time.time()
-        docs = self.retriever.invoke(symptoms)
-        retrieval_time = time.time() - start_retrieval
+    def _rerank(self, symptoms: str, docs: list[Document], scores: list[float] | None = None) -> tuple[list[Document], str]:
+        """
+        Rerank retrieved documents with CrossEncoder and choose only Top CONTEXT_TOP_K docs.
+        """
+        reranked, paths = self._rerank_many([symptoms], [docs], [scores])
+        return reranked[0], paths[0]
 
-        # Reranking
-        start_rerank = time.time()
-        pairs = [[symptoms, doc.page_content] for doc in docs]
-        scores = self.cross_encoder.predict(pairs)
+    def _rerank_many(
+            self,
+            queries: list[str],
+            docs_lists: list[list[Document]],
+            scores_lists: list[list[float] | None] | None = None) -> tuple[list[list[Document]], list[str]]:
+        """
+        Rerank documents of many queries with a single CrossEncoder forward pass over all (query, doc) pairs.
+        With adaptive rerank, only docs after the confident leading ones are scored.
+        Returns reranked docs and the rerank path of every query.
+        """
+        plans = [self._rerank_plan(docs, scores) for docs, scores in zip(docs_lists, scores_lists or [None] * len(docs_lists))]
+        tails = [docs[keep:] if path != "skip" else [] for docs, (keep, path) in zip(docs_lists, plans)]
+        pairs = [[query, doc.page_content] for query, tail in zip(queries, tails) for doc in tail]
+        scores = self.cross_encoder.predict(pairs) if pairs else []
+
+        reranked = []
+        offset = 0
+        for docs, tail, (keep, _) in zip(docs_lists, tails, plans):
+            reranked.append(self._merge_reranked(docs, keep, tail, scores[offset:offset + len(tail)]))
+            offset += len(tail)
+
+        return reranked, [path for _, path in plans]
+
+    @staticmethod
+    def _top_k_by_scores(docs: list[Document], scores, top_k: int = CONTEXT_TOP_K) -> list[Document]:
         scored_docs = sorted(zip(scores, docs), key=lambda x: x[0], reverse=True)
-        # Choose only Top 6 docs
-        top_k_docs = [doc for _, doc in scored_docs[:6]]
+        return [doc for _, doc in scored_docs[:top_k]]
+
+    def _merge_reranked(self, docs: list[Document], keep: int, tail: list[Document], tail_scores) -> list[Document]:
+        """Kept leading docs followed by the best reranked tail docs, Top CONTEXT_TOP_K in total"""
+        return (docs[:keep] + self._top_k_by_scores(tail, tail_scores, max(CONTEXT_TOP_K - keep, 0)))[:CONTEXT_TOP_K]
+
+    async def _arerank(self, symptoms: str, docs: list[Document], scores: list[float] | None = None) -> tuple[list[Document], str]:
+        """
+        Async reranking, pairs are scored by the rerank batcher (if enabled) or on the CPU executor.
+        """
+        if self.rerank_batcher is None:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._rerank, symptoms, docs, scores)
 
-        rerank_time = time.time() - start_rerank
-        total_retrieval_time = retrieval_time + rerank_time
+        keep, path = self._rerank_plan(docs, scores)
+        tail = docs[keep:] if path != "skip" else []
+        tail_scores = await self.rerank_batcher.predict([[symptoms, doc.page_content] for doc in tail]) if tail else []
+        return self._merge_reranked(docs, keep, tail, tail_scores), path
 
-        context = "\n\n".join([doc.page_content for doc in top_k_docs])
-        logger.debug(f"Symptoms: {symptoms}\nRetrieved context:\n{context}")
+    @staticmethod
+    def _build_prompt(patient_info: SymptomsInput, symptoms: str, docs: list[Document]) -> PromptValue:
+        context = "\n\n".join([doc.page_content for doc in docs])
+        # Lazy formatting, message is built by the logging listener (and only for sampled records)
+        logger.debug("Symptoms: %s\nRetrieved context:\n%s", symptoms, context)
 
-        # LLM
-        prompt = prompt_template.invoke({
+        return prompt_template.invoke({
             "gender": patient_info.gender,
             "age": patient_info.age,
             "symptoms": symptoms,
             "context": context
         })
-        start_llm = time.time()
-        response = self.llm.invoke(prompt)
-        llm_time = time.time() - start_llm
+
+    @staticmethod
+    def _log_metrics(
+            docs_count: int,
+            latency: dict[str, float],
+            token_usage: dict | None,
+            pipeline: str = "diagnose",
+            rerank_path: str | None = None) -> None:
+        observe_latency(pipeline, latency)
+        count_tokens(GEMINI_MODEL, token_usage)
+        log_data = {
+            "model": GEMINI_MODEL,
+            "context_docs_count": docs_count,
+            "rerank_path": rerank_path,
+            "latency": {name: round(value, 4) for name, value in latency.items()},
+            "token_usage": token_usage
+        }
+
+        metrics_logger.info(f"DIAGNOSE METRICS: {json.dumps(log_data)}")
+
+    def diagnose(self, patient_info: SymptomsInput, use_cache: bool = True) -> DiagnoseResponse:
+        """
+        Diagnose patient based on symptoms using RAG based gemini model.
+        """
+        with span("diagnose") as total_span:
+            # Guardrails check
+            with span("guardrails"):
+                run_guardrails(patient_info.__str__())
+
+            # Cache lookup
+            cache_key = make_cache_key(patient_info)
+            if use_cache and self.cache is not None and (cached := self.cache.get(cache_key)):
+                total_span.set(cache_hit=True)
+                return cached
+
+            symptoms = ", ".join(patient_info.symptoms)
+
+            # Retrieval
+            with span("retrieval") as retrieval_span:
+                docs, scores = self._retrieve(symptoms)
+                retrieval_span.set(docs=len(docs))
+
+            # Reranking
+            with span("rerank") as rerank_span:
+                top_k_docs, rerank_path = self._rerank(symptoms, docs, scores)
+                rerank_span.set(path=rerank_path)
+
+            # LLM
+            prompt = self._build_prompt(patient_info, symptoms, top_k_docs)
+            with span("llm", model=GEMINI_MODEL) as llm_span:
+                response = self.llm.invoke(prompt)
+
+        # Metrics
+        self._log_metrics(len(docs), {
+            "retrieval_s": retrieval_span.duration_s,
+            "rerank_s": rerank_span.duration_s,
+            "total_retrieval_s": retrieval_span.duration_s + rerank_span.duration_s,
+            "llm_s": llm_span.duration_s,
+            "total_s": total_span.duration_s
+        }, response["raw"].usage_metadata, rerank_path=rerank_path)
+
+        if self.cache is not None and response["parsed"] is not None:
+            self.cache.set(cache_key, response["parsed"])
+        return response["parsed"]
+
+    async def adiagnose(self, patient_info: SymptomsInput, use_cache: bool = True) -> DiagnoseResponse:
+        """
+        Non-blocking version of diagnose for the async API.
+        Retrieval and reranking run on the bounded CPU executor (reranking can be micro-batched
+        with other requests), LLM call uses native async API.
+        """
+        loop = asyncio.get_running_loop()
+        with span("diagnose") as total_span:
+            # Guardrails check
+            with span("guardrails"):
+                run_guardrails(patient_info.__str__())
+
+            # Cache lookup
+            cache_key = make_cache_key(patient_info)
+            if use_cache and self.cache is not None and (cached := self.cache.get(cache_key)):
+                total_span.set(cache_hit=True)
+                return cached
+
+            symptoms = ", ".join(patient_info.symptoms)
+
+            # Retrieval (query embedding + vector search)
+            with span("retrieval") as retrieval_span:
+                docs, scores = await loop.run_in_executor(self.executor, self._retrieve, symptoms)
+                retrieval_span.set(docs=len(docs))
+
+            # Reranking
+            with span("rerank") as rerank_span:
+                top_k_docs, rerank_path = await self._arerank(symptoms, docs, scores)
+                rerank_span.set(path=rerank_path)
+
+            # LLM
+            prompt = self._build_prompt(patient_info, symptoms, top_k_docs)
+            with span("llm", model=GEMINI_MODEL) as llm_span:
+                response = await self.llm.ainvoke(prompt)
 
         # Metrics
-        total_time = time.time() - start_time
-        token_usage = response["raw"].usage_metadata
+        self._log_metrics(len(docs), {
+            "retrieval_s": retrieval_span.duration_s,
+            "rerank_s": rerank_span.duration_s,
+            "total_retrieval_s": retrieval_span.duration_s + rerank_span.duration_s,
+            "llm_s": llm_span.duration_s,
+            "total_s": total_span.duration_s
+        }, response["raw"].usage_metadata, rerank_path=rerank_path)
+
+        if self.cache is not None and response["parsed"] is not None:
+            self.cache.set(cache_key, response["parsed"])
+        return response["parsed"]
+
+    async def astream_diagnose(
+            self,
+            patient_info: SymptomsInput,
+            use_cache: bool = True) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """
+        Streaming version of adiagnose, yields (event, data) tuples:
+        - "candidates": reranked diseases used as context, sent right after reranking
+        - "disease": every DiseaseDetails as soon as it can be parsed from the model partial output
+        - "metrics": final latency and token usage
+        Guardrails error is raised before the first event.
+        """
+        loop = asyncio.get_running_loop()
+        with span("diagnose", stream=True) as total_span:
+            # Guardrails check
+            with span("guardrails"):
+                run_guardrails(patient_info.__str__())
+
+            # Cache lookup
+            cache_key = make_cache_key(patient_info)
+            if use_cache and self.cache is not None and (cached := self.cache.get(cache_key)):
+                total_span.set(cache_hit=True)
+                for disease in cached.possible_diseases:
+                    yield "disease", disease.model_dump()
+                yield "metrics", {"cache_hit": True, "latency": {"total_s": round(total_span.duration_s, 4)}}
+                return
+
+            symptoms = ", ".join(patient_info.symptoms)
+
+            # Retrieval (query embedding + vector search)
+            with span("retrieval") as retrieval_span:
+                docs, scores = await loop.run_in_executor(self.executor, self._retrieve, symptoms)
+                retrieval_span.set(docs=len(docs))
+
+            # Reranking
+            with span("rerank") as rerank_span:
+                top_k_docs, rerank_path = await self._arerank(symptoms, docs, scores)
+                rerank_span.set(path=rerank_path)
+
+            yield "candidates", {"candidates": [
+                {"name": doc.metadata.get("disease"), "icd_code": doc.metadata.get("icd_code")} for doc in top_k_docs
+            ]}
+
+            # LLM streaming, every disease except the last one in partial JSON is already complete
+            prompt = self._build_prompt(patient_info, symptoms, top_k_docs)
+            first_disease_time = None
+            message: AIMessageChunk | None = None
+            emitted = 0
+
+            with span("llm", model=GEMINI_MODEL) as llm_span:
+                async for chunk in self.json_llm.astream(prompt):
+                    message = chunk if message is None else message + chunk
+                    partial = parse_partial_json(message.text)
+                    diseases = partial.get("possible_diseases") if isinstance(partial, dict) else None
+                    diseases = diseases if isinstance(diseases, list) else []
+
+                    while emitted < len(diseases) - 1:
+                        yield "disease", DiseaseDetails.model_validate(diseases[emitted]).model_dump()
+                        first_disease_time = first_disease_time or total_span.duration_s
+                        emitted += 1
+
+                response = DiagnoseResponse.model_validate(parse_json_markdown(message.text if message else ""))
+                for disease in response.possible_diseases[emitted:]:
+                    yield "disease", disease.model_dump()
+                    first_disease_time = first_disease_time or total_span.duration_s
+
+        # Metrics
+        latency = {
+            "retrieval_s": retrieval_span.duration_s,
+            "rerank_s": rerank_span.duration_s,
+            "total_retrieval_s": retrieval_span.duration_s + rerank_span.duration_s,
+            "first_disease_s": first_disease_time or 0.0,
+            "llm_s": llm_span.duration_s,
+            "total_s": total_span.duration_s
+        }
+        token_usage = message.usage_metadata if message else None
+        self._log_metrics(len(docs), latency, token_usage, pipeline="stream", rerank_path=rerank_path)
+
+        if self.cache is not None:
+            self.cache.set(cache_key, response)
+        yield "metrics", {
+            "cache_hit": False,
+            "latency": {name: round(value, 4) for name, value in latency.items()},
+            "token_usage": token_usage
+        }
+
+    async def adiagnose_batch(self, patients: list[SymptomsInput], use_cache: bool = True) -> BatchDiagnoseResponse:
+        """
+        Diagnose many patients at once.
+        Queries are embedded, searched and reranked in bulk, then LLM calls are fanned out
+        with at most BATCH_LLM_CONCURRENCY requests in flight. Results keep the input order,
+        failures (guardrails, LLM errors) are reported per item.
+        Patients with cached results skip the whole pipeline.
+        """
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        results = [BatchDiagnoseItem(index=i) for i in range(len(patients))]
+
+        # Guardrails check and cache lookup, rejected and cached patients don't go further
+        start_guardrails = time.time()
+        valid_ids = []
+        cache_hits = 0
+        cache_keys = [make_cache_key(patient_info) for patient_info in patients]
+        for i, patient_info in enumerate(patients):
+            try:
+                run_guardrails(patient_info.__str__())
+            except SecurityError as e:
+                results[i].error = str(e)
+                continue
+
+            if use_cache and self.cache is not None and (cached := self.cache.get(cache_keys[i])):
+                results[i].result = cached
+                cache_hits += 1
+            else:
+                valid_ids.append(i)
+        guardrails_time = time.time() - start_guardrails
+
+        queries = [", ".join(patients[i].symptoms) for i in valid_ids]
+        embedding_time = retrieval_time = rerank_time = llm_time = 0.0
+        docs_count = 0
+        rerank_paths: Counter[str] = Counter()
+        token_usage: dict[str, int] = {}
+
+        if queries:
+            # Embedding - single batch call
+            start_embedding = time.time()
+            embeddings = await loop.run_in_executor(
+                self.executor, self.vectors_store.embeddings.embed_documents, queries)
+            embedding_time = time.time() - start_embedding
+
+            # Retrieval - single bulk vector search
+            start_retrieval = time.time()
+            hybrid = isinstance(self.retriever, HybridRetriever)
+            scores_lists = None
+            if self.adaptive_rerank is not None:
+                scored_lists = await loop.run_in_executor(
+                    self.executor, similarity_search_with_relevance_scores_by_vectors, self.vectors_store, embeddings, RERANK_DEPTH)
+                docs_lists = [[doc for doc, _ in docs_and_scores] for docs_and_scores in scored_lists]
+                scores_lists = [[score for _, score in docs_and_scores] for docs_and_scores in scored_lists]
+            else:
+                docs_lists = await loop.run_in_executor(
+                    self.executor, similarity_search_by_vectors, self.vectors_store, embeddings,
+                    RETRIEVAL_K if hybrid else RERANK_DEPTH)
+            if hybrid:
+                docs_lists = [self.retriever.fuse(query, docs) for query, docs in zip(queries, docs_lists)]
+            if self.symptom_retriever is not None:
+                structured_lists = await loop.run_in_executor(self.executor, self.symptom_retriever.batch_search, queries)
+                docs_lists = [merge_candidates(docs, structured) for docs, structured in zip(docs_lists, structured_lists)]
+            retrieval_time = time.time() - start_retrieval
+            docs_count = sum(len(docs) for docs in docs_lists)
+
+            # Reranking - single CrossEncoder call for all pairs
+            start_rerank = time.time()
+            top_k_docs, paths = await loop.run_in_executor(self.executor, self._rerank_many, queries, docs_lists, scores_lists)
+            rerank_paths.update(paths)
+            rerank_time = time.time() - start_rerank
+
+            # LLM - concurrent calls limited by semaphore
+            semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+            async def run_llm(i: int, symptoms: str, docs: list[Document]) -> None:
+                prompt = self._build_prompt(patients[i], symptoms, docs)
+                async with semaphore:
+                    start_llm_item = time.time()
+                    try:
+                        response = await self.llm.ainvoke(prompt)
+                    except Exception as e:
+                        logger.error(f"BATCH LLM ERROR for item {i}: {e}")
+                        results[i].error = f"LLM error: {e}"
+                        return
+                    finally:
+                        results[i].latency["llm_s"] = round(time.time() - start_llm_item, 4)
+
+                if response["parsed"] is None:
+                    logger.error(f"BATCH LLM ERROR for item {i}: {response.get('parsing_error')}")
+                    results[i].error = "LLM returned unparseable output"
+                else:
+                    results[i].result = response["parsed"]
+                    if self.cache is not None:
+                        self.cache.set(cache_keys[i], response["parsed"])
+                for name, value in (response["raw"].usage_metadata or {}).items():
+                    if isinstance(value, int):
+                        token_usage[name] = token_usage.get(name, 0) + value
+
+            start_llm = time.time()
+            await asyncio.gather(*[
+                run_llm(i, symptoms, docs) for i, symptoms, docs in zip(valid_ids, queries, top_k_docs)
+            ])
+            llm_time = time.time() - start_llm
+
         latency = {
+            "guardrails_s": round(guardrails_time, 4),
+            "embedding_s": round(embedding_time, 4),
             "retrieval_s": round(retrieval_time, 4),
             "rerank_s": round(rerank_time, 4),
-            "total_retrieval_s": round(total_retrieval_time, 4),
             "llm_s": round(llm_time, 4),
-            "total_s": round(total_time, 4)
+            "total_s": round(time.time() - start_time, 4)
         }
         log_data = {
             "model": GEMINI_MODEL,
-            "context_docs_count": len(docs),
+            "batch_size": len(patients),
+            "errors": sum(1 for item in results if item.error),
+            "cache_hits": cache_hits,
+            "context_docs_count": docs_count,
+            "rerank_paths": dict(rerank_paths),
             "latency": latency,
             "token_usage": token_usage
         }
+        observe_latency("batch", latency)
+        count_tokens(GEMINI_MODEL, token_usage)
+        metrics_logger.info(f"BATCH DIAGNOSE METRICS: {json.dumps(log_data)}")
 
-        metrics_logger.info(f"DIAGNOSE METRICS: {json.dumps(log_data)}")
-        return response["parsed"]
+        return BatchDiagnoseResponse(results=results, latency=latency)
@@ -1,5 +1,7 @@
 import logging, asyncio, json, time
 from typing import Any, Callable
+from src.metrics import TOOL_CALLS, observe_latency
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 metrics_logger = logging.getLogger("metrics")
@@ -70,7 +72,8 @@ async def tool_dispatcher(
     tool_fn = allowed_tools[tool_name]
     try:
         sanitized_args = sanitize_tool_args(tool_args)
-        result = await asyncio.wait_for(tool_fn(**sanitized_args), timeout=timeout)
+        with span("tool", tool=tool_name):
+            result = await asyncio.wait_for(tool_fn(**sanitized_args), timeout=timeout)
         return json.dumps(result)
     # Error handling
     except asyncio.TimeoutError:
@@ -101,4 +104,6 @@ async def tool_dispatcher(
             "latency": latency,
         }
 
+        TOOL_CALLS.inc(tool=tool_name, status=tool_status)
+        observe_latency("tool", latency)
         metrics_logger.info(f"TOOL EXECUTION: {json.dumps(log_data)}")
@@ -3,8 +3,11 @@ import re
 
 
 class SecurityError(Exception):
-    """Guardrails related security error (prompt injection etc.)"""
-    pass
+    """Guardrails related security error (prompt injection etc.), rule is the name of the matched guardrail rule"""
+
+    def __init__(self, message: str, rule: str | None = None):
+        super().__init__(message)
+        self.rule = rule
 
 
 PROMPT_INJECTION_PHRASES = [
@@ -35,49 +38,65 @@ RE_IBAN = re.compile(r"\bPL\d{26}\b", re.IGNORECASE)
 RE_LINK = re.compile(r"https?://\S+")
 PROFANITY = {"fuck", "bitch", "shit", "asshole", "suck my fat one", "damn", "idiot", "stupid", "dumb"}
 
+# Sensitive data rules in check order: (rule, pattern, description)
+SENSITIVE_DATA_RULES = [
+    ("email", RE_EMAIL, "email address"),
+    ("phone", RE_PHONE, "phone number"),
+    ("pesel", RE_PESEL, "PESEL number"),
+    ("card", RE_CARD, "credit card number"),
+    ("iban", RE_IBAN, "IBAN number"),
+]
 
-def detect_prompt_injection(prompt: str) -> None:
-    lowered_prompt = prompt.lower()
+# Anchors of sensitive data patterns - every number pattern (phone, PESEL, card, IBAN) contains
+# a run of 9 digits, email contains "@" and link "://". Patterns run only if their anchor is present.
+RE_DIGIT_RUN = re.compile(r"\d(?:[ -]?\d){8}")
+
+
+def _check_prompt_injection(lowered_prompt: str) -> None:
     for phrase in PROMPT_INJECTION_PHRASES:
         if phrase in lowered_prompt:
             logging.warning(f"SECURITY: Prompt injection detected with phrase: '{phrase}'")
-            raise SecurityError(f"Request rejected due to prompt injection attempt. Phrase: '{phrase}'")
+            raise SecurityError(f"Request rejected due to prompt injection attempt. Phrase: '{phrase}'", rule="prompt_injection")
 
 
-def detect_profanity(prompt: str) -> None:
-    lowered_prompt = prompt.lower()
+def _check_profanity(lowered_prompt: str) -> None:
     for bad_word in PROFANITY:
         if bad_word in lowered_prompt:
             logging.warning(f"SECURITY: Profanity detected with word: '{bad_word}'")
-            raise SecurityError(f"Request rejected due to profanity attempt. Word: '{bad_word}'")
+            raise SecurityError(f"Request rejected due to profanity attempt. Word: '{bad_word}'", rule="profanity")
+
+
+def detect_prompt_injection(prompt: str) -> None:
+    _check_prompt_injection(prompt.lower())
+
+
+def detect_profanity(prompt: str) -> None:
+    _check_profanity(prompt.lower())
 
 
 def detect_links(prompt: str) -> None:
     if RE_LINK.search(prompt):
         logging.warning("SECURITY: Sensitive data detected - link/URL")
-        raise SecurityError("Request rejected due to sensitive data (link/URL) detected.")
+        raise SecurityError("Request rejected due to sensitive data (link/URL) detected.", rule="link")
 
 
 def detect_sensitive_data(prompt: str) -> None:
-    if RE_EMAIL.search(prompt):
-        logging.warning("SECURITY: Sensitive data detected - email address")
-        raise SecurityError("Request rejected due to sensitive data (email address) detected.")
-    if RE_PHONE.search(prompt):
-        logging.warning("SECURITY: Sensitive data detected - phone number")
-        raise SecurityError("Request rejected due to sensitive data (phone number) detected.")
-    if RE_PESEL.search(prompt):
-        logging.warning("SECURITY: Sensitive data detected - PESEL number")
-        raise SecurityError("Request rejected due to sensitive data (PESEL number) detected.")
-    if RE_CARD.search(prompt):
-        logging.warning("SECURITY: Sensitive data detected - credit card number")
-        raise SecurityError("Request rejected due to sensitive data (credit card number) detected.")
-    if RE_IBAN.search(prompt):
-        logging.warning("SECURITY: Sensitive data detected - IBAN number")
-        raise SecurityError("Request rejected due to sensitive data (IBAN number) detected.")
+    for rule, pattern, description in SENSITIVE_DATA_RULES:
+        if pattern.search(prompt):
+            logging.warning(f"SECURITY: Sensitive data detected - {description}")
+            raise SecurityError(f"Request rejected due to sensitive data ({description}) detected.", rule=rule)
 
 
 def run_guardrails(prompt: str) -> None:
-    detect_prompt_injection(prompt)
-    detect_sensitive_data(prompt)
-    detect_links(prompt)
-    detect_profanity(prompt)
+    """
+    Check prompt against all rules in order: injection, sensitive data, links, profanity.
+    The prompt is lower-cased once for all phrase rules and sensitive data patterns run
+    only if the prompt contains their anchor.
+    """
+    lowered_prompt = prompt.lower()
+    _check_prompt_injection(lowered_prompt)
+    if "@" in prompt or RE_DIGIT_RUN.search(prompt):
+        detect_sensitive_data(prompt)
+    if "://" in prompt:
+        detect_links(prompt)
+    _check_profanity(lowered_prompt)
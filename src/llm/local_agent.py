@@ -1,11 +1,16 @@
-import json, re, logging, time
+import asyncio, json, re, logging, threading, time
+from contextlib import aclosing
 from json import JSONDecodeError
-from typing import Any
-from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
+from typing import Any, AsyncIterator
+from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage, AIMessage
 from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
+from transformers import LogitsProcessor, LogitsProcessorList
 from src.llm.guardrails import run_guardrails, SecurityError
 from src.llm.tools import get_diagnosis_tool
 from src.llm.dispatcher import tool_dispatcher, ToolError, ToolValidationError, ToolNotFoundError
+from src.llm.sessions import ChatSessionManager
+from src.metrics import observe_latency
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 metrics_logger = logging.getLogger("metrics")
@@ -20,6 +25,12 @@ config = {
     "return_full_text": False,
 }
 
+# Characters which may start a tool call JSON, streamed text is held back from them
+TOOL_CALL_MARKERS = ("{", "`")
+
+# Session used when no session id is provided
+DEFAULT_SESSION = "default"
+
 # Allowed tools map
 ALLOWED_TOOLS = {
     "get_diagnosis_tool": get_diagnosis_tool
@@ -93,6 +104,26 @@ Do NOT add any other text. DO NOT return JSON.
 """
 
 
+class CancelGeneration(LogitsProcessor):
+    """
+    Ends HF generation early once cancelled: every token except EOS is masked, so EOS is generated next.
+    The streaming pipeline runs in its own thread and can't be stopped by closing its output iterator.
+    """
+
+    def __init__(self, eos_token_id: int):
+        self.eos_token_id = eos_token_id
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def __call__(self, input_ids, scores):
+        if self._cancelled.is_set():
+            scores.fill_(float("-inf"))
+            scores[:, self.eos_token_id] = 0.0
+        return scores
+
+
 def parse_tool_call(response: str) -> dict[str, Any]:
     """
     Parse tool call json from model response text.
@@ -119,26 +150,212 @@ class LocalChatAgent:
     """
     A local chat agent with tools.
     Main task is collect information about patient.
+    Model is loaded once and shared, chat history is kept per session.
     """
 
-    def __init__(self, model_name: str):
-        self.model = HuggingFacePipeline.from_model_id(
-            model_id=model_name,
-            task="text-generation",
-            pipeline_kwargs=config
-        )
-        self.agent = ChatHuggingFace(
-            llm=self.model,
-            verbose=True
-        )
-        self.history: list[BaseMessage] = [SystemMessage(content=SYSTEM)]
-        logger.info(f"LocalChatAgent initialized with model: {model_name}")
-
-    def reset_history(self):
+    def __init__(self, model_name: str, load: bool = True):
+        self.model_name = model_name
+        self.model: HuggingFacePipeline | None = None
+        self.agent: ChatHuggingFace | None = None
+        self._load_lock = threading.Lock()
+        self.sessions = ChatSessionManager(new_history=lambda: [SystemMessage(content=SYSTEM)])
+        if load:
+            self.load()
+
+    @property
+    def loaded(self) -> bool:
+        return self.agent is not None
+
+    def load(self) -> "LocalChatAgent":
+        """
+        Load local model (only once, thread-safe). Can be deferred to app startup or first chat.
+        """
+        with self._load_lock:
+            if self.agent is None:
+                self.model = HuggingFacePipeline.from_model_id(
+                    model_id=self.model_name,
+                    task="text-generation",
+                    pipeline_kwargs=config
+                )
+                self.agent = ChatHuggingFace(
+                    llm=self.model,
+                    verbose=True
+                )
+                logger.info(f"LocalChatAgent initialized with model: {self.model_name}")
+        return self
+
+    def warmup(self) -> None:
+        """Run a synthetic one token generation to initialize torch kernels"""
+        self.load().model.pipeline("Hello", max_new_tokens=1, do_sample=False)
+
+    async def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            await asyncio.to_thread(self.load)
+
+    def reset_history(self, session_id: str = DEFAULT_SESSION):
         logger.info("Chat Agent history reset.")
-        self.history = [SystemMessage(content=SYSTEM)]
+        self.sessions.reset(session_id)
+
+    @staticmethod
+    def _log_metrics(log_data: dict[str, Any]) -> None:
+        observe_latency("local_chat", log_data["latency"])
+        metrics_logger.info(f"LOCAL MODEL METRICS: {json.dumps(log_data)}")
 
-    async def chat(self, prompt: str) -> str:
+    @staticmethod
+    async def _run_tool(tool_call: dict[str, Any]) -> str:
+        """
+        Dispatch tool call, returns tool output (or error) message for the model.
+        """
+        tool_output_msg = ""
+        # Tool dispatching, errors are returned to the model, so the span status is set explicitly
+        with span("run_tool", tool=tool_call["tool"]) as tool_span:
+            try:
+                tool_output = await tool_dispatcher(
+                    tool_call["tool"],
+                    tool_call["args"],
+                    ALLOWED_TOOLS,
+                    timeout=90.0)
+                tool_output_msg = f"{tool_output}\n\n{output_formatting}"
+
+            except ToolValidationError as e:
+                tool_output_msg = f"ERROR: The data provided is invalid: {e}. Please ask the user for correct information."
+            except ToolNotFoundError as e:
+                tool_output_msg = f"ERROR: The requested tool was not found: {e}. DO NOT HALLUCINATE tools."
+            except ToolError as e:
+                tool_output_msg = f"ERROR: There was an error executing the tool: {e}. Please try again."
+            except Exception as e:
+                tool_output_msg = f"ERROR: Unexpected error during tool execution: {e}. Please try again."
+            if tool_output_msg.startswith("ERROR"):
+                tool_span.status = "error"
+
+        logger.debug(f"Tool output message: {tool_output_msg}")
+        return tool_output_msg
+
+    async def _astream_tokens(self, history: list[BaseMessage]) -> AsyncIterator[str]:
+        """
+        Stream generated text chunks of the local model.
+        HF pipeline streams only through the sync API (generation runs in its own thread),
+        so every next chunk is awaited in the default executor.
+        When the consumer stops (e.g. UI client disconnected), generation is cancelled and the stream closed.
+        """
+        loop = asyncio.get_running_loop()
+        cancel = CancelGeneration(self.model.pipeline.tokenizer.eos_token_id)
+        stream = iter(self.agent.stream(history, pipeline_kwargs={"logits_processor": LogitsProcessorList([cancel])}))
+        pending = None
+        try:
+            while True:
+                # Shielded, so a chunk in flight is finished rather than abandoned in the executor on cancellation
+                pending = loop.run_in_executor(None, next, stream, None)
+                chunk = await asyncio.shield(pending)
+                if chunk is None:
+                    break
+                if chunk.content:
+                    yield chunk.content
+        finally:
+            cancel.cancel()
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            if hasattr(stream, "close"):
+                await loop.run_in_executor(None, stream.close)
+
+    async def astream_chat(self, prompt: str, session_id: str = DEFAULT_SESSION) -> AsyncIterator[str]:
+        """
+        Streaming version of chat, yields answer text chunks as the model generates them.
+        Tool call turns are not shown: text is held back from the first possible JSON marker
+        and dropped if it turns out to be a tool call, then the answer with tool output is streamed.
+        """
+        await self._ensure_loaded()
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            # Nested streams are closed right away when the consumer stops, not when garbage collected
+            async with aclosing(self._astream_chat(prompt, session.history)) as stream:
+                async for text in stream:
+                    yield text
+            self.sessions.trim(session)
+
+    async def _astream_chat(self, prompt: str, history: list[BaseMessage]) -> AsyncIterator[str]:
+        with span("chat", model=self.model_name, stream=True) as chat_span:
+            # Guardrails check
+            try:
+                run_guardrails(prompt)
+            except SecurityError as e:
+                yield f"SECURITY ERROR: {e}"
+                return
+            # Prompt processing
+            history.append(HumanMessage(content=prompt))
+
+            first_token_time = None
+            content = ""
+            held_from = None
+            with span("local_model"):
+                async with aclosing(self._astream_tokens(history)) as tokens:
+                    async for text in tokens:
+                        content += text
+                        # Hold back everything from the first possible tool call marker
+                        if held_from is None:
+                            markers = [i for i in (content.find(m, len(content) - len(text)) for m in TOOL_CALL_MARKERS) if i != -1]
+                            if markers:
+                                held_from = min(markers)
+                                text = text[:len(text) - (len(content) - held_from)]
+                            if text:
+                                first_token_time = first_token_time or chat_span.duration_s
+                                yield text
+
+            logger.debug(f"Local model RAW response: {content}")
+            history.append(AIMessage(content=content))
+
+            # Metrics template
+            log_data = {
+                "model": self.model_name,
+                "active_sessions": self.sessions.active_sessions,
+                "tool": False,
+                "stream": True,
+                "latency": {
+                    "first_token_s": 0.0,
+                    "total_s": 0.0,
+                },
+            }
+
+            # Tool call processing
+            try:
+                tool_call = parse_tool_call(content) if held_from is not None else {}
+            except JSONDecodeError as e:
+                history.append(HumanMessage(f"ERROR: Failed to parse tool call JSON: {e}. Please try again."))
+                tool_call = {}
+
+            if tool_call:
+                history.append(HumanMessage(await self._run_tool(tool_call)))
+
+                # Agent response with tool output
+                final_content = ""
+                with span("local_model"):
+                    async with aclosing(self._astream_tokens(history)) as tokens:
+                        async for text in tokens:
+                            final_content += text
+                            first_token_time = first_token_time or chat_span.duration_s
+                            yield text
+                history.append(AIMessage(content=final_content))
+                log_data["tool"] = True
+            elif held_from is not None:
+                # Not a tool call, show held back text
+                first_token_time = first_token_time or chat_span.duration_s
+                yield content[held_from:]
+
+        # Metrics logging
+        log_data["latency"]["first_token_s"] = round(first_token_time or 0.0, 4)
+        log_data["latency"]["total_s"] = round(chat_span.duration_s, 4)
+        self._log_metrics(log_data)
+
+    async def chat(self, prompt: str, session_id: str = DEFAULT_SESSION) -> str:
+        await self._ensure_loaded()
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            with span("chat", model=self.model_name):
+                answer = await self._chat(prompt, session.history)
+            self.sessions.trim(session)
+        return answer
+
+    async def _chat(self, prompt: str, history: list[BaseMessage]) -> str:
         start_time = time.time()
         # Guardrails check
         try:
@@ -147,15 +364,17 @@ class LocalChatAgent:
             return f"SECURITY ERROR: {e}"
         # Prompt processing
         user_msg = HumanMessage(content=prompt)
-        self.history.append(user_msg)
+        history.append(user_msg)
 
-        response = self.agent.invoke(self.history)
+        with span("local_model"):
+            response = self.agent.invoke(history)
         logger.debug(f"Local model RAW response: {response.content}")
-        self.history.append(response)
+        history.append(response)
 
         # Metrics template
         log_data = {
-            "model": self.model.model_id,
+            "model": self.model_name,
+            "active_sessions": self.sessions.active_sessions,
             "tool": False,
             "latency": {
                 "total_s": 0.0,
@@ -167,55 +386,36 @@ class LocalChatAgent:
             tool_call = parse_tool_call(response.content)
 
             if tool_call:
-                tool_output_msg = ""
-                # Tool dispatching
-                try:
-                    tool_output = await tool_dispatcher(
-                        tool_call["tool"],
-                        tool_call["args"],
-                        ALLOWED_TOOLS,
-                        timeout=90.0)
-                    tool_output_msg = f"{tool_output}\n\n{output_formatting}"
-
-                except ToolValidationError as e:
-                    tool_output_msg = f"ERROR: The data provided is invalid: {e}. Please ask the user for correct information."
-                except ToolNotFoundError as e:
-                    tool_output_msg = f"ERROR: The requested tool was not found: {e}. DO NOT HALLUCINATE tools."
-                except ToolError as e:
-                    tool_output_msg = f"ERROR: There was an error executing the tool: {e}. Please try again."
-                except Exception as e:
-                    tool_output_msg = f"ERROR: Unexpected error during tool execution: {e}. Please try again."
-
                 # Add tool output to history
-                print(tool_output_msg)
-                self.history.append(HumanMessage(tool_output_msg))
+                history.append(HumanMessage(await self._run_tool(tool_call)))
 
                 # Agent response with tool output
-                final_response = self.agent.invoke(self.history)
-                self.history.append(final_response)
+                with span("local_model"):
+                    final_response = self.agent.invoke(history)
+                history.append(final_response)
 
                 # Metrics logging
                 total_s = round(time.time() - start_time, 4)
                 log_data["tool"] = True
                 log_data["latency"]["total_s"] = total_s
 
-                metrics_logger.info(f"LOCAL MODEL METRICS: {json.dumps(log_data)}")
+                self._log_metrics(log_data)
                 return final_response.content
 
         except JSONDecodeError as e:
-            self.history.append(HumanMessage(f"ERROR: Failed to parse tool call JSON: {e}. Please try again."))
+            history.append(HumanMessage(f"ERROR: Failed to parse tool call JSON: {e}. Please try again."))
 
             # Metrics logging
             total_s = round(time.time() - start_time, 4)
             log_data["latency"]["total_s"] = total_s
-            metrics_logger.info(f"LOCAL MODEL METRICS: {json.dumps(log_data)}")
+            self._log_metrics(log_data)
 
             return response.content
 
         # Metrics logging
         total_s = round(time.time() - start_time, 4)
         log_data["latency"]["total_s"] = total_s
-        metrics_logger.info(f"LOCAL MODEL METRICS: {json.dumps(log_data)}")
+        self._log_metrics(log_data)
 
         # No tool call detected, return original response
         return response.content
@@ -0,0 +1,154 @@
+import asyncio, json, logging, os, time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from sentence_transformers import CrossEncoder
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("metrics")
+
+load_dotenv()
+
+# Micro-batching of CrossEncoder pairs across concurrent requests
+RERANK_BATCHING = os.getenv("RERANK_BATCHING", "false").lower() == "true"
+# Max time a batch waits for more requests after its first request
+RERANK_BATCH_WINDOW_MS = float(os.getenv("RERANK_BATCH_WINDOW_MS", 5))
+# Max number of (query, doc) pairs scored in a single predict call
+RERANK_MAX_BATCH_SIZE = int(os.getenv("RERANK_MAX_BATCH_SIZE", 256))
+
+
+@dataclass
+class RerankRequest:
+    """Pairs of a single caller waiting for scores"""
+    pairs: list[list[str]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class RerankBatcher:
+    """
+    Rerank service which collects (query, doc) pairs from concurrent requests and scores them
+    with one batched CrossEncoder.predict call. A batch is flushed when window_ms passed since
+    its first request or when max_batch_size pairs are collected. Scores are returned to every
+    caller through its own future.
+    """
+
+    def __init__(
+            self,
+            cross_encoder: CrossEncoder,
+            executor: Executor | None = None,
+            window_ms: float = RERANK_BATCH_WINDOW_MS,
+            max_batch_size: int = RERANK_MAX_BATCH_SIZE):
+        self.cross_encoder = cross_encoder
+        self.executor = executor
+        self.window_s = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue: asyncio.Queue[RerankRequest] | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        # Statistics
+        self.batches = 0
+        self.requests = 0
+        self.pairs = 0
+        self.max_batch_pairs = 0
+        self.queue_wait_total_s = 0.0
+        self.queue_wait_max_s = 0.0
+
+    def _ensure_worker(self) -> None:
+        """Start batching worker in the running event loop (restarted if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def predict(self, pairs: list[list[str]]) -> list[float]:
+        """
+        Score (query, doc) pairs, waits until the batch with these pairs is processed.
+        """
+        if not pairs:
+            return []
+        self._ensure_worker()
+        request = RerankRequest(pairs=pairs, future=self._loop.create_future())
+        await self._queue.put(request)
+        return await request.future
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            batch_size = len(batch[0].pairs)
+            deadline = time.perf_counter() + self.window_s
+
+            # Collect more requests until window ends or batch is full
+            while batch_size < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(request)
+                batch_size += len(request.pairs)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[RerankRequest]) -> None:
+        start_predict = time.perf_counter()
+        queue_waits = [start_predict - request.enqueued_at for request in batch]
+        pairs = [pair for request in batch for pair in request.pairs]
+
+        try:
+            scores = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.cross_encoder.predict, pairs)
+        except Exception as e:
+            logger.error(f"RERANK BATCH ERROR: {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        predict_time = time.perf_counter() - start_predict
+
+        offset = 0
+        for request in batch:
+            if not request.future.done():
+                request.future.set_result([float(score) for score in scores[offset:offset + len(request.pairs)]])
+            offset += len(request.pairs)
+
+        # Statistics
+        self.batches += 1
+        self.requests += len(batch)
+        self.pairs += len(pairs)
+        self.max_batch_pairs = max(self.max_batch_pairs, len(pairs))
+        self.queue_wait_total_s += sum(queue_waits)
+        self.queue_wait_max_s = max(self.queue_wait_max_s, *queue_waits)
+
+        log_data = {
+            "batch_requests": len(batch),
+            "batch_pairs": len(pairs),
+            "queue_wait_s": {
+                "mean": round(sum(queue_waits) / len(queue_waits), 4),
+                "max": round(max(queue_waits), 4)
+            },
+            "predict_s": round(predict_time, 4)
+        }
+        metrics_logger.info(f"RERANK BATCH METRICS: {json.dumps(log_data)}")
+
+    def stats(self) -> dict[str, float]:
+        """Aggregated queue wait and batch size statistics"""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "pairs": self.pairs,
+            "mean_batch_pairs": round(self.pairs / self.batches, 2) if self.batches else 0.0,
+            "max_batch_pairs": self.max_batch_pairs,
+            "mean_queue_wait_s": round(self.queue_wait_total_s / self.requests, 4) if self.requests else 0.0,
+            "max_queue_wait_s": round(self.queue_wait_max_s, 4)
+        }
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
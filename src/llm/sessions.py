@@ -0,0 +1,101 @@
+import asyncio, logging, os, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Idle sessions are evicted after TTL, least recently used sessions when the limit is reached
+CHAT_SESSION_TTL_S = float(os.getenv("CHAT_SESSION_TTL_S", 1800))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", 100))
+# Max messages kept in a session history (leading system prompt is always kept)
+CHAT_MAX_HISTORY = int(os.getenv("CHAT_MAX_HISTORY", 40))
+
+
+@dataclass
+class ChatSession:
+    """Chat history of a single user session"""
+    history: list[BaseMessage]
+    last_used: float = field(default_factory=time.time)
+    # Serializes turns of the same session (e.g. double submit)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ChatSessionManager:
+    """
+    Keeps chat sessions keyed by session id (Gradio session hash).
+    Idle sessions are evicted by TTL and LRU (sessions with a turn in progress are never evicted),
+    history length of every session is capped.
+    """
+
+    def __init__(
+            self,
+            new_history: Callable[[], list[BaseMessage]],
+            ttl_s: float = CHAT_SESSION_TTL_S,
+            max_sessions: int = CHAT_MAX_SESSIONS,
+            max_history: int = CHAT_MAX_HISTORY):
+        self.new_history = new_history
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.max_history = max_history
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> ChatSession:
+        """
+        Return session with given id, creates a new one if it doesn't exist or has expired.
+        """
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ChatSession(history=self.new_history())
+                self._sessions[session_id] = session
+                logger.info(f"Chat session created, active sessions: {len(self._sessions)}")
+
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            # Evict least recently used sessions, sessions with a turn in progress are kept
+            overflow = len(self._sessions) - self.max_sessions
+            if overflow > 0:
+                idle = [idle_id for idle_id, idle_session in self._sessions.items()
+                        if idle_id != session_id and not idle_session.lock.locked()]
+                for idle_id in idle[:overflow]:
+                    del self._sessions[idle_id]
+
+        return session
+
+    def reset(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def trim(self, session: ChatSession) -> None:
+        """
+        Drop the oldest messages over max_history, leading system messages are kept.
+        """
+        history = session.history
+        system_count = 0
+        while system_count < len(history) and history[system_count].type == "system":
+            system_count += 1
+
+        overflow = len(history) - system_count - self.max_history
+        if overflow > 0:
+            del history[system_count:system_count + overflow]
+
+    def _evict_expired(self, now: float) -> None:
+        # Session of a running turn isn't idle, even if the turn takes longer than TTL
+        expired = [session_id for session_id, session in self._sessions.items()
+                   if now - session.last_used > self.ttl_s and not session.lock.locked()]
+        for session_id in expired:
+            del self._sessions[session_id]
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle chat sessions, active sessions: {len(self._sessions)}")
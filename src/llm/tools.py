@@ -1,14 +1,64 @@
-import httpx, logging
-from typing import Any
+import httpx, logging, os
+from typing import Any, TYPE_CHECKING
+from dotenv import load_dotenv
 from src.llm.dispatcher import ToolValidationError, ToolError
+from src.llm.guardrails import SecurityError
 from src.schemas import SymptomsInput
+from src.tracing import current_trace_id, TRACE_HEADER
+
+if TYPE_CHECKING:
+    from src.llm.diagnosis_assistant import DiagnosisAssistant
 
 logger = logging.getLogger(__name__)
 
+load_dotenv()
+
+# Tool transport: "auto" (in-process if the assistant runs in this process, HTTP otherwise), "inprocess" or "http"
+TOOL_TRANSPORT = os.getenv("TOOL_TRANSPORT", "auto")
+# Base URL of the remote diagnosis API used by HTTP transport
+DIAGNOSIS_API_URL = os.getenv("DIAGNOSIS_API_URL", "http://localhost:8000")
+TOOL_HTTP_TIMEOUT = float(os.getenv("TOOL_HTTP_TIMEOUT", 120))
+TOOL_HTTP_MAX_CONNECTIONS = int(os.getenv("TOOL_HTTP_MAX_CONNECTIONS", 20))
+
+# DiagnosisAssistant of this process (registered in app lifespan) and shared HTTP client
+_diagnosis_assistant: "DiagnosisAssistant | None" = None
+_http_client: httpx.AsyncClient | None = None
+
+
+def register_diagnosis_assistant(assistant: "DiagnosisAssistant | None") -> None:
+    """
+    Register DiagnosisAssistant from app.state for in-process tool calls (None to unregister).
+    """
+    global _diagnosis_assistant
+    _diagnosis_assistant = assistant
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared pooled keep-alive HTTP client for the remote diagnosis API.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=DIAGNOSIS_API_URL,
+            timeout=TOOL_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=TOOL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=TOOL_HTTP_MAX_CONNECTIONS))
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 async def get_diagnosis_tool(gender: str, age: int, symptoms: list[str]) -> dict[str, Any]:
     """
-    Calls the /diagnose API endpoint with the provided patient information.
+    Calls the DiagnosisAssistant directly (same process) or the /diagnose API endpoint
+    with the provided patient information (current trace id is sent in X-Trace-Id header).
     Returns the diagnosis result as a JSON dictionary with next schemas: DiagnoseResponse(list[DiseaseDetails])
     """
     # Input validation
@@ -21,17 +71,38 @@ async def get_diagnosis_tool(gender: str, age: int, symptoms: list[str]) -> dict
         raise ToolValidationError("At least one symptom must be provided")
 
     body = SymptomsInput(age=age, gender=gender, symptoms=symptoms)
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            response = await client.post("http://localhost:8000/diagnose", json=body.model_dump())
-            response.raise_for_status()
 
-            logger.debug(f"TOOL 'get_diagnosis_tool' OUTPUT: {response}")
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            error_msg = f"API ERROR {e.response.status_code}: {e.response.text}"
+    # In-process transport
+    if TOOL_TRANSPORT in ("auto", "inprocess") and _diagnosis_assistant is not None:
+        try:
+            response = await _diagnosis_assistant.adiagnose(body)
+        except SecurityError as e:
+            error_msg = f"API ERROR 403: {e}"
+            logger.error(error_msg)
+            raise ToolError(error_msg)
+        # No parsed LLM output, the /diagnose endpoint answers 500 in this case
+        if response is None:
+            error_msg = "API ERROR 500: LLM returned unparseable output"
             logger.error(error_msg)
             raise ToolError(error_msg)
-        except httpx.RequestError as e:
-            logger.error(f"API CONNECTION ERROR: {e}")
-            raise ToolError(f"Failed to connect to the diagnosis API: {e}")
+        logger.debug(f"TOOL 'get_diagnosis_tool' OUTPUT: {response}")
+        return response.model_dump()
+    if TOOL_TRANSPORT == "inprocess":
+        raise ToolError("In-process diagnosis assistant is not available")
+
+    # HTTP transport, the trace continues in the API process
+    trace_id = current_trace_id()
+    try:
+        response = await get_http_client().post(
+            "/diagnose", json=body.model_dump(), headers={TRACE_HEADER: trace_id} if trace_id else None)
+        response.raise_for_status()
+
+        logger.debug(f"TOOL 'get_diagnosis_tool' OUTPUT: {response}")
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        error_msg = f"API ERROR {e.response.status_code}: {e.response.text}"
+        logger.error(error_msg)
+        raise ToolError(error_msg)
+    except httpx.RequestError as e:
+        logger.error(f"API CONNECTION ERROR: {e}")
+        raise ToolError(f"Failed to connect to the diagnosis API: {e}")
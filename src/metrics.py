@@ -0,0 +1,203 @@
+import abc, bisect, math, threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# Latency histogram buckets (seconds), fixed so histograms of all instances can be aggregated
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric(abc.ABC):
+    """Base of metrics with a fixed set of label names, values are kept per label values"""
+    type = ""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric '{self.name}' expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abc.abstractmethod
+    def _samples(self) -> Iterator[tuple[str, dict[str, str], float]]:
+        """Samples (name, labels, value) of the metric, called under the metric lock"""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self._samples())
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only be increased")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        """Gauge is increased while the block runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label values: [bucket counts (non-cumulative)], sum, count
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+        return sum(counts)
+
+    def _samples(self):
+        for key, (counts, total) in self._values.items():
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total[0]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    In-process metrics registry, rendered in Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_cls: type[Metric], name: str, *args, **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_cls(name, *args, **kwargs)
+            elif not isinstance(metric, metric_cls):
+                raise ValueError(f"Metric '{name}' is already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+# Application metrics
+STAGE_LATENCY = metrics_registry.histogram(
+    "medrag_stage_latency_seconds", "Latency of pipeline stages (retrieval, rerank, llm, total)", ("pipeline", "stage"))
+LLM_TOKENS = metrics_registry.counter(
+    "medrag_llm_tokens_total", "LLM token usage", ("model", "type"))
+CACHE_REQUESTS = metrics_registry.counter(
+    "medrag_cache_requests_total", "Diagnosis cache lookups", ("backend", "result"))
+REQUESTS_IN_FLIGHT = metrics_registry.gauge(
+    "medrag_requests_in_flight", "Requests being processed", ("endpoint",))
+TOOL_CALLS = metrics_registry.counter(
+    "medrag_tool_calls_total", "Chat agent tool executions", ("tool", "status"))
+RERANK_PATHS = metrics_registry.counter(
+    "medrag_rerank_paths_total", "Rerank decisions of candidate lists (full, tail, skip)", ("path",))
+
+
+def observe_latency(pipeline: str, latency: dict[str, float]) -> None:
+    """Record stage latencies given as {"<stage>_s": seconds}"""
+    for name, value in latency.items():
+        if name.endswith("_s") and isinstance(value, (int, float)):
+            STAGE_LATENCY.observe(value, pipeline=pipeline, stage=name[:-2])
+
+
+def count_tokens(model: str, token_usage: dict | None) -> None:
+    """Record LangChain usage metadata (input_tokens, output_tokens, total_tokens)"""
+    for name, value in (token_usage or {}).items():
+        if name.endswith("_tokens") and isinstance(value, int):
+            LLM_TOKENS.inc(value, model=model, type=name[:-len("_tokens")])
@@ -0,0 +1,95 @@
+import itertools, json, logging, os, threading, time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable
+import torch
+from dotenv import load_dotenv
+from langchain_huggingface import HuggingFaceEmbeddings
+from sentence_transformers import CrossEncoder
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("metrics")
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+RERANK_MODEL = os.getenv("RERANK_MODEL", 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+# Device of local models (cpu, cuda, mps), auto-detected if not set
+MODEL_DEVICE = os.getenv("MODEL_DEVICE") or None
+
+
+@dataclass
+class ModelInfo:
+    """Load statistics of a registered model"""
+    kind: str
+    name: str
+    device: str | None
+    load_s: float
+    memory_mb: float
+
+
+def model_memory_bytes(model: Any) -> int:
+    """
+    Memory of model weights and buffers, looks for torch module in the model handle.
+    """
+    for module in (model, getattr(model, "_client", None), getattr(model, "client", None), getattr(model, "model", None)):
+        if isinstance(module, torch.nn.Module):
+            return sum(t.numel() * t.element_size() for t in itertools.chain(module.parameters(), module.buffers()))
+    return 0
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of shared model handles.
+    Every model is loaded only once per (kind, name, device), concurrent callers wait for the same load.
+    """
+
+    def __init__(self):
+        self._models: dict[tuple[str, str, str | None], Any] = {}
+        self._info: dict[tuple[str, str, str | None], ModelInfo] = {}
+        self._locks: dict[tuple[str, str, str | None], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, name: str, device: str | None, loader: Callable[[], Any]) -> Any:
+        key = (kind, name, device)
+        if key in self._models:
+            return self._models[key]
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self._models:
+                start_time = time.time()
+                model = loader()
+                info = ModelInfo(
+                    kind=kind,
+                    name=name,
+                    device=device,
+                    load_s=round(time.time() - start_time, 4),
+                    memory_mb=round(model_memory_bytes(model) / 1024 ** 2, 2))
+
+                self._models[key] = model
+                self._info[key] = info
+                metrics_logger.info(f"MODEL LOADED: {json.dumps(asdict(info))}")
+
+        return self._models[key]
+
+    def report(self) -> list[dict[str, Any]]:
+        """Load time and memory of every loaded model"""
+        return [asdict(info) for info in self._info.values()]
+
+
+registry = ModelRegistry()
+
+
+def get_embeddings(model_name: str = EMBEDDING_MODEL, device: str | None = MODEL_DEVICE) -> HuggingFaceEmbeddings:
+    """Shared HuggingFaceEmbeddings handle"""
+    model_kwargs = {"device": device} if device else {}
+    return registry.get(
+        "embeddings", model_name, device,
+        lambda: HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs))
+
+
+def get_cross_encoder(model_name: str = RERANK_MODEL, device: str | None = MODEL_DEVICE) -> CrossEncoder:
+    """Shared CrossEncoder handle"""
+    return registry.get("cross_encoder", model_name, device, lambda: CrossEncoder(model_name, device=device))
@@ -0,0 +1,94 @@
+import math
+from typing import Callable
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+DEFAULT_COLLECTION = "langchain"
+
+
+class ChromaStore(Chroma):
+    """
+    Chroma vector store keeping its own chromadb client handle.
+    Bulk queries and batch limits go through the public chromadb client API instead of langchain-chroma internals.
+    """
+
+    def __init__(
+            self,
+            persist_directory: str | None = None,
+            collection_name: str = DEFAULT_COLLECTION,
+            client: chromadb.ClientAPI | None = None,
+            **kwargs):
+        if client is None:
+            client = chromadb.PersistentClient(path=persist_directory) if persist_directory else chromadb.EphemeralClient()
+        super().__init__(collection_name=collection_name, client=client, **kwargs)
+        self.client = client
+        self.collection_name = collection_name
+        self._collection_handle: chromadb.Collection | None = None
+
+    @property
+    def collection(self) -> chromadb.Collection:
+        """Chroma collection of the store (looked up once, collection lookup is a database query)"""
+        if self._collection_handle is None:
+            self._collection_handle = self.client.get_or_create_collection(self.collection_name, embedding_function=None)
+        return self._collection_handle
+
+    @property
+    def max_batch_size(self) -> int:
+        """Max number of records of a single add/upsert"""
+        return self.client.get_max_batch_size()
+
+    def delete_collection(self) -> None:
+        super().delete_collection()
+        self._collection_handle = None
+
+    def reset_collection(self) -> None:
+        super().reset_collection()
+        self._collection_handle = None
+
+    def relevance_score_fn(self) -> Callable[[float], float]:
+        """
+        Relevance (higher is more similar) of a distance in the collection space: l2 (default), cosine or ip.
+        Relevance function given to the constructor takes precedence.
+        """
+        if self.override_relevance_score_fn is not None:
+            return self.override_relevance_score_fn
+
+        configuration = self.collection.configuration
+        space = next((index["space"] for index in (configuration.get("hnsw"), configuration.get("spann")) if index), "l2")
+        # Same relevance functions as LangChain Chroma store
+        if space == "l2":
+            return lambda distance: 1.0 - distance / math.sqrt(2)
+        if space == "cosine":
+            return lambda distance: 1.0 - distance
+        if space == "ip":
+            return lambda distance: 1.0 - distance if distance > 0 else -distance
+        raise ValueError(f"Unknown Chroma distance space: '{space}'")
+
+    def similarity_search_with_relevance_scores_by_vectors(
+            self, embeddings: list[list[float]], k: int) -> list[list[tuple[Document, float]]]:
+        """
+        Single collection query for all embeddings with relevance scores of the distances.
+        Scores aren't clipped to 0-1, so distant documents of L2 space can have negative relevance.
+        """
+        relevance = self.relevance_score_fn()
+        return [[(doc, relevance(distance)) for doc, distance in docs_and_distances]
+                for docs_and_distances in self.query_by_vectors(embeddings, k)]
+
+    def query_by_vectors(
+            self, embeddings: list[list[float]], k: int) -> list[list[tuple[Document, float]]]:
+        """
+        Single collection query for all embeddings.
+        Returns k nearest (document, distance) pairs for every embedding (in input order).
+        """
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            include=["documents", "metadatas", "distances"])
+
+        return [
+            [(Document(page_content=text, metadata=metadata or {}, id=doc_id), distance)
+             for doc_id, text, metadata, distance in zip(ids, texts, metadatas, distances)]
+            for ids, texts, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"])
+        ]
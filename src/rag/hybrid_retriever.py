@@ -0,0 +1,125 @@
+import logging, math, re
+from collections import Counter
+from typing import Any, Iterable
+import numpy as np
+from pydantic import ConfigDict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from src.rag.numpy_store import top_k_indices
+from src.rag.process_csv import iter_docs
+
+logger = logging.getLogger(__name__)
+
+# Reciprocal rank fusion constant, dampens the weight of top ranks
+RRF_K = 60
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def doc_key(doc: Document) -> str:
+    """Identity of a document across retrievers (documents are keyed by disease)"""
+    return doc.metadata.get("disease", doc.page_content)
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index. Postings keep precomputed BM25 weights (idf included),
+    so a query is a sum of posting weights of its tokens over a dense scores array.
+    """
+
+    def __init__(self, docs: Iterable[Document], k1: float = 1.5, b: float = 0.75):
+        self.docs = list(docs)
+        term_freqs = [Counter(tokenize(doc.page_content)) for doc in self.docs]
+        lengths = np.array([sum(tf.values()) for tf in term_freqs], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        for doc_id, tf in enumerate(term_freqs):
+            for token, count in tf.items():
+                ids, counts = postings.setdefault(token, ([], []))
+                ids.append(doc_id)
+                counts.append(count)
+
+        n_docs = len(self.docs)
+        # Length normalization of every document
+        norms = k1 * (1 - b + b * lengths / max(avg_length, 1e-9))
+        self.postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for token, (ids, counts) in postings.items():
+            ids = np.asarray(ids, dtype=np.int64)
+            counts = np.asarray(counts, dtype=np.float32)
+            idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            self.postings[token] = (ids, idf * counts * (k1 + 1) / (counts + norms[ids]))
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @classmethod
+    def from_dataset(cls, dataset_filename: str, **kwargs: Any) -> "BM25Index":
+        index = cls((doc for docs in iter_docs(dataset_filename) for doc in docs), **kwargs)
+        logger.info(f"BM25 index built: {len(index)} docs, {len(index.postings)} terms")
+        return index
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for token, count in Counter(tokenize(query)).items():
+            if token in self.postings:
+                ids, weights = self.postings[token]
+                scores[ids] += count * weights
+        return scores
+
+    def search(self, query: str, k: int) -> list[Document]:
+        """Top k documents with a positive BM25 score"""
+        scores = self.scores(query)
+        return [self.docs[i] for i in top_k_indices(scores, k) if scores[i] > 0]
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], rrf_k: int = RRF_K) -> list[Document]:
+    """
+    Fuse rankings of several retrievers: score(doc) = sum(1 / (rrf_k + rank)) over rankings with the doc.
+    """
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Hybrid retriever - dense vector store and BM25 rankings (fetch_k docs each) fused with reciprocal rank fusion.
+    Returns k best fused documents.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectors_store: VectorStore
+    bm25: BM25Index
+    k: int
+    fetch_k: int
+    rrf_k: int = RRF_K
+
+    def fuse(self, query: str, dense_docs: list[Document]) -> list[Document]:
+        """Fuse already retrieved dense docs with BM25 ranking of the query"""
+        return reciprocal_rank_fusion([dense_docs, self.bm25.search(query, self.fetch_k)], self.rrf_k)[:self.k]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return self.fuse(query, self.vectors_store.similarity_search(query, k=self.fetch_k))
+
+
+def build_retriever(vectors_store: VectorStore, retriever_type: str, k: int, fetch_k: int, dataset_filename: str) -> BaseRetriever:
+    """
+    Candidate retriever of the diagnosis pipeline:
+    "dense" - vector store similarity search (k docs), "hybrid" - dense + BM25 fused with RRF.
+    """
+    if retriever_type == "dense":
+        return vectors_store.as_retriever(search_type="similarity", search_kwargs={"k": k})
+    if retriever_type == "hybrid":
+        return HybridRetriever(vectors_store=vectors_store, bm25=BM25Index.from_dataset(dataset_filename), k=k, fetch_k=fetch_k)
+    raise ValueError(f"Unknown RETRIEVER_TYPE: '{retriever_type}'")
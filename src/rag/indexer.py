@@ -0,0 +1,160 @@
+import argparse, hashlib, json, logging, os, time
+from dataclasses import dataclass, asdict
+from typing import Any
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from src.rag.chroma_store import ChromaStore
+from src.rag.process_csv import iter_docs, CSV_CHUNK_SIZE
+from src.model_registry import get_embeddings, EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("metrics")
+
+load_dotenv()
+
+MANIFEST_FILENAME = "index_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class IndexReport:
+    """Result of a single index synchronization"""
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    rebuilt: bool = False
+    duration_s: float = 0.0
+
+
+def file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def document_hash(doc: Document) -> str:
+    """Hash of document content and metadata"""
+    payload = json.dumps({"content": doc.page_content, "metadata": doc.metadata}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path(db_path: str) -> str:
+    return os.path.join(db_path, MANIFEST_FILENAME)
+
+
+def load_manifest(db_path: str) -> dict[str, Any] | None:
+    path = manifest_path(db_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Index manifest {path} can't be read, index will be rebuilt: {e}")
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def save_manifest(db_path: str, manifest: dict[str, Any]) -> None:
+    """Write manifest atomically, so an interrupted write never leaves a broken manifest"""
+    os.makedirs(db_path, exist_ok=True)
+    path = manifest_path(db_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def sync_index(
+        vectors_store: ChromaStore,
+        dataset_filename: str,
+        db_path: str,
+        embedding_model: str,
+        full_rebuild: bool = False,
+        chunksize: int = CSV_CHUNK_SIZE) -> IndexReport:
+    """
+    Synchronize Chroma store with the CSV dataset using the manifest stored in db_path.
+    Documents are keyed by disease - only new and changed documents are embedded and upserted,
+    removed diseases are deleted. Whole index is rebuilt if there is no manifest
+    or the embedding model has changed.
+    """
+    start_time = time.time()
+    report = IndexReport()
+    dataset_hash = file_hash(dataset_filename)
+    manifest = None if full_rebuild else load_manifest(db_path)
+
+    # Unchanged dataset - nothing to parse or embed
+    if manifest and manifest["embedding_model"] == embedding_model and manifest["dataset_hash"] == dataset_hash:
+        report.unchanged = len(manifest["documents"])
+        report.duration_s = round(time.time() - start_time, 4)
+        logger.info(f"Vector index is up to date: {report.unchanged} documents")
+        return report
+
+    if manifest is None or manifest["embedding_model"] != embedding_model:
+        logger.info(f"Rebuilding vector index in {db_path} with embedding model {embedding_model}")
+        vectors_store.reset_collection()
+        report.rebuilt = True
+        indexed = {}
+    else:
+        indexed = manifest["documents"]
+
+    # Dataset is processed in chunks, only hashes of all documents are kept in memory
+    hashes = {}
+    max_batch_size = vectors_store.max_batch_size
+    for docs in iter_docs(dataset_filename, chunksize):
+        changed = []
+        for doc in docs:
+            disease = doc.metadata["disease"]
+            hashes[disease] = document_hash(doc)
+            if indexed.get(disease) != hashes[disease]:
+                changed.append(doc)
+                if disease in indexed:
+                    report.updated += 1
+                else:
+                    report.added += 1
+            else:
+                report.unchanged += 1
+
+        # Chroma limits the number of records of a single upsert
+        for offset in range(0, len(changed), max_batch_size):
+            batch = changed[offset:offset + max_batch_size]
+            vectors_store.add_documents(batch, ids=[doc.metadata["disease"] for doc in batch])
+
+    removed = [disease for disease in indexed if disease not in hashes]
+    if removed:
+        vectors_store.delete(ids=removed)
+    report.deleted = len(removed)
+
+    save_manifest(db_path, {
+        "version": MANIFEST_VERSION,
+        "dataset_hash": dataset_hash,
+        "embedding_model": embedding_model,
+        "documents": hashes,
+        "updated_at": time.time(),
+    })
+
+    report.duration_s = round(time.time() - start_time, 4)
+    metrics_logger.info(f"INDEX METRICS: {json.dumps(asdict(report))}")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incrementally index the disease dataset into Chroma vector store")
+    parser.add_argument("--dataset", default=os.getenv("DATASET_FILENAME"), help="CSV dataset path")
+    parser.add_argument("--db-path", default=os.getenv("DB_PATH"), help="Chroma persist directory")
+    parser.add_argument("--full", action="store_true", help="Re-embed all documents")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    vectors_store = ChromaStore(persist_directory=args.db_path, embedding_function=get_embeddings(EMBEDDING_MODEL))
+    report = sync_index(vectors_store, args.dataset, args.db_path, EMBEDDING_MODEL, full_rebuild=args.full)
+
+    print(f"added={report.added} updated={report.updated} deleted={report.deleted} "
+          f"unchanged={report.unchanged} rebuilt={report.rebuilt} duration_s={report.duration_s}")
+
+
+if __name__ == "__main__":
+    main()
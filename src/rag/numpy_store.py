@@ -0,0 +1,183 @@
+import logging, uuid
+from typing import Any, Callable, Iterable, Sequence
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Rows of float16 matrix converted to float32 at once during search
+SCORE_BLOCK_ROWS = 8192
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2 normalize vectors (last axis), so dot product equals cosine similarity"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of k highest scores for every row (sorted by score, descending).
+    Uses argpartition, so only k selected scores are sorted.
+    """
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    top_scores = np.take_along_axis(scores, top, axis=-1)
+    return np.take_along_axis(top, np.argsort(-top_scores, axis=-1, kind="stable"), axis=-1)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-memory vector store with exact top-k cosine search.
+    Document embeddings are kept in a contiguous normalized float32 (or float16) matrix,
+    a query is a single matrix-vector product followed by argpartition.
+    """
+
+    def __init__(self, embedding: Embeddings, dtype: str = "float32"):
+        self._embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self._matrix = np.empty((0, 0), dtype=self.dtype)
+        self._docs: list[Document] = []
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the embeddings matrix"""
+        return self._matrix.nbytes
+
+    def add_embeddings(
+            self,
+            texts: Sequence[str],
+            embeddings: Sequence[Sequence[float]] | np.ndarray,
+            metadatas: Sequence[dict] | None = None,
+            ids: Sequence[str] | None = None) -> list[str]:
+        """
+        Add texts with already computed embeddings.
+        """
+        vectors = normalize(np.asarray(embeddings, dtype=np.float32)).astype(self.dtype)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+
+        self._matrix = np.ascontiguousarray(vectors if not self._docs else np.vstack([self._matrix, vectors]))
+        self._docs.extend(
+            Document(page_content=text, metadata=metadata, id=doc_id)
+            for text, metadata, doc_id in zip(texts, metadatas, ids))
+        return ids
+
+    def add_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: list[dict] | None = None,
+            *,
+            ids: list[str] | None = None,
+            **kwargs: Any) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool | None:
+        if ids is None:
+            return False
+        ids_to_delete = set(ids)
+        keep = [i for i, doc in enumerate(self._docs) if doc.id not in ids_to_delete]
+        self._matrix = np.ascontiguousarray(self._matrix[keep]) if keep else np.empty((0, 0), dtype=self.dtype)
+        self._docs = [self._docs[i] for i in keep]
+        return True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        docs_by_id = {doc.id: doc for doc in self._docs}
+        return [docs_by_id[doc_id] for doc_id in ids if doc_id in docs_by_id]
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        queries = normalize(np.asarray(queries, dtype=np.float32))
+        if self.dtype == np.float32:
+            return queries @ self._matrix.T
+
+        # NumPy has no BLAS kernels for float16, so score in float32 blocks to keep memory bounded
+        scores = np.empty((queries.shape[0], len(self._docs)), dtype=np.float32)
+        for start in range(0, len(self._docs), SCORE_BLOCK_ROWS):
+            block = self._matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + SCORE_BLOCK_ROWS] = queries @ block.T
+        return scores
+
+    def similarity_search_with_score_by_vector(self, embedding: list[float], k: int = 4) -> list[tuple[Document, float]]:
+        """
+        Returns k most similar documents with cosine similarity (higher is better).
+        """
+        if not self._docs:
+            return []
+        scores = self._scores(np.asarray(embedding)[None, :])[0]
+        return [(self._docs[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def similarity_search_with_score_by_vectors(
+            self, embeddings: Sequence[Sequence[float]], k: int = 4) -> list[list[tuple[Document, float]]]:
+        """
+        Bulk search - one matrix-matrix product for all query embeddings, with cosine similarities.
+        """
+        if not self._docs:
+            return [[] for _ in embeddings]
+        scores = self._scores(np.asarray(embeddings))
+        top = top_k_indices(scores, k)
+        return [[(self._docs[i], float(row_scores[i])) for i in row] for row, row_scores in zip(top, scores)]
+
+    def similarity_search_by_vectors(self, embeddings: Sequence[Sequence[float]], k: int = 4) -> list[list[Document]]:
+        """
+        Bulk search - one matrix-matrix product for all query embeddings.
+        """
+        if not self._docs:
+            return [[] for _ in embeddings]
+        top = top_k_indices(self._scores(np.asarray(embeddings)), k)
+        return [[self._docs[i] for i in row] for row in top]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_with_relevance_scores_by_vectors(
+            self, embeddings: Sequence[Sequence[float]], k: int = 4) -> list[list[tuple[Document, float]]]:
+        """
+        Bulk search with relevance scores (0-1, higher is more similar) for all query embeddings.
+        """
+        return [[(doc, self.relevance_score(score)) for doc, score in docs_and_scores]
+                for docs_and_scores in self.similarity_search_with_score_by_vectors(embeddings, k)]
+
+    @staticmethod
+    def relevance_score(similarity: float) -> float:
+        """Cosine similarity [-1, 1] -> relevance [0, 1]"""
+        return (similarity + 1.0) / 2.0
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Relevance function of LangChain similarity_search_with_relevance_scores
+        return self.relevance_score
+
+    @classmethod
+    def from_texts(
+            cls,
+            texts: list[str],
+            embedding: Embeddings,
+            metadatas: list[dict] | None = None,
+            *,
+            ids: list[str] | None = None,
+            dtype: str = "float32",
+            **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding=embedding, dtype=dtype)
+        store.add_texts(texts, metadatas, ids=ids)
+        logger.info(f"NumPy vector index built: {len(store)} docs, {store.nbytes / 1024:.1f} KiB, dtype={store.dtype}")
+        return store
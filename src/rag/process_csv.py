@@ -1,10 +1,17 @@
-import logging
-from typing import TypedDict
+import logging, os
+from typing import Iterator, TypedDict
+from dotenv import load_dotenv
 from langchain_core.documents import Document
+import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+load_dotenv()
+
+# Rows of the CSV dataset read, embedded and indexed at once
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", 10_000))
+
 
 class MetaData(TypedDict):
     """
@@ -19,24 +26,28 @@ def prepare_docs(df: pd.DataFrame, source: str) -> list[Document]:
     """
     Preprocess the dataframe into a list of Documents with metadata for Vectors store.
     Each document contains disease name, ICD code, symptoms and their probabilities.
+    Non-zero symptoms of all rows are found at once with NumPy over the whole symptoms matrix.
     """
-    docs = []
     # List of symptom columns
     symptom_cols = df.columns.drop(['prognosis', 'icd_code'])
+    labels = [f"- {symptom.replace('_', ' ')} " for symptom in symptom_cols]
+    # Integer columns are printed without decimal part, same as their Python values
+    is_int = [pd.api.types.is_integer_dtype(dtype) for dtype in df[symptom_cols].dtypes]
+
+    matrix = df[symptom_cols].to_numpy(dtype=np.float64)
+    rows, cols = np.nonzero(matrix > 0.0)
+    values = matrix[rows, cols]
+    symptoms = [f"{labels[col]}{int(value) if is_int[col] else value}%"
+                for col, value in zip(cols.tolist(), values.tolist())]
+    # np.nonzero is row-major, so symptoms of every row are contiguous
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(df)))]).tolist()
 
-    for _, row in df.iterrows():
-        disease = row['prognosis']
-        icd_code = row['icd_code']
+    docs = []
+    for i, (disease, icd_code) in enumerate(zip(df['prognosis'].tolist(), df['icd_code'].tolist())):
         content = [f'Disease: {disease} ICD CODE: {icd_code}',
                    'Symptoms and probabilities of appearance:']
 
-        symptoms = []
-        for symptom in symptom_cols:
-            if row[symptom] > 0.0:
-                symptoms.append(
-                    f"- {symptom.replace('_', ' ')} {row[symptom]}%")
-
-        doc_content = "\n".join(content + symptoms)
+        doc_content = "\n".join(content + symptoms[bounds[i]:bounds[i + 1]])
         doc_metadata = MetaData(
             disease=disease, icd_code=icd_code, source=source)
         doc = Document(page_content=doc_content, metadata=doc_metadata)
@@ -44,3 +55,28 @@ def prepare_docs(df: pd.DataFrame, source: str) -> list[Document]:
 
     logger.info(f"Loaded {len(docs)} documents from {source}.")
     return docs
+
+
+def read_symptom_dtypes(dataset_filename: str, chunksize: int = CSV_CHUNK_SIZE) -> dict[str, str]:
+    """
+    Dtypes of symptom columns over the whole CSV dataset (read in chunks of symptom columns only).
+    A column is integer only if it's integer in every chunk (e.g. a chunk with a missing value makes it float).
+    """
+    columns = pd.read_csv(dataset_filename, nrows=0).columns.drop(['prognosis', 'icd_code'])
+    is_int = dict.fromkeys(columns, True)
+    for chunk in pd.read_csv(dataset_filename, usecols=list(columns), chunksize=chunksize):
+        for column, dtype in chunk.dtypes.items():
+            is_int[column] = is_int[column] and pd.api.types.is_integer_dtype(dtype)
+    return {column: "int64" if integer else "float64" for column, integer in is_int.items()}
+
+
+def iter_docs(dataset_filename: str, chunksize: int = CSV_CHUNK_SIZE) -> Iterator[list[Document]]:
+    """
+    Read CSV dataset in chunks of rows and yield prepared Documents of every chunk,
+    so only one chunk of rows and documents is kept in memory at once.
+    Symptom dtypes are decided once for the whole dataset, so document text (and its content hash)
+    doesn't depend on chunk boundaries.
+    """
+    dtypes = read_symptom_dtypes(dataset_filename, chunksize)
+    for chunk in pd.read_csv(dataset_filename, chunksize=chunksize, dtype=dtypes):
+        yield prepare_docs(chunk, dataset_filename)
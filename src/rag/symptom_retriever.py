@@ -0,0 +1,120 @@
+import logging, os, re
+from typing import Any
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from pydantic import ConfigDict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from src.rag.process_csv import prepare_docs
+from src.rag.numpy_store import normalize, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Structured symptom-probability retriever as an extra candidate source of diagnosis pipeline
+SYMPTOM_RETRIEVER = os.getenv("SYMPTOM_RETRIEVER", "false").lower() == "true"
+SYMPTOM_RETRIEVER_K = int(os.getenv("SYMPTOM_RETRIEVER_K", 6))
+# Min cosine similarity of an input symptom and a symptom column name to be matched
+SYMPTOM_MATCH_THRESHOLD = float(os.getenv("SYMPTOM_MATCH_THRESHOLD", 0.5))
+# Probability of a symptom not listed for a disease (keeps log-likelihood finite)
+SYMPTOM_EPSILON = 1e-3
+
+
+def split_symptoms(query: str) -> list[str]:
+    """Split free-text symptoms query ("fever, cough and headache") into single symptoms"""
+    return [part.strip() for part in re.split(r",|;|\n|\band\b", query) if part.strip()]
+
+
+class SymptomProbabilityRetriever(BaseRetriever):
+    """
+    Structured retriever over the disease x symptom probability matrix of the dataset.
+    Every input symptom is mapped to the nearest symptom column by precomputed column name embeddings,
+    then all diseases are scored at once with a log-likelihood of matched symptoms:
+        score(disease) = sum(similarity(symptom) * log(P(symptom | disease) + epsilon))
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    embeddings: Embeddings
+    symptom_names: list[str]
+    # Normalized embeddings of symptom names (symptoms x dim)
+    symptom_vectors: np.ndarray
+    # Log probabilities (diseases x symptoms)
+    log_probabilities: np.ndarray
+    docs: list[Document]
+    k: int = SYMPTOM_RETRIEVER_K
+    match_threshold: float = SYMPTOM_MATCH_THRESHOLD
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, source: str, embeddings: Embeddings, **kwargs: Any) -> "SymptomProbabilityRetriever":
+        symptom_cols = df.columns.drop(['prognosis', 'icd_code'])
+        symptom_names = [symptom.replace('_', ' ') for symptom in symptom_cols]
+        # Dataset holds probabilities in percents
+        probabilities = np.nan_to_num(df[symptom_cols].to_numpy(dtype=np.float32)) / 100.0
+
+        retriever = cls(
+            embeddings=embeddings,
+            symptom_names=symptom_names,
+            symptom_vectors=normalize(np.asarray(embeddings.embed_documents(symptom_names), dtype=np.float32)),
+            log_probabilities=np.log(np.clip(probabilities, 0.0, 1.0) + SYMPTOM_EPSILON),
+            docs=prepare_docs(df, source),
+            **kwargs)
+        logger.info(f"Symptom retriever built: {len(retriever.docs)} diseases, {len(symptom_names)} symptoms")
+        return retriever
+
+    @classmethod
+    def from_dataset(cls, dataset_filename: str, embeddings: Embeddings, **kwargs: Any) -> "SymptomProbabilityRetriever":
+        return cls.from_dataframe(pd.read_csv(dataset_filename), dataset_filename, embeddings, **kwargs)
+
+    def query_weights(self, queries: list[str]) -> np.ndarray:
+        """
+        Symptom weights of every query (queries x symptoms) - similarity of the nearest symptom column
+        for every matched input symptom. All input symptoms of all queries are embedded in one call.
+        """
+        parts = [split_symptoms(query) for query in queries]
+        flat = [symptom for symptoms in parts for symptom in symptoms]
+        weights = np.zeros((len(queries), len(self.symptom_names)), dtype=np.float32)
+        if not flat:
+            return weights
+
+        similarities = normalize(np.asarray(self.embeddings.embed_documents(flat), dtype=np.float32)) @ self.symptom_vectors.T
+        best = similarities.argmax(axis=1)
+        best_similarity = similarities[np.arange(len(flat)), best]
+        query_ids = np.repeat(np.arange(len(queries)), [len(symptoms) for symptoms in parts])
+
+        matched = best_similarity >= self.match_threshold
+        # Same column matched by several input symptoms is counted once with the best similarity
+        np.maximum.at(weights, (query_ids[matched], best[matched]), best_similarity[matched])
+        return weights
+
+    def score(self, queries: list[str]) -> np.ndarray:
+        """Log-likelihood scores of all diseases for every query (queries x diseases)"""
+        return self.query_weights(queries) @ self.log_probabilities.T
+
+    def batch_search(self, queries: list[str], k: int | None = None) -> list[list[Document]]:
+        """Top k diseases of every query, queries without any matched symptom return no documents"""
+        if not queries:
+            return []
+        weights = self.query_weights(queries)
+        top = top_k_indices(weights @ self.log_probabilities.T, k or self.k)
+        return [[self.docs[i] for i in row] if weights[q].any() else [] for q, row in enumerate(top)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return self.batch_search([query])[0]
+
+
+def merge_candidates(*docs_lists: list[Document]) -> list[Document]:
+    """Merge candidate documents of several retrievers, first occurrence of every disease is kept"""
+    seen = set()
+    merged = []
+    for docs in docs_lists:
+        for doc in docs:
+            key = doc.metadata.get("disease", doc.page_content)
+            if key not in seen:
+                seen.add(key)
+                merged.append(doc)
+    return merged
@@ -1,8 +1,12 @@
-import logging, os, pandas as pd
+import logging, os
 from dotenv import load_dotenv
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from src.rag.process_csv import prepare_docs
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from src.rag.process_csv import iter_docs
+from src.rag.numpy_store import NumpyVectorStore
+from src.rag.chroma_store import ChromaStore
+from src.rag.indexer import sync_index
+from src.model_registry import get_embeddings, EMBEDDING_MODEL
 
 logger = logging.getLogger(__name__)
 
@@ -10,26 +14,59 @@ load_dotenv()
 
 DATASET_FILENAME = os.getenv("DATASET_FILENAME")
 DB_PATH = os.getenv("DB_PATH")
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Vector store backend: "chroma" (persistent) or "numpy" (in-memory exact search)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# Embeddings matrix dtype of numpy backend: float32 or float16
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32")
 
 
-def get_vectors_store() -> Chroma:
+def get_vectors_store() -> VectorStore:
     """
-    Load or create a Chroma vector store from the CSV dataset by using prepare_docs.
-    Uses HuggingFaceEmbeddings local embeddings model specified in EMBEDDING_MODEL env. variable.
+    Load or create a vector store from the CSV dataset, read in chunks by iter_docs.
+    Backend is specified in VECTOR_BACKEND env. variable:
+    Chroma store is persisted in DB_PATH and synchronized with the dataset on startup,
+    NumPy index is built in memory on every startup.
+    Uses shared HuggingFaceEmbeddings local embeddings model specified in EMBEDDING_MODEL env. variable.
     """
-    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    embeddings = get_embeddings(EMBEDDING_MODEL)
     # embeddings = GoogleGenerativeAIEmbeddings(model='gemini-embedding-001')
 
-    if os.path.exists(DB_PATH):
-        logger.info(f"Loading existing vector store from: {DB_PATH}")
-        return Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
-    else:
-        logger.info(f"Vector store not found. Creating new vector store in: {DB_PATH}")
-        df = pd.read_csv(DATASET_FILENAME)
-        docs = prepare_docs(df, DATASET_FILENAME)
-
-        return Chroma.from_documents(
-            documents=docs,
-            embedding=embeddings,
-            persist_directory=DB_PATH)
+    if VECTOR_BACKEND == "numpy":
+        logger.info(f"Building in-memory NumPy vector index from: {DATASET_FILENAME}")
+        vectors_store = NumpyVectorStore(embedding=embeddings, dtype=VECTOR_DTYPE)
+        for docs in iter_docs(DATASET_FILENAME):
+            vectors_store.add_documents(docs)
+        logger.info(f"NumPy vector index built: {len(vectors_store)} docs, {vectors_store.nbytes / 1024:.1f} KiB")
+        return vectors_store
+    elif VECTOR_BACKEND != "chroma":
+        raise ValueError(f"Unknown VECTOR_BACKEND: '{VECTOR_BACKEND}'")
+
+    # Only new and changed documents are embedded, see src/rag/indexer.py
+    vectors_store = ChromaStore(persist_directory=DB_PATH, embedding_function=embeddings)
+    report = sync_index(vectors_store, DATASET_FILENAME, DB_PATH, EMBEDDING_MODEL)
+    logger.info(f"Vector store loaded from: {DB_PATH} ({report})")
+    return vectors_store
+
+
+def similarity_search_by_vectors(vectors_store: VectorStore, embeddings: list[list[float]], k: int) -> list[list[Document]]:
+    """
+    Bulk similarity search - runs a single query (Chroma) or matrix product (NumPy) for all query embeddings,
+    other stores are searched one embedding at a time.
+    Returns a list of k nearest documents for every embedding (in input order).
+    """
+    if isinstance(vectors_store, NumpyVectorStore):
+        return vectors_store.similarity_search_by_vectors(embeddings, k)
+    if isinstance(vectors_store, ChromaStore):
+        return [[doc for doc, _ in docs_and_distances] for docs_and_distances in vectors_store.query_by_vectors(embeddings, k)]
+    return [vectors_store.similarity_search_by_vector(embedding, k) for embedding in embeddings]
+
+
+def similarity_search_with_relevance_scores_by_vectors(
+        vectors_store: VectorStore, embeddings: list[list[float]], k: int) -> list[list[tuple[Document, float]]]:
+    """
+    Bulk similarity search with relevance scores of the store (relevance function of its distance, higher is more similar).
+    Returns a list of k nearest (document, relevance) pairs for every embedding (in input order).
+    """
+    if isinstance(vectors_store, (NumpyVectorStore, ChromaStore)):
+        return vectors_store.similarity_search_with_relevance_scores_by_vectors(embeddings, k)
+    raise ValueError(f"Bulk relevance search is not supported by {type(vectors_store).__name__}")
@@ -1,18 +1,99 @@
+import json, logging, os
 from http.client import HTTPException
+from typing import Annotated, Any
 
 import fastapi
-from fastapi import FastAPI, Depends, APIRouter, HTTPException
-from src.schemas import SymptomsInput, DiagnoseResponse
+from dotenv import load_dotenv
+from fastapi import FastAPI, Depends, APIRouter, HTTPException, Body, Header, Response
+from fastapi.responses import StreamingResponse
+from src.schemas import SymptomsInput, DiagnoseResponse, BatchDiagnoseResponse
 from src.dependencies import get_rag_assistant
 from src.llm.guardrails import SecurityError
+from src.metrics import REQUESTS_IN_FLIGHT
+from src.tracing import span, parse_trace_id, TRACE_HEADER
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 500))
 
 router = APIRouter()
 
 
 @router.post("/diagnose", response_model=DiagnoseResponse)
-async def diagnose(symptoms: SymptomsInput, rag_assistant=Depends(get_rag_assistant)) -> DiagnoseResponse:
+async def diagnose(
+        symptoms: SymptomsInput,
+        response: Response,
+        use_cache: bool = True,
+        x_trace_id: Annotated[str | None, Header()] = None,
+        rag_assistant=Depends(get_rag_assistant)) -> DiagnoseResponse:
+    """
+    Diagnose patient, the request is traced under the X-Trace-Id header trace (e.g. of a chat agent tool call).
+    """
+    try:
+        with REQUESTS_IN_FLIGHT.track_inprogress(endpoint="/diagnose"), \
+                span("POST /diagnose", trace_id=parse_trace_id(x_trace_id)) as request_span:
+            response.headers[TRACE_HEADER] = request_span.trace_id
+            diagnosis: DiagnoseResponse = await rag_assistant.adiagnose(symptoms, use_cache=use_cache)
+        return diagnosis
+    except SecurityError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+@router.post("/diagnose/batch", response_model=BatchDiagnoseResponse)
+async def diagnose_batch(
+        patients: Annotated[list[SymptomsInput], Body(min_length=1, max_length=MAX_BATCH_SIZE)],
+        response: Response,
+        use_cache: bool = True,
+        x_trace_id: Annotated[str | None, Header()] = None,
+        rag_assistant=Depends(get_rag_assistant)) -> BatchDiagnoseResponse:
+    with REQUESTS_IN_FLIGHT.track_inprogress(endpoint="/diagnose/batch"), \
+            span("POST /diagnose/batch", trace_id=parse_trace_id(x_trace_id), patients=len(patients)) as request_span:
+        response.headers[TRACE_HEADER] = request_span.trace_id
+        batch: BatchDiagnoseResponse = await rag_assistant.adiagnose_batch(patients, use_cache=use_cache)
+    return batch
+
+
+def sse_event(event: str, data: dict[str, Any]) -> str:
+    """Format Server-Sent Event message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/diagnose/stream", response_class=StreamingResponse)
+async def diagnose_stream(
+        symptoms: SymptomsInput,
+        use_cache: bool = True,
+        rag_assistant=Depends(get_rag_assistant)) -> StreamingResponse:
+    """
+    Stream diagnosis as Server-Sent Events: "candidates" after reranking,
+    "disease" for every parsed disease, "metrics" at the end ("error" if the pipeline fails).
+    """
+    events = rag_assistant.astream_diagnose(symptoms, use_cache=use_cache)
+    # Request is in flight until the stream ends
+    REQUESTS_IN_FLIGHT.inc(endpoint="/diagnose/stream")
+    # First event is awaited here, so guardrails errors are still returned as 403
     try:
-        response: DiagnoseResponse = rag_assistant.diagnose(symptoms)
-        return response
+        first_event = await anext(events)
     except SecurityError as e:
+        REQUESTS_IN_FLIGHT.dec(endpoint="/diagnose/stream")
         raise HTTPException(status_code=403, detail=str(e))
+    except BaseException:
+        REQUESTS_IN_FLIGHT.dec(endpoint="/diagnose/stream")
+        raise
+
+    async def event_stream():
+        try:
+            yield sse_event(*first_event)
+            async for event in events:
+                yield sse_event(*event)
+        except Exception as e:
+            logger.error(f"DIAGNOSE STREAM ERROR: {e}")
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            REQUESTS_IN_FLIGHT.dec(endpoint="/diagnose/stream")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
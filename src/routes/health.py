@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz() -> dict[str, str]:
+    """Liveness probe - process is up"""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz(request: Request) -> JSONResponse:
+    """Readiness probe - all models are loaded and warm"""
+    startup = request.app.state.startup
+    return JSONResponse(status_code=200 if startup.ready else 503, content=startup.report())
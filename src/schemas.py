@@ -28,3 +28,17 @@ class DiseaseDetails(BaseModel):
 class DiagnoseResponse(BaseModel):
     """Response schema for diagnose endpoint"""
     possible_diseases: list[DiseaseDetails]
+
+
+class BatchDiagnoseItem(BaseModel):
+    """Single patient result of batch diagnose endpoint (in request order)"""
+    index: int = Field(..., description="Position of the patient in the request list")
+    result: DiagnoseResponse | None = None
+    error: str | None = Field(None, description="Error message if diagnosis failed for this patient")
+    latency: dict[str, float] = Field(default_factory=dict, description="Per-item timings in seconds")
+
+
+class BatchDiagnoseResponse(BaseModel):
+    """Response schema for batch diagnose endpoint"""
+    results: list[BatchDiagnoseItem]
+    latency: dict[str, float] = Field(..., description="Per-stage timings of the whole batch in seconds")
@@ -0,0 +1,134 @@
+import asyncio, json, logging, os, time
+from typing import Any, Callable
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from langchain_core.vectorstores import VectorStore
+from sentence_transformers import CrossEncoder
+from src.rag.vectors_store import get_vectors_store, DATASET_FILENAME
+from src.rag.symptom_retriever import SymptomProbabilityRetriever, SYMPTOM_RETRIEVER
+from src.llm import DiagnosisAssistant, LocalChatAgent
+from src.model_registry import get_cross_encoder, get_embeddings, registry, RERANK_MODEL, EMBEDDING_MODEL
+from src.llm.cache import get_diagnosis_cache
+from src.llm.tools import register_diagnosis_assistant
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("metrics")
+
+load_dotenv()
+
+# Startup mode: "eager" (server accepts traffic after all models are warm) or "background"
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+
+WARMUP_QUERY = "fever, cough, headache"
+
+
+class StartupState:
+    """
+    Tracks loading status and load/warmup times of every startup component.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.components: dict[str, dict[str, Any]] = {}
+        self.total_s: float | None = None
+        # Error of the startup task itself (e.g. background loading failed outside of any component)
+        self.error: str | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.error is None and bool(self.components) and all(c["status"] == "ready" for c in self.components.values())
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or any(c["status"] == "failed" for c in self.components.values())
+
+    async def run(self, name: str, load: Callable[[], Any], warmup: Callable[[Any], None] | None = None) -> Any:
+        """
+        Load component and run its warmup in a worker thread, recording status and timings.
+        """
+        component = self.components.setdefault(name, {"status": "pending"})
+        try:
+            component["status"] = "loading"
+            start_load = time.time()
+            obj = await asyncio.to_thread(load)
+            component["load_s"] = round(time.time() - start_load, 4)
+
+            if warmup is not None:
+                component["status"] = "warming_up"
+                start_warmup = time.time()
+                await asyncio.to_thread(warmup, obj)
+                component["warmup_s"] = round(time.time() - start_warmup, 4)
+
+            component["status"] = "ready"
+            logger.info(f"Startup component '{name}' ready: {component}")
+            return obj
+        except Exception as e:
+            component["status"] = "failed"
+            component["error"] = str(e)
+            logger.error(f"Startup component '{name}' failed: {e}")
+            raise
+
+    def task_done(self, task: asyncio.Task) -> None:
+        """
+        Done callback of the startup task, retrieves and records its exception so it's reported by /readyz.
+        """
+        if task.cancelled() or (exc := task.exception()) is None:
+            return
+        self.error = f"{type(exc).__name__}: {exc}"
+        logger.error(f"Startup failed: {self.error}", exc_info=exc)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "failed" if self.failed else "starting",
+            "error": self.error,
+            "uptime_s": round(time.time() - self.started_at, 4),
+            "startup_s": self.total_s,
+            "components": self.components,
+            "models": registry.report(),
+        }
+
+
+def warmup_vectors_store(vectors_store: VectorStore) -> None:
+    """Embed a synthetic query and search the store"""
+    vectors_store.similarity_search(WARMUP_QUERY, k=1)
+
+
+def warmup_cross_encoder(cross_encoder: CrossEncoder) -> None:
+    """Score a synthetic (query, doc) pair"""
+    cross_encoder.predict([[WARMUP_QUERY, WARMUP_QUERY]])
+
+
+async def load_models(app: FastAPI, chat_agent: LocalChatAgent, startup: StartupState) -> None:
+    """
+    Load and warm up vector store, CrossEncoder, local chat model (and symptom retriever) in parallel,
+    then publish DiagnosisAssistant in app.state. Startup time breakdown is logged to metrics.
+    """
+    # Components are registered up front, so /readyz reports all of them from the start
+    names = ["vectors_store", "cross_encoder", "chat_model", "diagnosis_assistant"]
+    if SYMPTOM_RETRIEVER:
+        names.insert(2, "symptom_retriever")
+    for name in names:
+        startup.components[name] = {"status": "pending"}
+
+    loaders = [
+        startup.run("vectors_store", get_vectors_store, warmup_vectors_store),
+        startup.run("cross_encoder", lambda: get_cross_encoder(RERANK_MODEL), warmup_cross_encoder),
+        startup.run("chat_model", chat_agent.load, lambda agent: agent.warmup()),
+    ]
+    if SYMPTOM_RETRIEVER:
+        loaders.append(startup.run("symptom_retriever", lambda: SymptomProbabilityRetriever.from_dataset(
+            DATASET_FILENAME, get_embeddings(EMBEDDING_MODEL))))
+    vectors_store, cross_encoder, _, *symptom_retriever = await asyncio.gather(*loaders)
+
+    rag_assistant = await startup.run("diagnosis_assistant", lambda: DiagnosisAssistant(
+        vectors_store=vectors_store,
+        cache=get_diagnosis_cache(),
+        cross_encoder=cross_encoder,
+        symptom_retriever=symptom_retriever[0] if symptom_retriever else None))
+
+    app.state.rag_assistant = rag_assistant
+    # Chat agent tools call the assistant directly instead of HTTP loopback
+    register_diagnosis_assistant(rag_assistant)
+
+    startup.total_s = round(time.time() - startup.started_at, 4)
+    metrics_logger.info(f"STARTUP METRICS: {json.dumps({'total_s': startup.total_s, 'components': startup.components, 'models': registry.report()})}")
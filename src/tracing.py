@@ -0,0 +1,134 @@
+import json, logging, os, re, time, uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Export of completed traces (lines of "traces" logger, written to TRACES_FILE by init_logging)
+TRACING = os.getenv("TRACING", "true").lower() == "true"
+# Only traces slower than this are exported (0 - all traces)
+TRACE_MIN_DURATION_S = float(os.getenv("TRACE_MIN_DURATION_S", 0))
+# HTTP header carrying the trace id between services
+TRACE_HEADER = "X-Trace-Id"
+
+traces_logger = logging.getLogger("traces")
+
+RE_TRACE_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+@dataclass
+class Span:
+    """Timed operation of a trace, start and end are monotonic clock (perf_counter) readings"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start: float = field(default_factory=time.perf_counter)
+    end: float | None = None
+    status: str = "ok"
+
+    @property
+    def duration_s(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    start_time: float = field(default_factory=time.time)
+    spans: list[Span] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Trace record with span offsets from the root start (waterfall view)"""
+        root = self.spans[0]
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "start_time": self.start_time,
+            "duration_s": round(root.duration_s, 6),
+            "spans": [{
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "offset_s": round(span.start - root.start, 6),
+                "duration_s": round(span.duration_s, 6),
+                "status": span.status,
+                "attributes": span.attributes,
+            } for span in self.spans],
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def new_id(length: int = 32) -> str:
+    return uuid.uuid4().hex[:length]
+
+
+def parse_trace_id(value: str | None) -> str | None:
+    """Trace id from an incoming header, None if missing or malformed"""
+    return value if value and RE_TRACE_ID.fullmatch(value) else None
+
+
+def current_trace_id() -> str | None:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def export_trace(trace: Trace) -> None:
+    traces_logger.info(json.dumps(trace.to_dict(), default=str))
+
+
+def _reset(var: ContextVar, token: Token, value: Any) -> None:
+    # Span closed in another context (e.g. async generator resumed by a different task)
+    try:
+        var.reset(token)
+    except ValueError:
+        var.set(value)
+
+
+@contextmanager
+def span(name: str, trace_id: str | None = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Record a span nested in the current one. Without a current span a new trace is started
+    (with trace_id if given, e.g. from TRACE_HEADER) and exported when its root span ends.
+    """
+    parent = _current_span.get()
+    trace = _current_trace.get() if parent is not None else None
+    if trace is None:
+        trace = Trace(trace_id=trace_id or new_id())
+    current = Span(
+        name=name,
+        trace_id=trace.trace_id,
+        span_id=new_id(16),
+        parent_id=parent.span_id if parent is not None else None,
+        attributes=attributes)
+    trace.spans.append(current)
+
+    previous_trace = _current_trace.get()
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.status = "error"
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _reset(_current_span, span_token, parent)
+        _reset(_current_trace, trace_token, previous_trace)
+        if parent is None and TRACING and current.duration_s >= TRACE_MIN_DURATION_S:
+            export_trace(trace)
@@ -1,4 +1,5 @@
-from typing import Any
+from contextlib import aclosing
+from typing import Any, AsyncIterator
 
 import gradio as gr
 from src.llm import LocalChatAgent
@@ -11,7 +12,8 @@ EXAMPLES = [
 
 class ChatAgentUI:
     def __init__(self, local_model: str):
-        self.chat_agent = LocalChatAgent(local_model)
+        # Model is loaded at app startup (or on first chat), not at import time
+        self.chat_agent = LocalChatAgent(local_model, load=False)
 
         with gr.Blocks(title="Medical Diagnosis Assistant API") as self.ui:
             gr.HTML("<h1 style='text-align: center;'>👨‍⚕️ Medical Diagnosis Assistant API</h1>")
@@ -44,13 +46,19 @@ class ChatAgentUI:
                         "**Bigger LLM like `gemini-2.5-flash` may take longer time to respond than lite version.️**\n\n"
                         "**For best performance, it's recommended to use default LLMs models.**")
 
-    def clear_history(self) -> None:
-        """Clear chat agent history"""
-        self.chat_agent.reset_history()
+    def clear_history(self, request: gr.Request) -> None:
+        """Clear chat agent history of the current browser session"""
+        self.chat_agent.reset_history(request.session_hash)
 
-    async def respond(self, message: str, history: Any) -> str:
+    async def respond(self, message: str, history: Any, request: gr.Request) -> AsyncIterator[str]:
+        """Stream agent answer, Gradio renders every yielded (cumulative) text"""
         if not message:
-            return ""
+            yield ""
+            return
 
-        answer = await self.chat_agent.chat(message)
-        return answer
+        answer = ""
+        # Stream is closed right away if Gradio stops this generator (client disconnected or stop pressed)
+        async with aclosing(self.chat_agent.astream_chat(message, session_id=request.session_hash)) as stream:
+            async for text in stream:
+                answer += text
+                yield answer
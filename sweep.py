@@ -0,0 +1,270 @@
+"""
+Sweep of retrieval configurations: embedding model, retriever, RETRIEVAL_K, RERANK_DEPTH, rerank model
+and CONTEXT_TOP_K. Every point of the grid reports recall@k / MRR on the dataset (see evaluate.py)
+and per-query latency of embedding, search and reranking, points on the recall vs. latency
+Pareto frontier are the candidates for production settings.
+
+Document embeddings are cached on disk per model (EMBEDDING_CACHE_DIR), so only the queries are embedded
+on repeated sweeps. Queries run one by one like API requests (numpy exact search index).
+
+Usage:
+    uv run sweep.py --rerank-depth 6 12 24 --top-k 3 6 10
+    uv run sweep.py --embedding-models all-MiniLM-L6-v2 BAAI/bge-small-en-v1.5 --retrievers dense hybrid \\
+        --retrieval-k 12 24 --rerank-models none cross-encoder/ms-marco-MiniLM-L-6-v2 --all
+"""
+import argparse, json, logging, os, time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Callable, Iterable
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from evaluate import EVAL_SEED, first_hit_rank, rerank_many, sample_test_set
+from src.llm.diagnosis_assistant import CONTEXT_TOP_K, RERANK_DEPTH, RETRIEVAL_K, RETRIEVER_TYPE
+from src.model_registry import get_cross_encoder, get_embeddings, EMBEDDING_MODEL, RERANK_MODEL
+from src.rag.hybrid_retriever import BM25Index, HybridRetriever
+from src.rag.indexer import document_hash
+from src.rag.numpy_store import NumpyVectorStore
+from src.rag.process_csv import iter_docs
+from tables import format_table
+from logs import init_logging
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+DATASET_FILENAME = os.getenv("DATASET_FILENAME")
+# Document embeddings of the sweep, one file per embedding model
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "cache/embeddings")
+
+# Rerank model value of points using retrieved docs as context directly
+NO_RERANK = "none"
+
+
+class EmbeddingCache:
+    """
+    Document embeddings of one model stored on disk, keyed by document hash (content and metadata).
+    Only new and changed documents are embedded, the file keeps embeddings of the current documents.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR):
+        self.path = os.path.join(cache_dir, f"{model_name.replace('/', '__')}.npz")
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> dict[str, np.ndarray]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with np.load(self.path) as data:
+                return dict(zip(data["hashes"].tolist(), data["vectors"]))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Embedding cache {self.path} can't be read, embeddings will be recomputed: {e}")
+            return {}
+
+    def save(self, vectors: dict[str, np.ndarray]) -> None:
+        """Write cache atomically, so an interrupted write never leaves a broken file"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, hashes=np.array(list(vectors)), vectors=np.stack(list(vectors.values())))
+        os.replace(tmp_path, self.path)
+
+    def embed_documents(self, embeddings: Embeddings, docs: list[Document]) -> np.ndarray:
+        """Embeddings matrix of docs (in input order), missing ones are embedded and saved"""
+        cached = self.load()
+        hashes = [document_hash(doc) for doc in docs]
+        missing = [i for i, doc_hash in enumerate(hashes) if doc_hash not in cached]
+        self.hits, self.misses = len(docs) - len(missing), len(missing)
+        if missing or len(cached) != len(set(hashes)):
+            vectors = embeddings.embed_documents([docs[i].page_content for i in missing]) if missing else []
+            cached.update({hashes[i]: np.asarray(vector, dtype=np.float32) for i, vector in zip(missing, vectors)})
+            cached = {doc_hash: cached[doc_hash] for doc_hash in hashes}
+            self.save(cached)
+        return np.stack([cached[doc_hash] for doc_hash in hashes])
+
+
+@dataclass
+class SweepGrid:
+    """Values of every swept setting, points are all valid combinations"""
+    embedding_models: list[str]
+    retrievers: list[str]
+    retrieval_k: list[int]
+    rerank_depth: list[int]
+    rerank_models: list[str]
+    context_top_k: list[int]
+
+    def candidate_sets(self, retriever: str) -> list[tuple[int | None, int]]:
+        """
+        (retrieval_k, candidates) retrieved for a retriever - rerank depths, and context sizes of points without reranking.
+        RETRIEVAL_K is used only by the hybrid retriever (docs fetched from every source).
+        """
+        candidates = set()
+        if any(model != NO_RERANK for model in self.rerank_models):
+            candidates.update(self.rerank_depth)
+        if NO_RERANK in self.rerank_models:
+            candidates.update(self.context_top_k)
+        retrieval_ks = self.retrieval_k if retriever == "hybrid" else [None]
+        return [(retrieval_k, k) for retrieval_k in retrieval_ks for k in sorted(candidates)]
+
+
+def timed(fn: Callable[[Any], Any], items: Iterable[Any]) -> tuple[list[Any], np.ndarray]:
+    """Results and per-item durations (seconds) of fn applied to every item"""
+    results, timings = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        timings.append(time.perf_counter() - start)
+    return results, np.array(timings)
+
+
+def rank_metrics(diseases: list[str], docs_lists: list[list[Document]], k: int) -> dict[str, Any]:
+    """Hits, recall@k and MRR@k of retrieved docs"""
+    ranks = [first_hit_rank(disease, docs[:k]) for disease, docs in zip(diseases, docs_lists)]
+    hits = sum(rank is not None for rank in ranks)
+    return {
+        "hits": hits,
+        "recall": round(hits / len(ranks), 4),
+        "mrr": round(sum(1 / rank for rank in ranks if rank is not None) / len(ranks), 4),
+    }
+
+
+def latency_summary(stages: dict[str, np.ndarray]) -> dict[str, float]:
+    """Mean per-query latency of every stage and percentiles of the whole query (ms)"""
+    total = sum(stages.values())
+    return {
+        **{stage: round(float(timings.mean()) * 1000, 3) for stage, timings in stages.items()},
+        "p50": round(float(np.percentile(total, 50)) * 1000, 3),
+        "p95": round(float(np.percentile(total, 95)) * 1000, 3),
+    }
+
+
+def mark_pareto(points: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Mark points on the recall vs. p50 latency Pareto frontier - no other point is faster with at least the same recall.
+    Returns the frontier ordered by latency.
+    """
+    frontier = []
+    best_recall = -1.0
+    for point in sorted(points, key=lambda p: (p["latency_ms"]["p50"], -p["recall"], -p["mrr"])):
+        point["pareto"] = point["recall"] > best_recall
+        if point["pareto"]:
+            best_recall = point["recall"]
+            frontier.append(point)
+    return frontier
+
+
+def sweep(grid: SweepGrid, sample_size: int | None = None, seed: int = EVAL_SEED,
+          cache_dir: str = EMBEDDING_CACHE_DIR) -> list[dict[str, Any]]:
+    """
+    Evaluate every point of the grid. Retrieval of a candidate set is shared by its rerank models
+    and context sizes, reranking of a (candidates, model) pair by all context sizes.
+    """
+    diseases, queries = sample_test_set(sample_size, seed)
+    docs = [doc for chunk in iter_docs(DATASET_FILENAME) for doc in chunk]
+    bm25 = BM25Index(docs) if "hybrid" in grid.retrievers else None
+    cross_encoders = {name: get_cross_encoder(name) for name in grid.rerank_models if name != NO_RERANK}
+    for cross_encoder in cross_encoders.values():
+        cross_encoder.predict([[queries[0], docs[0].page_content]])
+
+    points = []
+    for embedding_model in grid.embedding_models:
+        embeddings = get_embeddings(embedding_model)
+        cache = EmbeddingCache(embedding_model, cache_dir)
+        start = time.perf_counter()
+        vectors = cache.embed_documents(embeddings, docs)
+        logger.info(f"Document embeddings of {embedding_model}: {cache.hits} cached, {cache.misses} embedded "
+                    f"in {time.perf_counter() - start:.2f}s")
+        store = NumpyVectorStore(embedding=embeddings)
+        store.add_embeddings([doc.page_content for doc in docs], vectors, [doc.metadata for doc in docs],
+                             [doc.metadata["disease"] for doc in docs])
+
+        embeddings.embed_query(queries[0])
+        query_vectors, embedding_timings = timed(embeddings.embed_query, queries)
+
+        for retriever in grid.retrievers:
+            for retrieval_k, candidates in grid.candidate_sets(retriever):
+                if retriever == "hybrid":
+                    hybrid = HybridRetriever(vectors_store=store, bm25=bm25, k=candidates, fetch_k=retrieval_k)
+                    docs_lists, search_timings = timed(
+                        lambda item: hybrid.fuse(item[0], store.similarity_search_by_vector(item[1], k=retrieval_k)),
+                        zip(queries, query_vectors))
+                elif retriever == "dense":
+                    docs_lists, search_timings = timed(
+                        lambda vector: store.similarity_search_by_vector(vector, k=candidates), query_vectors)
+                else:
+                    raise ValueError(f"Unknown retriever: '{retriever}'")
+
+                setting = {"embedding_model": embedding_model, "retriever": retriever, "retrieval_k": retrieval_k}
+                stages = {"embedding": embedding_timings, "search": search_timings}
+                if NO_RERANK in grid.rerank_models and candidates in grid.context_top_k:
+                    points.append({
+                        **setting, "rerank_model": NO_RERANK, "rerank_depth": None, "context_top_k": candidates,
+                        **rank_metrics(diseases, docs_lists, candidates), "latency_ms": latency_summary(stages)})
+                if candidates not in grid.rerank_depth:
+                    continue
+
+                for model_name, cross_encoder in cross_encoders.items():
+                    reranked, rerank_timings = timed(
+                        lambda item: rerank_many([item[0]], [item[1]], candidates, cross_encoder)[0],
+                        zip(queries, docs_lists))
+                    latency = latency_summary({**stages, "rerank": rerank_timings})
+                    for top_k in grid.context_top_k:
+                        if top_k <= candidates:
+                            points.append({
+                                **setting, "rerank_model": model_name, "rerank_depth": candidates, "context_top_k": top_k,
+                                **rank_metrics(diseases, reranked, top_k), "latency_ms": latency})
+
+    for point in points:
+        point["sample_size"] = len(queries)
+    mark_pareto(points)
+    return points
+
+
+def format_points(points: list[dict[str, Any]]) -> str:
+    """Points as a table ordered by latency, columns named by the production env. variables"""
+    headers = ["EMBEDDING_MODEL", "RETRIEVER_TYPE", "RETRIEVAL_K", "RERANK_MODEL", "RERANK_DEPTH", "CONTEXT_TOP_K",
+               "recall", "mrr", "embedding_ms", "search_ms", "rerank_ms", "p50_ms", "p95_ms", "pareto"]
+    rows = []
+    for point in sorted(points, key=lambda p: p["latency_ms"]["p50"]):
+        latency = point["latency_ms"]
+        rows.append([
+            point["embedding_model"], point["retriever"], point["retrieval_k"] or "-", point["rerank_model"],
+            point["rerank_depth"] or "-", point["context_top_k"], f"{point['recall']:.2%}", point["mrr"],
+            latency["embedding"], latency["search"], latency.get("rerank", "-"), latency["p50"], latency["p95"],
+            "*" if point["pareto"] else ""])
+    return format_table(headers, rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep retrieval settings and report the recall vs. latency Pareto frontier")
+    parser.add_argument("--embedding-models", nargs="+", default=[EMBEDDING_MODEL])
+    parser.add_argument("--retrievers", nargs="+", choices=["dense", "hybrid"], default=[RETRIEVER_TYPE])
+    parser.add_argument("--retrieval-k", type=int, nargs="+", default=[RETRIEVAL_K], help="Docs fetched from every hybrid source")
+    parser.add_argument("--rerank-depth", type=int, nargs="+", default=sorted({6, 12, 24, RERANK_DEPTH}))
+    parser.add_argument("--rerank-models", nargs="+", default=[RERANK_MODEL], help=f"'{NO_RERANK}' - retrieved docs are the context")
+    parser.add_argument("--top-k", type=int, nargs="+", default=sorted({3, CONTEXT_TOP_K, 10}), help="Context docs")
+    parser.add_argument("--sample-size", type=int, default=None, help="Sampled diseases (default: all)")
+    parser.add_argument("--seed", type=int, default=EVAL_SEED)
+    parser.add_argument("--cache-dir", default=EMBEDDING_CACHE_DIR)
+    parser.add_argument("--all", action="store_true", help="Print all points, not only the Pareto frontier")
+    parser.add_argument("--output", default=f"logs/sweep_{datetime.now():%Y%m%d_%H%M%S}.json")
+    args = parser.parse_args()
+
+    init_logging()
+    grid = SweepGrid(args.embedding_models, args.retrievers, args.retrieval_k, args.rerank_depth,
+                     args.rerank_models, args.top_k)
+    start = time.perf_counter()
+    points = sweep(grid, args.sample_size, args.seed, args.cache_dir)
+    print(format_points(points if args.all else [point for point in points if point["pareto"]]))
+    print(f"Evaluated {len(points)} points in {time.perf_counter() - start:.2f}s")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"created": datetime.now().isoformat(), "grid": asdict(grid), "seed": args.seed, "points": points}, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from typing import Any
+
+
+def format_table(headers: list[str], rows: list[list[Any]]) -> str:
+    """Plain text table with left-aligned columns, shared by reports of the CLI scripts"""
+    cells = [headers] + [[str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    lines = ["  ".join(value.ljust(width) for value, width in zip(row, widths)) for row in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
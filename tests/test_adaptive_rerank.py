@@ -0,0 +1,38 @@
+import pytest
+from src.llm.adaptive_rerank import AdaptiveRerankPolicy, rerank_decision
+
+
+def test_skip_policy():
+    """
+    Test case: Reranking is skipped only when the best candidate leads the second one by the margin
+    """
+    policy = AdaptiveRerankPolicy("skip", margin=0.1)
+
+    assert policy.keep_count([0.9, 0.7, 0.65, 0.6], top_k=2) == 2
+    assert policy.keep_count([0.9, 0.85, 0.5, 0.4], top_k=2) == 0
+    assert policy.keep_count([0.9], top_k=2) == 1
+
+
+def test_tail_policy():
+    """
+    Test case: Candidates above the last confident gap within top_k are kept, the rest is reranked
+    """
+    policy = AdaptiveRerankPolicy("tail", margin=0.1)
+    scores = [0.9, 0.88, 0.7, 0.69, 0.68, 0.5]
+
+    assert policy.keep_count(scores, top_k=4) == 2
+    assert policy.keep_count(scores, top_k=1) == 0
+    assert policy.keep_count(scores, top_k=5) == 5
+    assert policy.keep_count([0.5, 0.49, 0.48], top_k=2) == 0
+    with pytest.raises(ValueError):
+        AdaptiveRerankPolicy("always")
+
+
+def test_rerank_decision():
+    """
+    Test case: Kept candidates count is reported as full, tail or skip path
+    """
+    assert rerank_decision(0, candidates=12, top_k=6) == "full"
+    assert rerank_decision(2, candidates=12, top_k=6) == "tail"
+    assert rerank_decision(6, candidates=12, top_k=6) == "skip"
+    assert rerank_decision(3, candidates=3, top_k=6) == "skip"
@@ -0,0 +1,79 @@
+import json, random
+from analyze_metrics import LatencyHistogram, analyze, compare_reports, expand_paths, format_report, parse_line
+
+
+def diagnose_line(second: int, total_s: float, tokens: int = 10) -> str:
+    data = {"model": "gemini", "context_docs_count": 12,
+            "latency": {"retrieval_s": total_s / 4, "rerank_s": total_s / 4, "llm_s": total_s / 2, "total_s": total_s},
+            "token_usage": {"input_tokens": tokens, "output_tokens": 2, "total_tokens": tokens + 2}}
+    return f"2025-01-01 12:{second // 60:02d}:{second % 60:02d},000: DIAGNOSE METRICS: {json.dumps(data)}\n"
+
+
+def tool_line(status: str) -> str:
+    data = {"tool": "get_diagnosis_tool", "status": status, "latency": {"total_s": 1.5}}
+    return f"2025-01-01 12:00:00,000: TOOL EXECUTION: {json.dumps(data)}\n"
+
+
+def test_parse_line():
+    """
+    Test case: JSON and key=value metric lines are parsed, other lines are skipped
+    """
+    timestamp, event, data = parse_line(diagnose_line(5, 2.0))
+    assert event == "DIAGNOSE METRICS" and data["latency"]["total_s"] == 2.0
+    assert timestamp.second == 5
+
+    _, event, data = parse_line("2025-01-01 12:00:00,000: RECALL EVALUATION: retriever=dense rerank=True k=6 recall=90.00%")
+    assert event == "RECALL EVALUATION" and data == {"retriever": "dense", "rerank": "True", "k": "6", "recall": "90.00%"}
+    assert parse_line("Traceback (most recent call last):") is None
+    assert parse_line("2025-01-01 12:00:00,000: DIAGNOSE METRICS: {broken") is None
+
+
+def test_histogram_percentiles():
+    """
+    Test case: Fixed-bucket percentiles are within bucket width of exact percentiles
+    """
+    rng = random.Random(0)
+    values = sorted(rng.lognormvariate(0, 1) for _ in range(10_000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.observe(value)
+
+    for q in (50, 90, 99):
+        exact = values[int(len(values) * q / 100) - 1]
+        assert abs(histogram.percentile(q) - exact) / exact < 0.05
+    assert histogram.percentile(100) == values[-1]
+
+
+def test_analyze_rotated_logs(tmp_path):
+    """
+    Test case: Rotated files are read oldest first, latency, throughput, tokens and tool rates are aggregated
+    """
+    (tmp_path / "metrics.log.1").write_text("".join(diagnose_line(s, 1.0) for s in range(60)) + tool_line("success"))
+    (tmp_path / "metrics.log").write_text(diagnose_line(60, 3.0) + tool_line("timeout") + tool_line("error") + tool_line("success"))
+
+    assert [p.rsplit("/", 1)[1] for p in expand_paths([str(tmp_path)])] == ["metrics.log.1", "metrics.log"]
+    report = analyze([str(tmp_path)], window_s=60)
+
+    assert report["latency"]["diagnose.total"]["count"] == 61
+    assert report["latency"]["diagnose.total"]["p50"] == 1.0
+    assert report["latency"]["diagnose.total"]["max"] == 3.0
+    assert report["throughput"]["requests"] == {"diagnose": 61}
+    assert report["throughput"]["peak_rps"] == 1.0
+    assert report["tokens"] == {"gemini": {"input_tokens": 610, "output_tokens": 122, "total_tokens": 732}}
+    assert report["tools"]["get_diagnosis_tool"] == {"calls": 4, "error_rate": 0.25, "timeout_rate": 0.25}
+    assert "diagnose.total" in format_report(report)
+
+
+def test_compare_reports(tmp_path):
+    """
+    Test case: Latency growth above threshold is reported as regression
+    """
+    baseline, current = tmp_path / "baseline.log", tmp_path / "current.log"
+    baseline.write_text("".join(diagnose_line(s, 1.0) for s in range(10)))
+    current.write_text("".join(diagnose_line(s, 1.0 if s < 5 else 1.5) for s in range(10)))
+
+    rows = {row["metric"]: row for row in compare_reports(analyze([str(baseline)]), analyze([str(current)]), threshold_pct=10)}
+
+    assert not rows["diagnose.total p50"]["regression"]
+    assert rows["diagnose.total p90"]["regression"]
+    assert rows["diagnose.llm p99"]["change_pct"] > 40
@@ -0,0 +1,170 @@
+"""
+Micro-benchmarks of pipeline components on synthetic data, compared with a baseline file.
+Skipped unless RUN_BENCHMARKS=1. Models are loaded from the local cache (benchmarks of models which aren't cached are skipped).
+
+    RUN_BENCHMARKS=1 BENCHMARK_SAVE_BASELINE=1 uv run pytest tests/test_benchmarks.py   # record baseline
+    RUN_BENCHMARKS=1 uv run pytest tests/test_benchmarks.py                             # compare with baseline
+
+A benchmark fails when its median time is more than BENCHMARK_THRESHOLD (default 0.25 = 25%) above the baseline.
+"""
+import itertools, json, logging, os, random, statistics, tempfile, time
+from typing import Any, Callable
+import numpy as np, pandas as pd, pytest
+
+pytestmark = pytest.mark.skipif(os.getenv("RUN_BENCHMARKS") != "1", reason="Benchmarks run only with RUN_BENCHMARKS=1")
+
+BASELINE_FILE = os.getenv("BENCHMARK_BASELINE", "logs/benchmarks_baseline.json")
+BENCHMARK_THRESHOLD = float(os.getenv("BENCHMARK_THRESHOLD", 0.25))
+SAVE_BASELINE = os.getenv("BENCHMARK_SAVE_BASELINE") == "1"
+DATASET_FILENAME = os.getenv("DATASET_FILENAME", "dataset/disease_symptoms.csv")
+# Minimum measured time of a benchmark (calls are repeated until reached)
+MIN_TIME_S = 0.2
+SEED = 42
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Median time of a single call over repeat rounds, every round runs fn long enough for timer precision"""
+    start = time.perf_counter()
+    fn()
+    number = max(1, int(MIN_TIME_S / repeat / max(time.perf_counter() - start, 1e-9)))
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    return statistics.median(rounds)
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    """Baseline medians {benchmark: seconds}, new results are written back with BENCHMARK_SAVE_BASELINE=1"""
+    data = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            data = json.load(f)
+    results = {}
+    yield data, results
+    if SAVE_BASELINE and results:
+        os.makedirs(os.path.dirname(BASELINE_FILE) or ".", exist_ok=True)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump({**data, **results}, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(autouse=True)
+def no_logging():
+    """Components are measured without log writes (pytest writes DEBUG records to a file)"""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def bench(request, baseline):
+    """Measure fn under the test id and compare with its baseline median"""
+    data, results = baseline
+
+    def run(fn: Callable[[], Any], repeat: int = 5) -> float:
+        name = request.node.name
+        median = measure(fn, repeat)
+        results[name] = median
+        print(f"BENCHMARK {name}: {median * 1000:.4f} ms (baseline: {data.get(name, 0) * 1000:.4f} ms)")
+        if not SAVE_BASELINE and name in data:
+            limit = data[name] * (1 + BENCHMARK_THRESHOLD)
+            assert median <= limit, f"{name} regressed: {median * 1000:.4f} ms > {limit * 1000:.4f} ms"
+        return median
+    return run
+
+
+def cached_model(model_name: str, load: Callable[[str], Any]) -> Any:
+    """Load model from a local path or the Hugging Face cache, skip if it would be downloaded"""
+    from huggingface_hub import try_to_load_from_cache
+    # Sentence transformers resolve names without organization in "sentence-transformers"
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    if not os.path.isdir(model_name) and not isinstance(try_to_load_from_cache(repo_id, "config.json"), str):
+        pytest.skip(f"Model '{model_name}' is not cached")
+    return load(model_name)
+
+
+@pytest.fixture(scope="module")
+def embeddings():
+    from src.model_registry import get_embeddings, EMBEDDING_MODEL
+    return cached_model(EMBEDDING_MODEL, get_embeddings)
+
+
+@pytest.fixture(scope="module")
+def cross_encoder():
+    from src.model_registry import get_cross_encoder, RERANK_MODEL
+    return cached_model(RERANK_MODEL, get_cross_encoder)
+
+
+@pytest.fixture(scope="module")
+def dataset() -> pd.DataFrame:
+    return pd.read_csv(DATASET_FILENAME)
+
+
+def synthetic_profiles(dataset: pd.DataFrame, rows: int) -> pd.DataFrame:
+    """Rows sampled from the project dataset, so symptom density matches real profiles"""
+    return dataset.sample(n=rows, replace=rows > len(dataset), random_state=SEED).reset_index(drop=True)
+
+
+def synthetic_text(length: int, rng: random.Random) -> str:
+    words = "fever cough headache pain nausea rash fatigue chills since yesterday and in the evening".split()
+    return " ".join(rng.choice(words) for _ in range(length // 6))[:length]
+
+
+def test_embed_query(bench, embeddings):
+    bench(lambda: embeddings.embed_query("fever, cough, headache, sore throat"))
+
+
+@pytest.mark.parametrize("size", [85, 10_000])
+def test_chroma_similarity_search(bench, size):
+    from langchain_core.embeddings import FakeEmbeddings
+    from src.rag.chroma_store import ChromaStore
+    rng = np.random.default_rng(SEED)
+    vectors = rng.standard_normal((size, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = itertools.cycle(vectors[:64].tolist())
+
+    with tempfile.TemporaryDirectory() as db_path:
+        store = ChromaStore(persist_directory=db_path, embedding_function=FakeEmbeddings(size=384))
+        batch_size = store.max_batch_size
+        for offset in range(0, size, batch_size):
+            end = min(offset + batch_size, size)
+            store.collection.add(
+                ids=[str(i) for i in range(offset, end)],
+                documents=[f"doc {i}" for i in range(offset, end)],
+                embeddings=vectors[offset:end].tolist())
+        bench(lambda: store.similarity_search_by_vector(next(queries), k=12))
+        store.delete_collection()
+
+
+@pytest.mark.parametrize("pairs", [1, 12, 64])
+def test_cross_encoder_predict(bench, cross_encoder, dataset, pairs):
+    from src.rag.process_csv import prepare_docs
+    docs = prepare_docs(synthetic_profiles(dataset, pairs), "benchmark")
+    batch = [["fever, cough, headache", doc.page_content] for doc in docs]
+    bench(lambda: cross_encoder.predict(batch), repeat=3)
+
+
+@pytest.mark.parametrize("length", [200, 10_000, 100_000])
+def test_run_guardrails(bench, length):
+    from src.llm.guardrails import run_guardrails
+    prompt = synthetic_text(length, random.Random(SEED))
+    bench(lambda: run_guardrails(prompt))
+
+
+@pytest.mark.parametrize("length", [1_000, 10_000, 100_000])
+def test_parse_tool_call(bench, length):
+    from src.llm.local_agent import parse_tool_call
+    tool_call = '{"tool": "get_diagnosis_tool", "args": {"age": 45, "gender": "male", "symptoms": ["fever", "cough"]}}'
+    response = f"{synthetic_text(length, random.Random(SEED))}\n```json\n{tool_call}\n```"
+    assert parse_tool_call(response)["tool"] == "get_diagnosis_tool"
+    bench(lambda: parse_tool_call(response))
+
+
+@pytest.mark.parametrize("rows", [1_000, 10_000, 100_000])
+def test_prepare_docs(bench, dataset, rows):
+    from src.rag.process_csv import prepare_docs
+    df = synthetic_profiles(dataset, rows)
+    bench(lambda: prepare_docs(df, "benchmark"), repeat=3 if rows < 100_000 else 1)
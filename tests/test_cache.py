@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.llm.cache import make_cache_key, DiagnosisCache, InMemoryCache, SQLiteCache
+from src.schemas import SymptomsInput, DiagnoseResponse, DiseaseDetails
+
+
+def make_response(name: str) -> DiagnoseResponse:
+    return DiagnoseResponse(possible_diseases=[DiseaseDetails(name=name, icd_code="J11", reasoning="test")])
+
+
+def test_cache_key_normalization():
+    """
+    Test case: Symptoms order, case and duplicates don't change the key, age bucket does
+    """
+    patient = SymptomsInput(age=21, gender="male", symptoms=["Fever", "cough"])
+    same_patient = SymptomsInput(age=27, gender="male", symptoms=["cough ", "fever", "FEVER"])
+    older_patient = SymptomsInput(age=35, gender="male", symptoms=["fever", "cough"])
+    other_gender = SymptomsInput(age=21, gender="female", symptoms=["fever", "cough"])
+
+    assert make_cache_key(patient) == make_cache_key(same_patient)
+    assert make_cache_key(patient) != make_cache_key(older_patient)
+    assert make_cache_key(patient) != make_cache_key(other_gender)
+    assert make_cache_key(patient, age_bucket=1) != make_cache_key(same_patient, age_bucket=1)
+
+
+def test_memory_cache_lru_eviction():
+    """
+    Test case: Least recently used entry is evicted when cache is full
+    """
+    cache = InMemoryCache(ttl_s=60, max_size=2)
+    cache.set("a", make_response("A"))
+    cache.set("b", make_response("B"))
+    assert cache.get("a") == make_response("A")
+
+    cache.set("c", make_response("C"))
+    assert cache.get("b") is None
+    assert cache.get("a") == make_response("A")
+    assert cache.get("c") == make_response("C")
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_concurrent_hit_miss_counters():
+    """
+    Test case: Hits and misses from many threads are all counted, base cache class can't be instantiated
+    """
+    cache = InMemoryCache(ttl_s=60, max_size=10)
+    cache.set("a", make_response("A"))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(cache.get, ["a", "b"] * 500))
+
+    assert (cache.hits, cache.misses) == (500, 500)
+    with pytest.raises(TypeError):
+        DiagnosisCache()
+
+
+def test_memory_cache_ttl():
+    """
+    Test case: Expired entry is not returned
+    """
+    cache = InMemoryCache(ttl_s=0.01, max_size=10)
+    cache.set("a", make_response("A"))
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache(tmp_path):
+    """
+    Test case: SQLite cache keeps entries between instances and respects size limit
+    """
+    db_path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(db_path=db_path, ttl_s=60, max_size=1)
+    cache.set("a", make_response("A"))
+    cache.close()
+
+    cache = SQLiteCache(db_path=db_path, ttl_s=60, max_size=1)
+    assert cache.get("a") == make_response("A")
+
+    cache.set("b", make_response("B"))
+    assert cache.get("a") is None
+    assert cache.get("b") == make_response("B")
+    cache.close()
@@ -0,0 +1,28 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.rag.chroma_store import ChromaStore
+from src.rag.vectors_store import similarity_search_by_vectors, similarity_search_with_relevance_scores_by_vectors
+
+TEXTS = [f"Disease {i} symptoms" for i in range(30)]
+
+
+@pytest.mark.filterwarnings("ignore:Relevance scores must be between 0 and 1")
+@pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+def test_bulk_relevance_search_matches_langchain(tmp_path, space):
+    """
+    Test case: Bulk search returns the same documents and relevance scores as per-query LangChain search
+    """
+    embedding = DeterministicFakeEmbedding(size=16)
+    store = ChromaStore(persist_directory=str(tmp_path), embedding_function=embedding,
+                        collection_configuration={"hnsw": {"space": space}})
+    store.add_texts(TEXTS, ids=[str(i) for i in range(len(TEXTS))])
+    queries = ["fever cough", "headache"]
+
+    bulk = similarity_search_with_relevance_scores_by_vectors(store, embedding.embed_documents(queries), k=5)
+    for query, docs_and_scores in zip(queries, bulk):
+        expected = store.similarity_search_with_relevance_scores(query, k=5)
+        assert [doc.id for doc, _ in docs_and_scores] == [doc.id for doc, _ in expected]
+        assert [score for _, score in docs_and_scores] == pytest.approx([score for _, score in expected])
+
+    docs_lists = similarity_search_by_vectors(store, embedding.embed_documents(queries), k=5)
+    assert [[doc.id for doc in docs] for docs in docs_lists] == [[doc.id for doc, _ in docs] for docs in bulk]
@@ -0,0 +1,82 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import RunnableLambda
+from src import tracing
+from src.llm import diagnosis_assistant
+from src.rag.numpy_store import NumpyVectorStore
+from src.schemas import DiagnoseResponse, DiseaseDetails, SymptomsInput
+
+RESPONSE = DiagnoseResponse(possible_diseases=[DiseaseDetails(name="Flu", icd_code="J11", reasoning="test")])
+
+
+class StubCrossEncoder:
+    def predict(self, pairs):
+        return [float(len(doc)) for _, doc in pairs]
+
+
+class StubChatModel:
+    """
+    Structured output model returning no parsed result for patients with "gibberish" symptom,
+    JSON mode model streaming the response in chunks.
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def bind(self, **kwargs):
+        return self
+
+    async def astream(self, prompt):
+        text = RESPONSE.model_dump_json()
+        for i in range(0, len(text), 16):
+            yield AIMessageChunk(content=text[i:i + 16])
+
+    def with_structured_output(self, *args, **kwargs):
+        async def respond(prompt):
+            raw = AIMessage("{}", usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+            if "gibberish" in prompt.to_string():
+                return {"raw": raw, "parsed": None, "parsing_error": ValueError("invalid JSON")}
+            return {"raw": raw, "parsed": RESPONSE, "parsing_error": None}
+        return RunnableLambda(lambda prompt: None, afunc=respond)
+
+
+@pytest.fixture
+def assistant(monkeypatch):
+    monkeypatch.setattr(diagnosis_assistant, "ChatGoogleGenerativeAI", StubChatModel)
+    store = NumpyVectorStore.from_texts([f"Disease {i} symptoms" for i in range(20)], DeterministicFakeEmbedding(size=16))
+    rag_assistant = diagnosis_assistant.DiagnosisAssistant(store, cross_encoder=StubCrossEncoder())
+    yield rag_assistant
+    rag_assistant.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_unparseable_llm_output(assistant):
+    """
+    Test case: Batch item with unparseable LLM output gets an error, other items keep their results
+    """
+    response = await assistant.adiagnose_batch([
+        SymptomsInput(age=30, gender="male", symptoms=["fever"]),
+        SymptomsInput(age=40, gender="female", symptoms=["gibberish"]),
+    ])
+
+    assert response.results[0].result == RESPONSE
+    assert response.results[0].error is None
+    assert response.results[1].result is None
+    assert response.results[1].error == "LLM returned unparseable output"
+
+
+@pytest.mark.asyncio
+async def test_stream_diagnose_trace(assistant, monkeypatch):
+    """
+    Test case: Streamed diagnosis records retrieval, rerank and llm spans under a single diagnose trace
+    """
+    traces = []
+    monkeypatch.setattr(tracing, "export_trace", lambda trace: traces.append(trace.to_dict()))
+
+    events = [event async for event in assistant.astream_diagnose(SymptomsInput(age=30, gender="male", symptoms=["fever"]), use_cache=False)]
+
+    assert [name for name, _ in events] == ["candidates", "disease", "metrics"]
+    assert len(traces) == 1
+    assert [s["name"] for s in traces[0]["spans"]] == ["diagnose", "guardrails", "retrieval", "rerank", "llm"]
+    assert all(s["parent_id"] == traces[0]["spans"][0]["span_id"] for s in traces[0]["spans"][1:])
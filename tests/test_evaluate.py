@@ -0,0 +1,93 @@
+import numpy as np, pandas as pd, pytest
+from langchain_core.documents import Document
+import evaluate
+
+DATASET = "dataset/disease_symptoms.csv"
+
+
+class LengthCrossEncoder:
+    """Scores pairs by document length, records batch calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(len(pairs))
+        return np.array([float(len(doc)) for _, doc in pairs])
+
+
+@pytest.fixture(autouse=True)
+def dataset(monkeypatch):
+    monkeypatch.setattr(evaluate, "DATASET_FILENAME", DATASET)
+
+
+def test_build_queries():
+    """
+    Test case: Vectorized queries are the same as the previous per-row symptom loop
+    """
+    df = pd.read_csv(DATASET)
+    symptom_cols = df.columns.drop(['prognosis', 'icd_code'])
+    expected = [", ".join(col.replace('_', ' ') for col in symptom_cols if row[col] > 0.0) for _, row in df.iterrows()]
+
+    assert evaluate.build_queries(df) == expected
+
+
+def test_rerank_many_single_call(monkeypatch):
+    """
+    Test case: Candidates of all queries are scored in one CrossEncoder call and split back per query
+    """
+    cross_encoder = LengthCrossEncoder()
+    monkeypatch.setattr(evaluate, "get_cross_encoder", lambda: cross_encoder)
+    docs_lists = [[Document("a"), Document("ccc"), Document("bb")], [Document("dddd"), Document("e")]]
+
+    reranked = evaluate.rerank_many(["q1", "q2"], docs_lists, top_k=2)
+
+    assert cross_encoder.calls == [5]
+    assert [[doc.page_content for doc in docs] for docs in reranked] == [["ccc", "bb"], ["dddd", "e"]]
+
+
+def test_evaluate_reproducible():
+    """
+    Test case: Same seed gives the same test set and metrics, recall@k and MRR are reported
+    """
+    first = evaluate.evaluate(sample_size=20, k=3, retriever="bm25", seed=7)
+    second = evaluate.evaluate(sample_size=20, k=3, retriever="bm25", seed=7)
+
+    assert evaluate.sample_test_set(20, seed=7) == evaluate.sample_test_set(20, seed=7)
+    assert evaluate.sample_test_set(20, seed=7) != evaluate.sample_test_set(20, seed=8)
+    assert {key: first[key] for key in ("hits", "recall", "mrr")} == {key: second[key] for key in ("hits", "recall", "mrr")}
+    assert first["sample_size"] == 20 and 0 < first["mrr"] <= first["recall"] <= 1
+    assert "search" in first["latency_per_query_ms"]
+
+
+def test_first_hit_rank():
+    """
+    Test case: Rank of the first document with the disease (MRR), None if missing
+    """
+    docs = [Document("Disease: Flu"), Document("Disease: Malaria"), Document("Disease: Malaria B")]
+
+    assert evaluate.first_hit_rank("malaria", docs) == 2
+    assert evaluate.first_hit_rank("cholera", docs) is None
+
+
+def test_adaptive_rerank_cost(monkeypatch):
+    """
+    Test case: Adaptive rerank reports its paths and recall cost against full reranking of the same candidates
+    """
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from src.rag.numpy_store import NumpyVectorStore
+    from src.rag.process_csv import iter_docs
+    store = NumpyVectorStore(DeterministicFakeEmbedding(size=32))
+    store.add_documents([doc for docs in iter_docs(DATASET) for doc in docs])
+    monkeypatch.setattr(evaluate, "get_eval_vectors_store", lambda: store)
+    monkeypatch.setattr(evaluate, "get_cross_encoder", LengthCrossEncoder)
+
+    never = evaluate.evaluate(sample_size=20, k=3, rerank=True, adaptive="skip", margin=10.0)
+    always = evaluate.evaluate(sample_size=20, k=3, rerank=True, adaptive="tail", margin=-1.0)
+
+    assert never["adaptive"]["paths"] == {"full": 20, "tail": 0, "skip": 0}
+    assert never["adaptive"]["recall_cost"] == 0 and never["adaptive"]["pairs_scored"] == 1
+    assert always["adaptive"]["paths"]["skip"] == 20 and always["adaptive"]["pairs_scored"] == 0
+    assert always["adaptive"]["recall_cost"] == always["adaptive"]["recall_full"] - always["recall"]
+    with pytest.raises(ValueError):
+        evaluate.evaluate(sample_size=20, retriever="bm25", adaptive="skip")
@@ -1,7 +1,24 @@
 import random
+import pytest
 from fastapi.testclient import TestClient
 from main import app
-from src.llm.guardrails import PROMPT_INJECTION_PHRASES
+from src.llm.guardrails import (
+    SecurityError, run_guardrails, PROMPT_INJECTION_PHRASES, PROFANITY,
+    RE_EMAIL, RE_PHONE, RE_PESEL, RE_CARD, RE_IBAN, RE_LINK)
+
+
+def run_guardrails_multi_scan(prompt: str) -> None:
+    """Previous implementation (reference for equivalence) - every phrase and pattern scans the prompt separately"""
+    lowered_prompt = prompt.lower()
+    for phrase in PROMPT_INJECTION_PHRASES:
+        if phrase in lowered_prompt:
+            raise SecurityError(f"Request rejected due to prompt injection attempt. Phrase: '{phrase}'")
+    for pattern in (RE_EMAIL, RE_PHONE, RE_PESEL, RE_CARD, RE_IBAN, RE_LINK):
+        if pattern.search(prompt):
+            raise SecurityError("Request rejected due to sensitive data detected.")
+    for bad_word in PROFANITY:
+        if bad_word in lowered_prompt:
+            raise SecurityError(f"Request rejected due to profanity attempt. Word: '{bad_word}'")
 
 
 def test_prompt_injection():
@@ -67,3 +84,47 @@ def test_profanity_in_prompt():
 
     response = client.post("/diagnose", json=payload)
     assert response.status_code == 403
+
+
+def test_guardrails_rules():
+    """
+    Test case: Matched rule is reported and rules keep their check order and messages
+    """
+    cases = {
+        "fever and JAILBREAK with my email john@example.com": ("prompt_injection", "Phrase: 'jailbreak'"),
+        "call me at 600 123 456, damn": ("phone", "(phone number)"),
+        # Phone pattern is checked first and matches any longer number
+        "PESEL 90010112345": ("phone", "(phone number)"),
+        "write to jan@kowalski.pl": ("email", "(email address)"),
+        "see https://example.com/ you idiot": ("link", "(link/URL)"),
+        "this is stupid": ("profanity", "Word: 'stupid'"),
+    }
+    for prompt, (rule, message) in cases.items():
+        with pytest.raises(SecurityError) as error:
+            run_guardrails(prompt)
+        assert error.value.rule == rule
+        assert message in str(error.value)
+
+    run_guardrails("fever 39.5C since 3 days, cough, 2 tablets of paracetamol every 8 hours")
+
+
+def test_guardrails_match_multi_scan():
+    """
+    Test case: Guardrails reject the same prompts with the same messages as separate scans of every rule
+    """
+    rng = random.Random(0)
+    fragments = ["fever", "cough and headache", "39.5C", "12 345 678", "123456789", "a@b.co", "http://x",
+                 "ftp://y", "System Prompt", "dumbbell", "PL", "00000000000000000000000000", "-", " "]
+    for _ in range(2000):
+        prompt = " ".join(rng.choice(fragments) for _ in range(rng.randint(1, 8)))
+        try:
+            run_guardrails_multi_scan(prompt)
+            expected = None
+        except SecurityError as e:
+            expected = str(e) if "sensitive" not in str(e) else "sensitive"
+        try:
+            run_guardrails(prompt)
+            actual = None
+        except SecurityError as e:
+            actual = str(e) if "sensitive" not in str(e) else "sensitive"
+        assert actual == expected, prompt
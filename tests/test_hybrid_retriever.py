@@ -0,0 +1,56 @@
+import math
+from langchain_core.documents import Document
+from langchain_core.embeddings import FakeEmbeddings
+from src.rag.hybrid_retriever import BM25Index, HybridRetriever, reciprocal_rank_fusion, tokenize
+from src.rag.numpy_store import NumpyVectorStore
+
+
+def make_doc(disease: str, symptoms: str) -> Document:
+    return Document(page_content=f"Disease: {disease}\n{symptoms}", metadata={"disease": disease})
+
+
+DOCS = [
+    make_doc("Flu", "- high fever 90%\n- cough 70%"),
+    make_doc("Migraine", "- headache 95%\n- nausea 40%"),
+    make_doc("Measles", "- high fever 80%\n- rash 90%"),
+]
+
+
+def test_bm25_scores():
+    """
+    Test case: BM25 ranks exact term matches first, rare terms weigh more and unmatched docs are skipped
+    """
+    index = BM25Index(DOCS)
+
+    assert tokenize("High-fever, COUGH 70%") == ["high", "fever", "cough", "70"]
+    assert [doc.metadata["disease"] for doc in index.search("fever and rash", k=3)] == ["Measles", "Flu"]
+    assert [doc.metadata["disease"] for doc in index.search("headache", k=3)] == ["Migraine"]
+    assert index.search("broken leg", k=3) == []
+
+    # "rash" appears in one doc, "fever" in two - rare term has higher idf
+    scores = index.scores("rash")
+    assert scores[2] > index.scores("fever")[2] > 0
+    assert math.isclose(float(scores[0]), 0.0)
+
+
+def test_reciprocal_rank_fusion():
+    """
+    Test case: Documents ranked high by several retrievers come first, duplicates are merged by disease
+    """
+    flu, migraine, measles = DOCS
+    fused = reciprocal_rank_fusion([[flu, migraine, measles], [measles, flu]], rrf_k=60)
+
+    assert [doc.metadata["disease"] for doc in fused] == ["Flu", "Measles", "Migraine"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_hybrid_retriever_limits_candidates():
+    """
+    Test case: Hybrid retriever returns at most k fused candidates containing the lexical match
+    """
+    store = NumpyVectorStore.from_documents(DOCS, embedding=FakeEmbeddings(size=16))
+    retriever = HybridRetriever(vectors_store=store, bm25=BM25Index(DOCS), k=2, fetch_k=3)
+
+    docs = retriever.invoke("headache")
+    assert len(docs) == 2
+    assert "Migraine" in [doc.metadata["disease"] for doc in docs]
@@ -0,0 +1,38 @@
+import pandas as pd
+from langchain_core.embeddings import FakeEmbeddings
+from src.rag.chroma_store import ChromaStore
+from src.rag.indexer import sync_index
+
+SYMPTOMS = ["fever", "cough", "headache"]
+
+
+def write_dataset(path, rows: dict[str, list[float]]) -> None:
+    df = pd.DataFrame([[disease, *probabilities, f"ICD-{disease}"] for disease, probabilities in rows.items()],
+                      columns=["prognosis", *SYMPTOMS, "icd_code"])
+    df.to_csv(path, index=False)
+
+
+def test_sync_index_incremental(tmp_path):
+    """
+    Test case: Only changed rows are upserted, removed rows deleted and a new model rebuilds the index
+    """
+    dataset = tmp_path / "dataset.csv"
+    db_path = str(tmp_path / "db")
+    store = ChromaStore(persist_directory=db_path, embedding_function=FakeEmbeddings(size=8))
+
+    write_dataset(dataset, {"Flu": [80, 60, 40], "Migraine": [0, 0, 90], "Cold": [20, 70, 10]})
+    report = sync_index(store, str(dataset), db_path, "model-a")
+    assert (report.added, report.updated, report.deleted, report.unchanged, report.rebuilt) == (3, 0, 0, 0, True)
+
+    report = sync_index(store, str(dataset), db_path, "model-a")
+    assert (report.added, report.updated, report.deleted, report.unchanged, report.rebuilt) == (0, 0, 0, 3, False)
+
+    write_dataset(dataset, {"Flu": [85, 60, 40], "Cold": [20, 70, 10], "Asthma": [0, 50, 0]})
+    report = sync_index(store, str(dataset), db_path, "model-a")
+    assert (report.added, report.updated, report.deleted, report.unchanged, report.rebuilt) == (1, 1, 1, 1, False)
+    assert sorted(store.get()["ids"]) == ["Asthma", "Cold", "Flu"]
+    assert "fever 85%" in store.get_by_ids(["Flu"])[0].page_content
+
+    report = sync_index(store, str(dataset), db_path, "model-b")
+    assert (report.added, report.unchanged, report.rebuilt) == (3, 0, True)
+    assert len(store.get()["ids"]) == 3
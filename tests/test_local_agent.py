@@ -0,0 +1,207 @@
+import asyncio, queue, threading, time
+from types import SimpleNamespace
+import pytest, torch
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from src import tracing
+from src.llm import local_agent
+from src.llm.local_agent import LocalChatAgent
+from src.tracing import span
+
+TOOL_CALL = '{"tool": "get_diagnosis_tool", "args": {"age": 30, "gender": "male", "symptoms": ["fever"]}}'
+ANSWER = "## Possible Diseases:\n1. **Disease Name:** Flu"
+VOCAB_SIZE = 8
+EOS_TOKEN_ID = VOCAB_SIZE - 1
+FAKE_PIPELINE = SimpleNamespace(pipeline=SimpleNamespace(tokenizer=SimpleNamespace(eos_token_id=EOS_TOKEN_ID)))
+
+
+class FakeChatModel:
+    """Streams scripted responses (one per generation) in chunks of a few characters"""
+
+    def __init__(self, *responses: str, chunk_size: int = 3):
+        self.responses = list(responses)
+        self.chunk_size = chunk_size
+
+    def stream(self, history, pipeline_kwargs=None):
+        response = self.responses.pop(0)
+        for i in range(0, len(response), self.chunk_size):
+            yield AIMessageChunk(content=response[i:i + self.chunk_size])
+
+
+class ThreadedChatModel:
+    """
+    Generates tokens in its own thread like HF streaming pipeline (logits processors are applied on every step),
+    the stream reads them from a queue.
+    """
+
+    def __init__(self, max_new_tokens: int = 200, delay_s: float = 0.005):
+        self.max_new_tokens = max_new_tokens
+        self.delay_s = delay_s
+        self.generated = 0
+        self.closed = False
+        self.finished = threading.Event()
+
+    def stream(self, history, pipeline_kwargs=None):
+        processors = (pipeline_kwargs or {}).get("logits_processor", [])
+        tokens = queue.Queue()
+
+        def generate():
+            for i in range(self.max_new_tokens):
+                scores = torch.zeros(1, VOCAB_SIZE)
+                for processor in processors:
+                    scores = processor(None, scores)
+                if scores.argmax().item() == EOS_TOKEN_ID:
+                    break
+                self.generated += 1
+                tokens.put(f"token{i} ")
+                time.sleep(self.delay_s)
+            tokens.put(None)
+            self.finished.set()
+
+        threading.Thread(target=generate, daemon=True).start()
+        try:
+            while (token := tokens.get()) is not None:
+                yield AIMessageChunk(content=token)
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def tool_calls(monkeypatch):
+    calls = []
+
+    async def run_tool(tool_call):
+        calls.append(tool_call)
+        return "tool output"
+
+    monkeypatch.setattr(LocalChatAgent, "_run_tool", staticmethod(run_tool))
+    return calls
+
+
+async def stream_chat(*responses: str, prompt: str = "I have a fever") -> tuple[list[str], list]:
+    agent = LocalChatAgent("fake-model", load=False)
+    agent.agent = FakeChatModel(*responses)
+    agent.model = FAKE_PIPELINE
+    chunks = [text async for text in agent.astream_chat(prompt)]
+    return chunks, agent.sessions.get(local_agent.DEFAULT_SESSION).history
+
+
+@pytest.mark.asyncio
+async def test_stream_plain_text(tool_calls):
+    """
+    Test case: Answer without tool call markers is streamed chunk by chunk
+    """
+    chunks, history = await stream_chat("How old are you?")
+
+    assert "".join(chunks) == "How old are you?"
+    assert len(chunks) > 1
+    assert history[-1].content == "How old are you?"
+    assert tool_calls == []
+
+
+@pytest.mark.asyncio
+async def test_stream_pure_tool_call(tool_calls):
+    """
+    Test case: Tool call JSON is not shown, answer generated with tool output is streamed
+    """
+    chunks, history = await stream_chat(TOOL_CALL, ANSWER)
+
+    assert "".join(chunks) == ANSWER
+    assert tool_calls == [{"tool": "get_diagnosis_tool", "args": {"age": 30, "gender": "male", "symptoms": ["fever"]}}]
+    assert history[-3].content == TOOL_CALL
+    assert history[-2] == HumanMessage("tool output")
+    assert history[-1].content == ANSWER
+
+
+@pytest.mark.asyncio
+async def test_stream_text_before_tool_call(tool_calls):
+    """
+    Test case: Text before the tool call is streamed, the tool call itself is suppressed
+    """
+    chunks, _ = await stream_chat(f"Thank you. {TOOL_CALL}", ANSWER)
+
+    assert "".join(chunks) == "Thank you. " + ANSWER
+    assert len(tool_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_braces_not_json(tool_calls):
+    """
+    Test case: Text held back from a brace that is not a tool call is shown at the end
+    """
+    chunks, history = await stream_chat("Please list symptoms {like fever} and cough.")
+
+    assert "".join(chunks) == "Please list symptoms {like fever} and cough."
+    assert chunks[-1] == "{like fever} and cough."
+    assert tool_calls == []
+    assert history[-1].content.startswith("ERROR: Failed to parse tool call JSON")
+
+
+def threaded_agent() -> tuple[LocalChatAgent, ThreadedChatModel]:
+    agent = LocalChatAgent("fake-model", load=False)
+    agent.agent = model = ThreadedChatModel()
+    agent.model = FAKE_PIPELINE
+    return agent, model
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_stops_generation():
+    """
+    Test case: Consumer closing the stream part-way cancels generation and closes the model stream
+    """
+    agent, model = threaded_agent()
+    stream = agent.astream_chat("I have a fever")
+    chunks = [await anext(stream) for _ in range(3)]
+    await stream.aclose()
+
+    assert len(chunks) == 3
+    assert model.finished.wait(timeout=1.0)
+    assert model.closed
+    assert model.generated < model.max_new_tokens
+
+
+@pytest.mark.asyncio
+async def test_cancelled_stream_stops_generation():
+    """
+    Test case: Cancelled consumer task (chunk in flight) cancels generation and closes the model stream
+    """
+    agent, model = threaded_agent()
+
+    async def consume():
+        async for _ in agent.astream_chat("I have a fever"):
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.wait([task])
+
+    assert task.cancelled()
+    assert model.finished.wait(timeout=1.0)
+    assert model.closed
+    assert model.generated < model.max_new_tokens
+    # Session lock is released, next turn of the session isn't blocked
+    assert not agent.sessions.get(local_agent.DEFAULT_SESSION).lock.locked()
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_trace(monkeypatch):
+    """
+    Test case: Streamed chat turn is a single trace, tool spans nest under the tool dispatch span
+    """
+    traces = []
+    monkeypatch.setattr(tracing, "export_trace", lambda trace: traces.append(trace.to_dict()))
+
+    async def diagnosis_tool(gender: str, age: int, symptoms: list[str]) -> dict:
+        with span("diagnose"):
+            return {"possible_diseases": []}
+
+    monkeypatch.setattr(local_agent, "ALLOWED_TOOLS", {"get_diagnosis_tool": diagnosis_tool})
+    chunks, _ = await stream_chat(TOOL_CALL, ANSWER)
+
+    assert "".join(chunks) == ANSWER
+    assert len(traces) == 1
+    spans = {s["name"]: s for s in traces[0]["spans"]}
+    assert [s["name"] for s in traces[0]["spans"]] == ["chat", "local_model", "run_tool", "tool", "diagnose", "local_model"]
+    assert spans["run_tool"]["parent_id"] == spans["chat"]["span_id"]
+    assert spans["tool"]["parent_id"] == spans["run_tool"]["span_id"]
+    assert spans["diagnose"]["parent_id"] == spans["tool"]["span_id"]
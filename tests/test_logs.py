@@ -0,0 +1,71 @@
+import logging
+import logs
+from logs import DebugSamplingFilter, DeferredQueueHandler, attach_handlers, stop_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+
+
+def make_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def test_queue_mode_writes_in_listener(monkeypatch):
+    """
+    Test case: In queue mode records are formatted and written by the listener, all are written after stop
+    """
+    monkeypatch.setattr(logs, "LOG_QUEUE", True)
+    logger = make_logger("test.logs.queue")
+    handler = ListHandler()
+    handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    attach_handlers(logger, [handler])
+
+    assert isinstance(logger.handlers[0], DeferredQueueHandler)
+    for i in range(100):
+        logger.info("record %d", i)
+    stop_logging()
+
+    assert handler.messages == [f"[INFO] record {i}" for i in range(100)]
+    logger.handlers.clear()
+
+
+def test_deferred_queue_handler_keeps_record():
+    """
+    Test case: Record is enqueued without formatting (message args are kept)
+    """
+    record = logging.LogRecord("test", logging.DEBUG, __file__, 1, "context: %s", ("large payload",), None)
+    prepared = DeferredQueueHandler(None).prepare(record)
+
+    assert prepared is record
+    assert prepared.msg == "context: %s" and prepared.args == ("large payload",)
+
+
+def test_debug_sampling(monkeypatch):
+    """
+    Test case: Only a sample of DEBUG records is logged, other levels are always logged
+    """
+    monkeypatch.setattr(logs, "LOG_QUEUE", False)
+    monkeypatch.setattr(logs, "LOG_DEBUG_SAMPLE_RATE", 0.0)
+    logger = make_logger("test.logs.sampling")
+    handler = ListHandler()
+    attach_handlers(logger, [handler])
+
+    logger.debug("debug payload")
+    logger.info("info")
+    logger.warning("warning")
+    logger.handlers.clear()
+
+    assert handler.messages == ["info", "warning"]
+    sampling_filter = DebugSamplingFilter(0.5)
+    debug_record = logging.LogRecord("test", logging.DEBUG, __file__, 1, "x", None, None)
+    passed = sum(sampling_filter.filter(debug_record) for _ in range(2000))
+    assert 800 < passed < 1200
@@ -0,0 +1,52 @@
+import pytest
+from src.metrics import MetricsRegistry, observe_latency, count_tokens, STAGE_LATENCY, LLM_TOKENS
+
+
+def test_metrics_render():
+    """
+    Test case: Counters, gauges and histograms are rendered in Prometheus text format
+    """
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("status",))
+    in_flight = registry.gauge("in_flight", "In flight requests")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(status="ok")
+    requests.inc(2, status="ok")
+    requests.inc(status='bad "x"')
+    with in_flight.track_inprogress():
+        assert in_flight.value() == 1
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{status="ok"} 3' in lines
+    assert 'requests_total{status="bad \\"x\\""} 1' in lines
+    assert "in_flight 0" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.65" in lines
+    assert "latency_seconds_count 4" in lines
+
+    # Same name returns the same metric, other type or labels are rejected
+    assert registry.counter("requests_total", "Requests", ("status",)) is requests
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
+    with pytest.raises(ValueError):
+        requests.inc(endpoint="/diagnose")
+
+
+def test_observe_latency_and_tokens():
+    """
+    Test case: Stage latencies and LangChain usage metadata are recorded
+    """
+    before = STAGE_LATENCY.count(pipeline="test", stage="rerank")
+    observe_latency("test", {"retrieval_s": 0.01, "rerank_s": 0.2, "docs": 12})
+    assert STAGE_LATENCY.count(pipeline="test", stage="rerank") == before + 1
+
+    count_tokens("test-model", {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15, "input_token_details": {}})
+    count_tokens("test-model", None)
+    assert LLM_TOKENS.value(model="test-model", type="input") == 10
+    assert LLM_TOKENS.value(model="test-model", type="total") == 15
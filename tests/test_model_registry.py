@@ -0,0 +1,48 @@
+import threading, time
+import torch
+from src.model_registry import ModelRegistry, model_memory_bytes
+
+
+def test_registry_loads_model_once():
+    """
+    Test case: Concurrent callers of the same (kind, name, device) share a single loaded model
+    """
+    registry = ModelRegistry()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("cross_encoder", "m", None, loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+    assert registry.get("cross_encoder", "m", "cpu", object) is not results[0]
+
+    report = registry.report()
+    assert [(info["kind"], info["name"], info["device"]) for info in report] == [
+        ("cross_encoder", "m", None), ("cross_encoder", "m", "cpu")]
+    assert report[0]["load_s"] >= 0.05
+
+
+def test_model_memory_bytes():
+    """
+    Test case: Memory of parameters is found on the handle or its wrapped torch module
+    """
+    module = torch.nn.Linear(4, 2)
+    expected = (4 * 2 + 2) * 4
+
+    class Wrapper:
+        _client = module
+
+    assert model_memory_bytes(module) == expected
+    assert model_memory_bytes(Wrapper()) == expected
+    assert model_memory_bytes(object()) == 0
@@ -0,0 +1,61 @@
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.rag.numpy_store import NumpyVectorStore, top_k_indices
+
+TEXTS = [f"Disease {i} symptoms" for i in range(50)]
+
+
+def test_top_k_indices():
+    """
+    Test case: argpartition top-k returns highest scores sorted descending
+    """
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.3, 0.2, 0.8, 0.1]])
+    assert top_k_indices(scores, 2).tolist() == [[1, 3], [2, 0]]
+    assert top_k_indices(scores, 10).shape == (2, 4)
+
+
+def test_exact_search_matches_brute_force():
+    """
+    Test case: NumPy store returns the same neighbours as brute force cosine similarity
+    """
+    embedding = DeterministicFakeEmbedding(size=32)
+    store = NumpyVectorStore.from_texts(TEXTS, embedding)
+
+    query = embedding.embed_query("fever cough")
+    vectors = np.array(embedding.embed_documents(TEXTS))
+    similarity = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    expected = [TEXTS[i] for i in np.argsort(-similarity)[:5]]
+
+    assert [doc.page_content for doc in store.similarity_search("fever cough", k=5)] == expected
+    assert [doc.page_content for doc in store.similarity_search_by_vectors([query], k=5)[0]] == expected
+
+    # Bulk search with scores returns the same documents and cosine similarities
+    docs_and_scores = store.similarity_search_with_score_by_vectors([query], k=5)[0]
+    assert [doc.page_content for doc, _ in docs_and_scores] == expected
+    np.testing.assert_allclose([score for _, score in docs_and_scores], np.sort(similarity)[::-1][:5], rtol=1e-5)
+
+
+def test_float16_and_delete():
+    """
+    Test case: float16 index keeps the top match, deleted documents are not returned
+    """
+    embedding = DeterministicFakeEmbedding(size=32)
+    store = NumpyVectorStore.from_texts(TEXTS, embedding, ids=[str(i) for i in range(len(TEXTS))], dtype="float16")
+    assert store.similarity_search(TEXTS[7], k=1)[0].id == "7"
+
+    store.delete(ids=["7"])
+    assert len(store) == len(TEXTS) - 1
+    assert all(doc.id != "7" for doc in store.similarity_search(TEXTS[7], k=10))
+
+
+def test_bulk_relevance_search_matches_langchain():
+    """
+    Test case: Bulk relevance search gives the same scores as LangChain similarity_search_with_relevance_scores
+    """
+    embedding = DeterministicFakeEmbedding(size=32)
+    store = NumpyVectorStore.from_texts(TEXTS, embedding)
+
+    bulk = store.similarity_search_with_relevance_scores_by_vectors([embedding.embed_query("fever cough")], k=5)[0]
+    expected = store.similarity_search_with_relevance_scores("fever cough", k=5)
+    assert [doc.page_content for doc, _ in bulk] == [doc.page_content for doc, _ in expected]
+    np.testing.assert_allclose([score for _, score in bulk], [score for _, score in expected])
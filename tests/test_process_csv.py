@@ -0,0 +1,51 @@
+import pandas as pd
+from benchmarks.prepare_docs import prepare_docs_iterrows
+from src.rag.process_csv import prepare_docs, iter_docs
+
+DATASET_FILENAME = "dataset/disease_symptoms.csv"
+
+
+def test_prepare_docs_matches_iterrows():
+    """
+    Test case: Vectorized prepare_docs gives the same documents as the row-by-row implementation
+    """
+    df = pd.read_csv(DATASET_FILENAME)
+    assert prepare_docs(df, DATASET_FILENAME) == prepare_docs_iterrows(df, DATASET_FILENAME)
+
+    # Integer, float, zero and missing values
+    mixed = pd.DataFrame({
+        "prognosis": ["Flu", "Cold", "Healthy"],
+        "high_fever": [80, 0, 0],
+        "cough": [12.5, 70.0, None],
+        "icd_code": ["J11", "J00", "Z00"],
+    })
+    assert prepare_docs(mixed, "test") == prepare_docs_iterrows(mixed, "test")
+
+
+def test_iter_docs_chunks(tmp_path):
+    """
+    Test case: Chunked reading yields all documents in dataset order
+    """
+    df = pd.read_csv(DATASET_FILENAME)
+    chunks = list(iter_docs(DATASET_FILENAME, chunksize=20))
+
+    assert [len(docs) for docs in chunks] == [20, 20, 20, 20, 5]
+    assert [doc for docs in chunks for doc in docs] == prepare_docs(df, DATASET_FILENAME)
+
+
+def test_iter_docs_independent_of_chunk_size(tmp_path):
+    """
+    Test case: Column which is integer in some chunks and float in others is formatted the same for every chunk size
+    """
+    path = tmp_path / "dataset.csv"
+    pd.DataFrame({
+        "prognosis": ["Flu", "Cold", "Asthma", "Migraine"],
+        "high_fever": [80, 10, 5, None],
+        "cough": [12.5, 70.0, 50.0, 0.0],
+        "icd_code": ["J11", "J00", "J45", "G43"],
+    }).to_csv(path, index=False)
+    expected = prepare_docs(pd.read_csv(path), str(path))
+
+    for chunksize in (1, 2, 3, 4):
+        assert [doc for docs in iter_docs(str(path), chunksize=chunksize) for doc in docs] == expected
+    assert "high fever 80.0%" in expected[0].page_content
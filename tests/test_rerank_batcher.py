@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from src.llm.rerank_batcher import RerankBatcher
+
+
+class CountingEncoder:
+    """CrossEncoder stand-in which scores pairs by doc length and counts predict calls"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, pairs):
+        self.batch_sizes.append(len(pairs))
+        return [float(len(doc)) for _, doc in pairs]
+
+
+class FailingEncoder:
+    def predict(self, pairs):
+        raise RuntimeError("model failure")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_batched():
+    """
+    Test case: Pairs of concurrent requests are scored in one predict call, every caller gets own scores
+    """
+    encoder = CountingEncoder()
+    batcher = RerankBatcher(encoder, window_ms=50, max_batch_size=1000)
+    requests = [[["query", "d" * (i + j)] for j in range(3)] for i in range(10)]
+
+    results = await asyncio.gather(*[batcher.predict(pairs) for pairs in requests])
+
+    assert encoder.batch_sizes == [30]
+    assert results == [[float(i + j) for j in range(3)] for i in range(10)]
+    assert batcher.stats()["max_batch_pairs"] == 30
+    batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_flushes_batch():
+    """
+    Test case: Batch is flushed once max batch size is reached
+    """
+    encoder = CountingEncoder()
+    batcher = RerankBatcher(encoder, window_ms=1000, max_batch_size=4)
+    requests = [[["query", "doc"], ["query", "doc"]] for _ in range(4)]
+
+    await asyncio.wait_for(asyncio.gather(*[batcher.predict(pairs) for pairs in requests]), timeout=1.0)
+
+    assert encoder.batch_sizes == [4, 4]
+    batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_predict_error_propagates():
+    """
+    Test case: CrossEncoder error is raised for every caller of the batch
+    """
+    batcher = RerankBatcher(FailingEncoder(), window_ms=10)
+
+    results = await asyncio.gather(
+        batcher.predict([["query", "doc"]]),
+        batcher.predict([["query", "doc"]]),
+        return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    batcher.close()
@@ -0,0 +1,76 @@
+import time
+import pytest
+from langchain_core.messages import SystemMessage, HumanMessage
+from src.llm.sessions import ChatSessionManager
+
+
+def new_history():
+    return [SystemMessage(content="system")]
+
+
+def test_sessions_are_isolated():
+    """
+    Test case: Every session id has its own history
+    """
+    manager = ChatSessionManager(new_history)
+    manager.get("alice").history.append(HumanMessage("I am 30"))
+
+    assert len(manager.get("alice").history) == 2
+    assert len(manager.get("bob").history) == 1
+    assert manager.active_sessions == 2
+
+    manager.reset("alice")
+    assert len(manager.get("alice").history) == 1
+
+
+def test_lru_and_ttl_eviction():
+    """
+    Test case: Least recently used session is evicted over the limit, idle sessions expire
+    """
+    manager = ChatSessionManager(new_history, ttl_s=60, max_sessions=2)
+    manager.get("a").history.append(HumanMessage("a"))
+    manager.get("b")
+    manager.get("a")
+    manager.get("c")
+
+    assert manager.active_sessions == 2
+    assert len(manager.get("a").history) == 2
+
+    manager.ttl_s = 0.01
+    time.sleep(0.02)
+    manager.get("d")
+    assert manager.active_sessions == 1
+
+
+@pytest.mark.asyncio
+async def test_session_with_turn_in_progress_is_not_evicted():
+    """
+    Test case: Session whose turn holds the lock survives LRU and TTL eviction and keeps its history
+    """
+    manager = ChatSessionManager(new_history, ttl_s=60, max_sessions=1)
+    session = manager.get("a")
+    async with session.lock:
+        session.history.append(HumanMessage("I am 30"))
+        manager.get("b")
+        assert manager.active_sessions == 2
+
+        manager.ttl_s = 0.01
+        time.sleep(0.02)
+        manager.get("c")
+        assert manager.get("a") is session
+
+    # Finished turn releases the lock, the session can be evicted again
+    manager.get("d")
+    assert manager.active_sessions == 1
+
+
+def test_history_trim_keeps_system_prompt():
+    """
+    Test case: History is capped, system prompt is always kept
+    """
+    manager = ChatSessionManager(new_history, max_history=3)
+    session = manager.get("a")
+    session.history.extend(HumanMessage(str(i)) for i in range(10))
+    manager.trim(session)
+
+    assert [message.content for message in session.history] == ["system", "7", "8", "9"]
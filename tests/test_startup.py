@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from src.startup import StartupState
+
+
+@pytest.mark.asyncio
+async def test_background_startup_failure_is_reported():
+    """
+    Test case: Exception of the startup task is retrieved by the done callback and reported as failed
+    """
+    startup = StartupState()
+
+    async def load():
+        await startup.run("vectors_store", lambda: "store")
+        raise RuntimeError("index not found")
+
+    task = asyncio.create_task(load())
+    task.add_done_callback(startup.task_done)
+    await asyncio.wait([task])
+    await asyncio.sleep(0)
+
+    assert startup.components["vectors_store"]["status"] == "ready"
+    assert not startup.ready
+    assert startup.report()["status"] == "failed"
+    assert startup.report()["error"] == "RuntimeError: index not found"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_startup_task_is_ignored():
+    """
+    Test case: Cancelled startup task (app shutdown) is not reported as error
+    """
+    startup = StartupState()
+    task = asyncio.create_task(asyncio.sleep(10))
+    task.add_done_callback(startup.task_done)
+    task.cancel()
+    await asyncio.wait([task])
+    await asyncio.sleep(0)
+
+    assert startup.error is None
+    assert startup.report()["status"] == "starting"
@@ -0,0 +1,80 @@
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+import evaluate, sweep
+
+DATASET = "dataset/disease_symptoms.csv"
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+class OverlapCrossEncoder:
+    """Scores pairs by the number of query words in the document"""
+
+    def predict(self, pairs, batch_size=32):
+        return np.array([float(sum(word in doc for word in query.split(", "))) for query, doc in pairs])
+
+
+def test_embedding_cache(tmp_path):
+    """
+    Test case: Document embeddings are computed once per model, only changed documents are embedded again
+    """
+    docs = [Document("Disease: Flu", metadata={"disease": "Flu"}), Document("Disease: Cold", metadata={"disease": "Cold"})]
+    embeddings = CountingEmbeddings(size=8)
+    first = sweep.EmbeddingCache("org/model", str(tmp_path)).embed_documents(embeddings, docs)
+
+    cache = sweep.EmbeddingCache("org/model", str(tmp_path))
+    second = cache.embed_documents(embeddings, docs)
+    assert embeddings.embedded == 2 and (cache.hits, cache.misses) == (2, 0)
+    np.testing.assert_allclose(first, second)
+
+    docs[1] = Document("Disease: Cold B", metadata={"disease": "Cold"})
+    cache.embed_documents(embeddings, docs)
+    assert embeddings.embedded == 3 and (cache.hits, cache.misses) == (1, 1)
+    assert (tmp_path / "org__model.npz").exists()
+
+
+def test_mark_pareto():
+    """
+    Test case: Only points without a faster point of at least the same recall are on the frontier
+    """
+    points = [
+        {"name": "fast", "recall": 0.5, "mrr": 0.4, "latency_ms": {"p50": 1.0}},
+        {"name": "slow_worse", "recall": 0.5, "mrr": 0.5, "latency_ms": {"p50": 5.0}},
+        {"name": "best", "recall": 0.9, "mrr": 0.7, "latency_ms": {"p50": 10.0}},
+        {"name": "slowest", "recall": 0.8, "mrr": 0.8, "latency_ms": {"p50": 20.0}},
+    ]
+
+    frontier = sweep.mark_pareto(points)
+
+    assert [point["name"] for point in frontier] == ["fast", "best"]
+    assert [point["pareto"] for point in points] == [True, False, True, False]
+
+
+def test_sweep_grid(monkeypatch, tmp_path):
+    """
+    Test case: Every valid grid combination is evaluated with recall and per-stage latency, table lists the frontier
+    """
+    monkeypatch.setattr(evaluate, "DATASET_FILENAME", DATASET)
+    monkeypatch.setattr(sweep, "DATASET_FILENAME", DATASET)
+    monkeypatch.setattr(sweep, "get_embeddings", lambda model_name: DeterministicFakeEmbedding(size=16))
+    monkeypatch.setattr(sweep, "get_cross_encoder", lambda model_name: OverlapCrossEncoder())
+    grid = sweep.SweepGrid(
+        embedding_models=["fake"], retrievers=["dense", "hybrid"], retrieval_k=[4, 8], rerank_depth=[4, 8],
+        rerank_models=[sweep.NO_RERANK, "overlap"], context_top_k=[2, 4])
+
+    points = sweep.sweep(grid, sample_size=10, seed=1, cache_dir=str(tmp_path))
+
+    # dense: 2 without rerank + (depth 4: 2, depth 8: 2) reranked, hybrid: twice as many (retrieval_k 4 and 8)
+    assert len(points) == 6 + 12
+    assert all(point["sample_size"] == 10 and 0 <= point["recall"] <= 1 for point in points)
+    reranked = [point for point in points if point["rerank_model"] == "overlap"]
+    assert all(set(point["latency_ms"]) == {"embedding", "search", "rerank", "p50", "p95"} for point in reranked)
+    assert any(point["pareto"] for point in points)
+    assert "RERANK_DEPTH" in sweep.format_points(points)
@@ -0,0 +1,58 @@
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+from src.rag.symptom_retriever import SymptomProbabilityRetriever, split_symptoms, merge_candidates
+
+VOCABULARY = ["fever", "cough", "headache", "rash"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """Deterministic embeddings - one dimension per vocabulary word"""
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [[float(word in text.lower()) for word in VOCABULARY] + [0.01] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def make_retriever() -> SymptomProbabilityRetriever:
+    df = pd.DataFrame({
+        "prognosis": ["Flu", "Migraine", "Measles"],
+        "fever": [90, 0, 80],
+        "cough": [70, 0, 10],
+        "headache": [40, 95, 0],
+        "rash": [0, 0, 90],
+        "icd_code": ["J11", "G43", "B05"],
+    })
+    return SymptomProbabilityRetriever.from_dataframe(df, "test", KeywordEmbeddings(), k=2)
+
+
+def test_split_symptoms():
+    """
+    Test case: Free-text query is split into single symptoms
+    """
+    assert split_symptoms("high fever, Cough and headache;rash\n") == ["high fever", "Cough", "headache", "rash"]
+
+
+def test_symptom_retriever_ranking():
+    """
+    Test case: Diseases are ranked by likelihood of matched symptoms, unmatched queries return nothing
+    """
+    retriever = make_retriever()
+
+    assert [doc.metadata["disease"] for doc in retriever.invoke("fever, cough")] == ["Flu", "Measles"]
+    assert [doc.metadata["disease"] for doc in retriever.invoke("strong headache")] == ["Migraine", "Flu"]
+
+    results = retriever.batch_search(["fever and rash", "broken leg"], k=1)
+    assert [doc.metadata["disease"] for doc in results[0]] == ["Measles"]
+    assert results[1] == []
+
+
+def test_merge_candidates():
+    """
+    Test case: Candidates of several retrievers are merged without duplicate diseases
+    """
+    retriever = make_retriever()
+    flu, migraine, measles = retriever.docs
+
+    assert merge_candidates([flu, migraine], [measles, flu]) == [flu, migraine, measles]
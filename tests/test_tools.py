@@ -0,0 +1,97 @@
+import httpx, pytest
+from src.llm import tools
+from src.llm.dispatcher import ToolError
+from src.llm.guardrails import SecurityError
+from src.schemas import DiagnoseResponse, DiseaseDetails, SymptomsInput
+from src.tracing import span, TRACE_HEADER
+
+RESPONSE = DiagnoseResponse(possible_diseases=[DiseaseDetails(name="Flu", icd_code="J11", reasoning="test")])
+
+
+class FakeAssistant:
+    def __init__(self):
+        self.calls = []
+
+    async def adiagnose(self, patient_info: SymptomsInput) -> DiagnoseResponse:
+        self.calls.append(patient_info)
+        if "jailbreak" in patient_info.symptoms:
+            raise SecurityError("prompt injection")
+        if "gibberish" in patient_info.symptoms:
+            return None
+        return RESPONSE
+
+
+@pytest.fixture
+def assistant():
+    fake_assistant = FakeAssistant()
+    tools.register_diagnosis_assistant(fake_assistant)
+    yield fake_assistant
+    tools.register_diagnosis_assistant(None)
+
+
+@pytest.mark.asyncio
+async def test_in_process_transport(assistant):
+    """
+    Test case: Registered assistant is called directly without HTTP
+    """
+    result = await tools.get_diagnosis_tool(gender="male", age=30, symptoms=["fever"])
+
+    assert result == RESPONSE.model_dump()
+    assert assistant.calls == [SymptomsInput(age=30, gender="male", symptoms=["fever"])]
+
+
+@pytest.mark.asyncio
+async def test_in_process_security_error(assistant):
+    """
+    Test case: Guardrails error of in-process call is raised as ToolError
+    """
+    with pytest.raises(ToolError, match="403"):
+        await tools.get_diagnosis_tool(gender="male", age=30, symptoms=["jailbreak"])
+
+
+@pytest.mark.asyncio
+async def test_in_process_unparseable_output(assistant):
+    """
+    Test case: Missing in-process diagnosis result is raised as ToolError like HTTP 500 error
+    """
+    with pytest.raises(ToolError, match="500"):
+        await tools.get_diagnosis_tool(gender="male", age=30, symptoms=["gibberish"])
+
+
+@pytest.mark.asyncio
+async def test_http_transport(monkeypatch):
+    """
+    Test case: Without registered assistant the shared HTTP client calls the API
+    """
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/diagnose"
+        return httpx.Response(200, json=RESPONSE.model_dump())
+
+    client = httpx.AsyncClient(base_url="http://diagnosis-api", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tools, "_http_client", client)
+
+    result = await tools.get_diagnosis_tool(gender="female", age=40, symptoms=["cough"])
+    assert result == RESPONSE.model_dump()
+    assert tools.get_http_client() is client
+    await tools.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_http_transport_trace_header(monkeypatch):
+    """
+    Test case: HTTP call carries the trace id of the current span in X-Trace-Id header
+    """
+    headers = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        headers.append(request.headers.get(TRACE_HEADER))
+        return httpx.Response(200, json=RESPONSE.model_dump())
+
+    monkeypatch.setattr(tools, "_http_client", httpx.AsyncClient(base_url="http://diagnosis-api", transport=httpx.MockTransport(handler)))
+
+    with span("chat", trace_id="abc123"):
+        await tools.get_diagnosis_tool(gender="female", age=40, symptoms=["cough"])
+    await tools.get_diagnosis_tool(gender="female", age=40, symptoms=["cough"])
+
+    assert headers == ["abc123", None]
+    await tools.close_http_client()
@@ -0,0 +1,91 @@
+import asyncio, json, logging, pytest
+from src import tracing
+from src.tracing import span, current_trace_id, current_span, parse_trace_id
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    traces = []
+    monkeypatch.setattr(tracing, "export_trace", lambda trace: traces.append(trace.to_dict()))
+    return traces
+
+
+def test_nested_spans(exported):
+    """
+    Test case: Nested spans share the trace, the trace is exported once when the root span ends
+    """
+    with span("chat", model="test") as root:
+        with span("tool") as tool:
+            with span("diagnose"):
+                assert current_trace_id() == root.trace_id
+        assert current_span() is root
+        assert exported == []
+
+    assert current_span() is None and current_trace_id() is None
+    assert len(exported) == 1
+    trace = exported[0]
+    assert trace["name"] == "chat"
+    assert [s["name"] for s in trace["spans"]] == ["chat", "tool", "diagnose"]
+    assert trace["spans"][1]["parent_id"] == root.span_id
+    assert trace["spans"][2]["parent_id"] == tool.span_id
+    assert trace["spans"][0]["attributes"] == {"model": "test"}
+    assert all(0 <= s["offset_s"] <= trace["duration_s"] for s in trace["spans"])
+
+
+def test_trace_id_and_errors(exported):
+    """
+    Test case: Root span continues given trace id, failed span has error status
+    """
+    with pytest.raises(ValueError):
+        with span("POST /diagnose", trace_id="remote-trace"):
+            with span("llm"):
+                raise ValueError("boom")
+
+    statuses = [(s["name"], s["status"]) for s in exported[0]["spans"]]
+    assert exported[0]["trace_id"] == "remote-trace"
+    assert statuses == [("POST /diagnose", "error"), ("llm", "error")]
+
+
+@pytest.mark.asyncio
+async def test_async_context_propagation(exported):
+    """
+    Test case: Concurrent tasks keep their own spans, child tasks inherit the current span
+    """
+    async def request(name: str):
+        with span(name):
+            await asyncio.sleep(0.01)
+            await asyncio.gather(child(), child())
+
+    async def child():
+        with span("child"):
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(request("a"), request("b"))
+
+    assert sorted(trace["name"] for trace in exported) == ["a", "b"]
+    for trace in exported:
+        root_id = trace["spans"][0]["span_id"]
+        assert [s["parent_id"] for s in trace["spans"][1:]] == [root_id, root_id]
+
+
+def test_parse_trace_id():
+    """
+    Test case: Only well-formed incoming trace ids are accepted
+    """
+    assert parse_trace_id("4bf92f3577b34da6a3ce929d0e0e4736") == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert parse_trace_id(None) is None
+    assert parse_trace_id("bad id\n") is None
+    assert parse_trace_id("x" * 65) is None
+
+
+def test_export_jsonl_line(caplog):
+    """
+    Test case: Completed trace is logged as a single JSON line by the "traces" logger
+    """
+    with caplog.at_level(logging.INFO, logger="traces"):
+        with span("diagnose"):
+            pass
+
+    records = [r for r in caplog.records if r.name == "traces"]
+    assert len(records) == 1
+    assert json.loads(records[0].getMessage())["spans"][0]["name"] == "diagnose"